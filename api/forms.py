@@ -0,0 +1,34 @@
+from django import forms
+from inventory.models import Stock
+from operations.models import ProductionMachine
+
+
+# Formularios de una linea de los pedidos masivos. Solo validan los valores;
+# la existencia de productos y equipos se comprueba para todas las lineas
+# juntas (ver services.py).
+class StockLineForm(forms.Form):
+    name = forms.CharField(max_length=Stock._meta.get_field("name").max_length)
+    quantity = forms.IntegerField(min_value=0)
+    reorder_level = forms.IntegerField(min_value=0, required=False)
+
+    def clean_reorder_level(self): # Vacio equivale a sin nivel de reposicion
+        return self.cleaned_data["reorder_level"] or 0
+
+
+# Ajuste de cantidad: --delta-- se suma (o se resta si es negativo) al stock
+class AdjustLineForm(forms.Form):
+    stock = forms.IntegerField()
+    delta = forms.IntegerField()
+
+
+class MachineLineForm(forms.Form):
+    name = forms.CharField(max_length=ProductionMachine._meta.get_field("name").max_length)
+
+
+class ProductionLineForm(forms.Form):
+    machine = forms.IntegerField()
+
+
+class ItemLineForm(forms.Form):
+    stock = forms.IntegerField()
+    quantity = forms.IntegerField(min_value=1)
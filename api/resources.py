@@ -0,0 +1,125 @@
+from django.core.cache import cache
+from core.cache import cache_timeout, versioned_key
+from core.pagination import KeysetPaginator
+from inventory.models import Stock
+from operations.history import ORDER_FIELDS, ORDER_TYPES, details_values, order_children
+from operations.models import ProductionMachine
+
+
+# Recurso de la API: modelo, campos que se pueden pedir con ?fields= y grupos
+# de cache de los que dependen sus listados. El id siempre se incluye.
+class Resource:
+    model = None
+    fields = ()
+    cache_groups = ()
+
+    def queryset(self):
+        return self.model.objects.all()
+
+    @property
+    def pk_name(self):
+        return self.model._meta.pk.name
+
+    # "a,b" -> ["id", "a", "b"]; ValueError si algun campo no existe
+    def select_fields(self, value=None):
+        if not value:
+            return list(self.fields)
+        names = [name.strip() for name in value.split(",") if name.strip()]
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise ValueError("Campos desconocidos: %s" % ", ".join(unknown))
+        return [self.pk_name] + [name for name in self.fields if name in names and name != self.pk_name]
+
+    # Columnas a leer de la tabla para los campos pedidos
+    def columns(self, fields):
+        return [name for name in fields if name in self.fields]
+
+    def value(self, obj, field):
+        return getattr(obj, field)
+
+    def serialize(self, objs, fields):
+        return [{field: self.value(obj, field) for field in fields} for obj in objs]
+
+    def page(self, fields, cursor=None, limit=100):
+        key = versioned_key(
+            "api:%s" % self.model._meta.label_lower, self.cache_groups, fields, cursor, limit
+        )
+        data = cache.get(key)
+        if data is None:
+            queryset = self.queryset().only(*self.columns(fields))
+            page = KeysetPaginator(queryset, limit, ("pk",)).page(cursor)
+            data = {
+                "results": self.serialize(page, fields),
+                "next": page.next_cursor,
+                "previous": page.previous_cursor,
+            }
+            cache.set(key, data, cache_timeout())
+        return data
+
+    def get(self, pk, fields):
+        objs = list(self.queryset().only(*self.columns(fields)).filter(pk=pk))
+        if not objs:
+            return None
+        return self.serialize(objs, fields)[0]
+
+
+class StockResource(Resource):
+    model = Stock
+    fields = ("id", "name", "quantity", "reorder_level")
+    cache_groups = ("stock",)
+
+    def queryset(self):
+        return Stock.active.all()
+
+
+class MachineResource(Resource):
+    model = ProductionMachine
+    fields = ("id", "name")
+    cache_groups = ("machines",)
+
+    def queryset(self):
+        return ProductionMachine.active.all()
+
+
+# Ordenes con sus items ([{stock, quantity}]) y detalles. Items y detalles se
+# leen en una consulta cada uno por pagina, y solo si se pidieron.
+class OrderResource(Resource):
+    kind = None
+    cache_groups = ("orders",)
+    children = ("items", "details")
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.model = ORDER_TYPES[kind][0]
+        self.fields = ("orderno", "time", *ORDER_FIELDS[kind], *self.children)
+
+    def value(self, obj, field):
+        if field == "machine":
+            return obj.machine_id
+        return getattr(obj, field)
+
+    def columns(self, fields):
+        return [name for name in fields if name not in self.children]
+
+    def serialize(self, objs, fields):
+        objs = list(objs)
+        records = super().serialize(objs, self.columns(fields))
+        if not any(name in fields for name in self.children):
+            return records
+        items, details = order_children(self.kind, [obj.pk for obj in objs])
+        for obj, record in zip(objs, records):
+            if "items" in fields:
+                record["items"] = [
+                    {"stock": item.stock_id, "quantity": item.quantity} for item in items[obj.pk]
+                ]
+            if "details" in fields:
+                record["details"] = details_values(details.get(obj.pk))
+        return records
+
+
+RESOURCES = {
+    "stocks": StockResource(),
+    "machines": MachineResource(),
+    "production": OrderResource("production"),
+    "dispatch": OrderResource("dispatch"),
+}
@@ -0,0 +1,225 @@
+from collections import defaultdict
+
+from django.db import transaction
+from core.cache import bump_version
+from core.dataio import bulk_create_with_pks
+from inventory.history import record_daily
+from inventory.models import Stock, StockMovement
+from inventory.services import (
+    ORDER_REASONS,
+    STOCK_IN,
+    STOCK_OUT,
+    aggregate_quantities,
+    notify_changed,
+    record_movements,
+    reserve_quantities,
+    update_quantities,
+)
+from operations.forms import DispatchDetailsForm, DispatchForm, ProductionDetailsForm
+from operations.history import ORDER_TYPES
+from operations.models import ProductionMachine, ProductionOrder
+from operations.rollups import record_production
+from .forms import AdjustLineForm, ItemLineForm, MachineLineForm, ProductionLineForm, StockLineForm
+
+
+# Errores de validacion de un pedido masivo: [{line, field, message}]. No se
+# guarda ninguna linea si alguna es invalida.
+class InvalidLines(Exception):
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__("%d lineas con errores" % len({error["line"] for error in errors}))
+
+
+def line_error(line, field, message):
+    return {"line": line, "field": field, "message": message}
+
+
+def form_errors(line, form, prefix=""):
+    return [
+        line_error(line, prefix + field, error["message"])
+        for field, errors in form.errors.get_json_data().items()
+        for error in errors
+    ]
+
+
+# Valida cada linea con --form_class--: [(linea, datos limpios)] y errores
+def validate_lines(form_class, lines):
+    rows, errors = [], []
+    for line, data in enumerate(lines):
+        if not isinstance(data, dict):
+            errors.append(line_error(line, None, "Se esperaba un objeto"))
+            continue
+        form = form_class(data)
+        if form.is_valid():
+            rows.append((line, form.cleaned_data))
+        else:
+            errors.extend(form_errors(line, form))
+    return rows, errors
+
+
+# Ids de --model-- activos entre los referenciados por las lineas
+def active_ids(model, ids):
+    return set(model.active.filter(pk__in=set(ids)).values_list("pk", flat=True))
+
+
+# Alta de productos en un solo INSERT; la cantidad inicial queda en el historial
+@transaction.atomic
+def create_stocks(lines):
+    rows, errors = validate_lines(StockLineForm, lines)
+    names = [row["name"] for line, row in rows]
+    taken = set(Stock.objects.filter(name__in=names).values_list("name", flat=True))
+    seen = set()
+    for line, row in rows:
+        if row["name"] in taken or row["name"] in seen:
+            errors.append(line_error(line, "name", "Ya existe un producto con este nombre"))
+        seen.add(row["name"])
+    if errors:
+        raise InvalidLines(errors)
+    stocks = bulk_create_with_pks(Stock, [Stock(**row) for line, row in rows])
+    record_movements(
+        {stock.pk: stock.quantity for stock in stocks}, STOCK_IN, StockMovement.ADJUSTMENT
+    )
+    # bulk_create no dispara senales: invalida cache, faltantes y dashboard
+    notify_changed(stock.pk for stock in stocks)
+    return stocks
+
+
+# Suma a cada producto la suma de sus --delta--. Las salidas se reservan como
+# en los despachos: si algun producto no alcanza se lanza InsufficientStock y
+# no se aplica ningun ajuste.
+@transaction.atomic
+def adjust_stocks(lines):
+    rows, errors = validate_lines(AdjustLineForm, lines)
+    found = active_ids(Stock, [row["stock"] for line, row in rows])
+    errors.extend(
+        line_error(line, "stock", "No existe el producto %s" % row["stock"])
+        for line, row in rows
+        if row["stock"] not in found
+    )
+    if errors:
+        raise InvalidLines(errors)
+    totals = defaultdict(int)
+    for line, row in rows:
+        totals[row["stock"]] += row["delta"]
+    incoming = {pk: delta for pk, delta in totals.items() if delta > 0}
+    outgoing = {pk: -delta for pk, delta in totals.items() if delta < 0}
+    reserve_quantities(outgoing)
+    update_quantities(incoming, STOCK_IN)
+    record_movements(incoming, STOCK_IN, StockMovement.ADJUSTMENT)
+    record_movements(outgoing, STOCK_OUT, StockMovement.ADJUSTMENT)
+    return sorted(totals)
+
+
+@transaction.atomic
+def create_machines(lines):
+    rows, errors = validate_lines(MachineLineForm, lines)
+    if errors:
+        raise InvalidLines(errors)
+    machines = bulk_create_with_pks(
+        ProductionMachine, [ProductionMachine(**row) for line, row in rows]
+    )
+    bump_version("machines")
+    return machines
+
+
+# Formularios de la orden y de sus detalles segun el tipo
+ORDER_FORMS = {
+    "production": (ProductionLineForm, ProductionDetailsForm),
+    "dispatch": (DispatchForm, DispatchDetailsForm),
+}
+
+
+# Valida una orden: {datos de la orden, items: [{stock, quantity}], details: {}}
+def validate_order(kind, line, data):
+    if not isinstance(data, dict):
+        return None, [line_error(line, None, "Se esperaba un objeto")]
+    order_form_class, details_form_class = ORDER_FORMS[kind]
+    order_form = order_form_class(data)
+    details_form = details_form_class(data.get("details") or {})
+    errors = []
+    if not order_form.is_valid():
+        errors.extend(form_errors(line, order_form))
+    if not details_form.is_valid():
+        errors.extend(form_errors(line, details_form, "details."))
+    items = data.get("items")
+    if not isinstance(items, list) or not items:
+        errors.append(line_error(line, "items", "La orden debe tener al menos un item"))
+        items = []
+    cleaned_items = []
+    for index, item in enumerate(items):
+        item_form = ItemLineForm(item if isinstance(item, dict) else {})
+        if item_form.is_valid():
+            cleaned_items.append(item_form.cleaned_data)
+        else:
+            errors.extend(form_errors(line, item_form, "items.%d." % index))
+    if errors:
+        return None, errors
+    if kind == "production":
+        order = ProductionOrder(machine_id=order_form.cleaned_data["machine"])
+    else:
+        order = order_form.save(commit=False)
+    return (order, cleaned_items, details_form.save(commit=False)), []
+
+
+# Crea muchas ordenes con sus items y detalles en una transaccion, con un
+# INSERT por tabla y un solo movimiento de stock para todas. Los despachos
+# reservan el stock: si algun producto no alcanza no se guarda ninguna orden.
+@transaction.atomic
+def create_orders(kind, lines):
+    order_model, item_model, details_model, direction = ORDER_TYPES[kind]
+    orders, errors = [], []
+    for line, data in enumerate(lines):
+        order, order_errors = validate_order(kind, line, data)
+        errors.extend(order_errors)
+        if order is not None:
+            orders.append((line, order))
+    stocks = active_ids(Stock, [item["stock"] for line, order in orders for item in order[1]])
+    for line, (order, items, details) in orders:
+        errors.extend(
+            line_error(line, "items.%d.stock" % index, "No existe el producto %s" % item["stock"])
+            for index, item in enumerate(items)
+            if item["stock"] not in stocks
+        )
+    if kind == "production":
+        machines = active_ids(ProductionMachine, [order[0].machine_id for line, order in orders])
+        errors.extend(
+            line_error(line, "machine", "No existe el equipo %s" % order[0].machine_id)
+            for line, order in orders
+            if order[0].machine_id not in machines
+        )
+    if errors:
+        raise InvalidLines(errors)
+    orders = [order for line, order in orders]
+    objs = bulk_create_with_pks(order_model, [order for order, items, details in orders])
+    for obj, (order, items, details) in zip(objs, orders):
+        details.orderno = obj
+        details.update_total()
+    details_model.objects.bulk_create(details for order, items, details in orders)
+    order_items = [
+        [item_model(orderno=obj, stock_id=item["stock"], quantity=item["quantity"]) for item in items]
+        for obj, (order, items, details) in zip(objs, orders)
+    ]
+    all_items = [item for group in order_items for item in group]
+    item_model.objects.bulk_create(all_items)
+    totals = aggregate_quantities(all_items)
+    if direction == STOCK_OUT:
+        reserve_quantities(totals)
+    else:
+        update_quantities(totals, direction)
+    StockMovement.objects.bulk_create(
+        StockMovement(
+            stock_id=stock_id,
+            quantity=direction * quantity,
+            reason=ORDER_REASONS[direction],
+            orderno=obj.pk,
+        )
+        for obj, group in zip(objs, order_items)
+        for stock_id, quantity in aggregate_quantities(group).items()
+    )
+    record_daily({pk: direction * quantity for pk, quantity in totals.items()})
+    if kind == "production":
+        for obj, group in zip(objs, order_items):
+            record_production(obj, group)
+    # bulk_create no dispara senales: invalida a mano el cache de listados
+    bump_version("orders")
+    return objs
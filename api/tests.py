@@ -0,0 +1,273 @@
+import gzip
+import json
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from inventory.models import Stock, StockMovement
+from operations.models import (
+    DispatchItem,
+    DispatchOrder,
+    ProductionMachine,
+    ProductionOrder,
+    ProductionOrderDetails,
+    ProductionRollup,
+)
+
+
+class ApiTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="tester", password="secret")
+        self.client.force_login(self.user)
+
+    def get_json(self, url, status=200, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status, response.content)
+        return response.json()
+
+    def post_json(self, url, data, status=201):
+        response = self.client.post(url, json.dumps(data), content_type="application/json")
+        self.assertEqual(response.status_code, status, response.content)
+        return response.json()
+
+
+class ApiReadTest(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.stocks = Stock.objects.bulk_create(
+            Stock(name="producto %02d" % i, quantity=i, reorder_level=5) for i in range(25)
+        )
+        Stock.objects.create(name="borrado", is_deleted=True)
+
+    def test_list_walks_pages_by_cursor(self):
+        names, cursor = [], ""
+        while True:
+            data = self.get_json(reverse("api-stocks"), limit=10, cursor=cursor)
+            names.extend(row["name"] for row in data["results"])
+            cursor = data["next"]
+            if not cursor:
+                break
+        self.assertEqual(names, ["producto %02d" % i for i in range(25)])
+
+    def test_fields_trim_payload(self):
+        data = self.get_json(reverse("api-stocks"), fields="quantity", limit=2)
+        self.assertEqual(list(data["results"][0]), ["id", "quantity"])
+        self.get_json(reverse("api-stocks"), status=400, fields="precio")
+        self.get_json(reverse("api-stocks"), status=400, limit="mucho")
+
+    def test_compact_and_gzipped(self):
+        response = self.client.get(reverse("api-stocks"), HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        body = gzip.decompress(response.content)
+        self.assertNotIn(b", ", body)
+        self.assertEqual(len(json.loads(body)["results"]), 25)
+
+    def test_detail(self):
+        stock = Stock.objects.get(name="producto 03")
+        data = self.get_json(reverse("api-stock", args=[stock.pk]), fields="name")
+        self.assertEqual(data, {"id": stock.pk, "name": "producto 03"})
+        deleted = Stock.objects.get(name="borrado")
+        data = self.get_json(reverse("api-stock", args=[deleted.pk]), status=404)
+        self.assertIn("error", data)
+
+    def test_list_is_cached_until_stock_changes(self):
+        url = reverse("api-stocks")
+        self.get_json(url)
+        with self.assertNumQueries(2):
+            self.get_json(url)
+        stock = Stock.objects.get(name="producto 01")
+        stock.quantity = 99
+        stock.save()
+        data = self.get_json(url, fields="quantity")
+        self.assertIn({"id": stock.pk, "quantity": 99}, data["results"])
+
+    def test_invalid_cursor(self):
+        self.get_json(reverse("api-stocks"), status=404, cursor="nada")
+
+    def test_method_not_allowed(self):
+        stock = Stock.objects.get(name="producto 01")
+        response = self.client.delete(reverse("api-stock", args=[stock.pk]))
+        self.assertEqual(response.status_code, 405)
+        self.assertIn("error", response.json())
+
+    def test_post_requires_csrf_token(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        response = client.post(
+            reverse("api-machines"), json.dumps({"machines": [{"name": "M1"}]}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 403)
+
+
+class ApiStockWriteTest(ApiTestCase):
+    def test_bulk_create(self):
+        lines = [{"name": "tornillo %d" % i, "quantity": i} for i in range(1, 51)]
+        data = self.post_json(reverse("api-stocks"), {"stocks": lines})
+        self.assertEqual(len(data["results"]), 50)
+        self.assertEqual(data["results"][0]["name"], "tornillo 1")
+        stock = Stock.objects.get(pk=data["results"][9]["id"])
+        self.assertEqual(stock.quantity, 10)
+        movement = StockMovement.objects.get(stock=stock)
+        self.assertEqual((movement.quantity, movement.reason), (10, StockMovement.ADJUSTMENT))
+
+    def test_bulk_create_is_all_or_nothing(self):
+        Stock.objects.create(name="tuerca")
+        lines = [
+            {"name": "arandela", "quantity": 1},
+            {"name": "tuerca", "quantity": 1},
+            {"name": "clavo", "quantity": -1},
+        ]
+        data = self.post_json(reverse("api-stocks"), {"stocks": lines}, status=400)
+        self.assertEqual(
+            sorted((error["line"], error["field"]) for error in data["errors"]),
+            [(1, "name"), (2, "quantity")],
+        )
+        self.assertFalse(Stock.objects.filter(name="arandela").exists())
+
+    def test_bulk_request_shape(self):
+        url = reverse("api-stocks")
+        response = self.client.post(url, "{", content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        self.post_json(url, {"stocks": []}, status=400)
+        self.post_json(url, {"stocks": ["tuerca"]}, status=400)
+        with self.settings(API_BULK_MAX_LINES=2):
+            lines = [{"name": "p%d" % i, "quantity": 1} for i in range(3)]
+            self.post_json(url, {"stocks": lines}, status=400)
+
+    def test_adjust(self):
+        a = Stock.objects.create(name="a", quantity=10)
+        b = Stock.objects.create(name="b", quantity=5)
+        lines = [
+            {"stock": a.pk, "delta": 3},
+            {"stock": b.pk, "delta": -2},
+            {"stock": a.pk, "delta": -1},
+        ]
+        data = self.post_json(reverse("api-stock-adjust"), {"lines": lines}, status=200)
+        self.assertEqual(
+            data["results"], [{"id": a.pk, "quantity": 12}, {"id": b.pk, "quantity": 3}]
+        )
+        self.assertEqual(
+            sorted(StockMovement.objects.values_list("stock__name", "quantity")),
+            [("a", 2), ("b", -2)],
+        )
+
+    def test_adjust_insufficient_stock_applies_nothing(self):
+        a = Stock.objects.create(name="a", quantity=10)
+        b = Stock.objects.create(name="b", quantity=1)
+        lines = [{"stock": a.pk, "delta": 5}, {"stock": b.pk, "delta": -2}]
+        data = self.post_json(reverse("api-stock-adjust"), {"lines": lines}, status=409)
+        self.assertEqual(data["available"], {str(b.pk): 1})
+        self.assertEqual(Stock.objects.get(pk=a.pk).quantity, 10)
+        self.assertFalse(StockMovement.objects.exists())
+
+    def test_adjust_unknown_stock(self):
+        data = self.post_json(
+            reverse("api-stock-adjust"), {"lines": [{"stock": 999, "delta": 1}]}, status=400
+        )
+        self.assertEqual(data["errors"][0]["field"], "stock")
+
+
+class ApiOrderTest(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.machine = ProductionMachine.objects.create(name="Prensa")
+        self.a = Stock.objects.create(name="a", quantity=100)
+        self.b = Stock.objects.create(name="b", quantity=100)
+
+    def dispatch_line(self, *items):
+        return {
+            "name": "Cliente",
+            "phone": "1234567890",
+            "address": "Calle 1",
+            "email": "cliente@example.com",
+            "items": [{"stock": stock.pk, "quantity": quantity} for stock, quantity in items],
+        }
+
+    def test_create_machines(self):
+        data = self.post_json(reverse("api-machines"), {"machines": [{"name": "M1"}, {"name": "M2"}]})
+        self.assertEqual([row["name"] for row in data["results"]], ["M1", "M2"])
+        data = self.get_json(reverse("api-machines"))
+        self.assertEqual(len(data["results"]), 3)
+
+    def test_bulk_production(self):
+        lines = [
+            {
+                "machine": self.machine.pk,
+                "items": [{"stock": self.a.pk, "quantity": 2}, {"stock": self.b.pk, "quantity": 1}],
+                "details": {"po": "PO-%d" % i, "amount": "10", "cgst": "1.5"},
+            }
+            for i in range(10)
+        ]
+        data = self.post_json(reverse("api-production"), {"orders": lines})
+        self.assertEqual(len(data["results"]), 10)
+        self.assertEqual(data["results"][0]["details"]["po"], "PO-0")
+        self.assertEqual(data["results"][0]["details"]["total"], "11.50")
+        self.assertEqual(Stock.objects.get(pk=self.a.pk).quantity, 120)
+        self.assertEqual(ProductionOrderDetails.objects.count(), 10)
+        rollup = ProductionRollup.objects.get(stock=self.a)
+        self.assertEqual((rollup.quantity, rollup.orders), (20, 10))
+        self.assertEqual(StockMovement.objects.filter(stock=self.b).count(), 10)
+
+        orderno = data["results"][3]["orderno"]
+        data = self.get_json(reverse("api-production-order", args=[orderno]), fields="items")
+        self.assertEqual(
+            data,
+            {
+                "orderno": orderno,
+                "items": [{"stock": self.a.pk, "quantity": 2}, {"stock": self.b.pk, "quantity": 1}],
+            },
+        )
+
+    def test_production_validation(self):
+        self.machine.is_deleted = True
+        self.machine.save()
+        lines = [
+            {"machine": self.machine.pk, "items": [{"stock": self.a.pk, "quantity": 1}]},
+            {"machine": self.machine.pk, "items": []},
+            {"machine": self.machine.pk, "items": [{"stock": self.a.pk, "quantity": 0}]},
+        ]
+        data = self.post_json(reverse("api-production"), {"orders": lines}, status=400)
+        self.assertEqual(
+            sorted((error["line"], error["field"]) for error in data["errors"]),
+            [(0, "machine"), (1, "items"), (2, "items.0.quantity")],
+        )
+        self.assertFalse(ProductionOrder.objects.exists())
+
+    def test_bulk_dispatch_queries_do_not_grow_with_orders(self):
+        url = reverse("api-dispatch")
+        counts = []
+        for size in (2, 20):
+            lines = [self.dispatch_line((self.a, 1), (self.b, 1)) for i in range(size)]
+            with CaptureQueriesContext(connection) as queries:
+                self.post_json(url, {"orders": lines})
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(DispatchOrder.objects.count(), 22)
+        self.assertEqual(Stock.objects.get(pk=self.a.pk).quantity, 78)
+
+    def test_dispatch_insufficient_stock_rolls_back(self):
+        lines = [self.dispatch_line((self.a, 60)), self.dispatch_line((self.a, 60))]
+        data = self.post_json(reverse("api-dispatch"), {"orders": lines}, status=409)
+        self.assertEqual(data["available"], {str(self.a.pk): 100})
+        self.assertFalse(DispatchOrder.objects.exists())
+        self.assertFalse(DispatchItem.objects.exists())
+        self.assertEqual(Stock.objects.get(pk=self.a.pk).quantity, 100)
+
+    def test_dispatch_list_fields(self):
+        self.post_json(reverse("api-dispatch"), {"orders": [self.dispatch_line((self.a, 1))]})
+        data = self.get_json(reverse("api-dispatch"), fields="name,email")
+        self.assertEqual(
+            data["results"][0],
+            {
+                "orderno": DispatchOrder.objects.get().pk,
+                "name": "Cliente",
+                "email": "cliente@example.com",
+            },
+        )
+        self.assertIsNone(data["next"])
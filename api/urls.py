@@ -0,0 +1,14 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('stocks', views.StockListView.as_view(), name='api-stocks'),
+    path('stocks/adjust', views.StockAdjustView.as_view(), name='api-stock-adjust'),
+    path('stocks/<int:pk>', views.ResourceDetailView.as_view(resource='stocks'), name='api-stock'),
+    path('machines', views.MachineListView.as_view(), name='api-machines'),
+    path('machines/<int:pk>', views.ResourceDetailView.as_view(resource='machines'), name='api-machine'),
+    path('production', views.OrderListView.as_view(resource='production'), name='api-production'),
+    path('production/<int:pk>', views.ResourceDetailView.as_view(resource='production'), name='api-production-order'),
+    path('dispatch', views.OrderListView.as_view(resource='dispatch'), name='api-dispatch'),
+    path('dispatch/<int:pk>', views.ResourceDetailView.as_view(resource='dispatch'), name='api-dispatch-order'),
+]
@@ -0,0 +1,156 @@
+import json
+
+from django.conf import settings
+from django.http import Http404, JsonResponse
+from django.utils.decorators import method_decorator
+from django.views.decorators.gzip import gzip_page
+from django.views.generic import View
+from inventory.services import InsufficientStock
+from .resources import RESOURCES
+from .services import (
+    InvalidLines,
+    adjust_stocks,
+    create_machines,
+    create_orders,
+    create_stocks,
+)
+
+
+def api_settings(name, default):
+    return getattr(settings, "API_" + name, default)
+
+
+# JSON sin espacios: junto con gzip reduce el tamano de los listados largos
+def api_response(data, status=200):
+    return JsonResponse(data, status=status, json_dumps_params={"separators": (",", ":")})
+
+
+def api_error(status, message, **extra):
+    return api_response({"error": message, **extra}, status=status)
+
+
+class BadRequest(Exception):
+    pass
+
+
+# Base de las vistas de la API: respuestas comprimidas si el cliente acepta
+# gzip y errores siempre en JSON. Usa la sesion del usuario; los POST llevan
+# el token CSRF en el header X-CSRFToken como cualquier formulario.
+@method_decorator(gzip_page, name="dispatch")
+class ApiView(View):
+    resource = None
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        except Http404 as exc:
+            return api_error(404, str(exc) or "No encontrado")
+
+    def http_method_not_allowed(self, request, *args, **kwargs):
+        response = api_error(405, "Metodo no permitido")
+        response["Allow"] = ", ".join(self._allowed_methods())
+        return response
+
+    def get_resource(self):
+        return RESOURCES[self.resource]
+
+    # Lineas de un pedido masivo: {"<clave>": [...]}, como maximo API_BULK_MAX_LINES
+    def get_lines(self, key):
+        try:
+            data = json.loads(self.request.body)
+        except ValueError:
+            raise BadRequest("JSON invalido")
+        lines = data.get(key) if isinstance(data, dict) else None
+        if not isinstance(lines, list) or not lines:
+            raise BadRequest("Se esperaba una lista no vacia en '%s'" % key)
+        max_lines = api_settings("BULK_MAX_LINES", 1000)
+        if len(lines) > max_lines:
+            raise BadRequest("Maximo %d lineas por pedido" % max_lines)
+        return lines
+
+    # Aplica un pedido masivo y traduce los errores a respuestas JSON
+    def apply(self, func, *args):
+        try:
+            return func(*args), None
+        except BadRequest as exc:
+            return None, api_error(400, str(exc))
+        except InvalidLines as exc:
+            return None, api_error(400, str(exc), errors=exc.errors)
+        except InsufficientStock as exc:
+            return None, api_error(409, str(exc), available=exc.available)
+
+
+# Listado paginado por cursor (?cursor=&limit=&fields=) y alta masiva (POST).
+# Cada recurso define create(lines), que devuelve los objetos creados
+class ResourceListView(ApiView):
+    bulk_key = None
+
+    def get(self, request):
+        resource = self.get_resource()
+        try:
+            fields = resource.select_fields(request.GET.get("fields"))
+            limit = int(request.GET.get("limit", api_settings("PAGE_SIZE", 100)))
+        except ValueError as exc:
+            return api_error(400, str(exc))
+        limit = min(max(limit, 1), api_settings("MAX_PAGE_SIZE", 1000))
+        return api_response(resource.page(fields, request.GET.get("cursor") or None, limit))
+
+    def post(self, request):
+        objs, error = self.apply(lambda: self.create(self.get_lines(self.bulk_key)))
+        if error is not None:
+            return error
+        resource = self.get_resource()
+        # Los creados se devuelven con todos sus campos, en el orden recibido
+        return api_response(
+            {"results": resource.serialize(objs, resource.select_fields())}, status=201
+        )
+
+
+class ResourceDetailView(ApiView):
+    def get(self, request, pk):
+        resource = self.get_resource()
+        try:
+            fields = resource.select_fields(request.GET.get("fields"))
+        except ValueError as exc:
+            return api_error(400, str(exc))
+        record = resource.get(pk, fields)
+        if record is None:
+            raise Http404("No encontrado")
+        return api_response(record)
+
+
+class StockListView(ResourceListView):
+    resource = "stocks"
+    bulk_key = "stocks"
+
+    def create(self, lines):
+        return create_stocks(lines)
+
+
+class MachineListView(ResourceListView):
+    resource = "machines"
+    bulk_key = "machines"
+
+    def create(self, lines):
+        return create_machines(lines)
+
+
+class OrderListView(ResourceListView):
+    bulk_key = "orders"
+
+    def create(self, lines):
+        return create_orders(self.resource, lines)
+
+
+# Ajuste masivo de cantidades: {"lines": [{"stock": id, "delta": n}]}.
+# Devuelve la cantidad resultante de los productos ajustados.
+class StockAdjustView(ApiView):
+    resource = "stocks"
+
+    def post(self, request):
+        ids, error = self.apply(lambda: adjust_stocks(self.get_lines("lines")))
+        if error is not None:
+            return error
+        resource = self.get_resource()
+        stocks = resource.queryset().filter(pk__in=ids).order_by("pk")
+        return api_response({"results": resource.serialize(stocks, ["id", "quantity"])})
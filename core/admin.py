@@ -0,0 +1,9 @@
+from django.contrib import admin
+from .models import ArchivedRow
+
+
+@admin.register(ArchivedRow)
+class ArchivedRowAdmin(admin.ModelAdmin):
+    list_display = ("pk", "model", "object_id", "archived_at")
+    list_filter = ("model",)
+    search_fields = ("=object_id",)
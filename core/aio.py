@@ -0,0 +1,64 @@
+import asyncio
+import functools
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.views.generic import View
+
+
+# View con handlers async (async def get). Django 3.2 no detecta vistas
+# basadas en clases async: as_view devuelve una funcion async, asi el
+# handler ASGI la ejecuta en el event loop sin ocupar un hilo. Bajo WSGI
+# Django la adapta con async_to_sync.
+class AsyncView(View):
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+
+        async def async_view(request, *args, **kwargs):
+            response = view(request, *args, **kwargs)
+            # http_method_not_allowed y options responden sincronicamente
+            if asyncio.iscoroutine(response):
+                response = await response
+            return response
+
+        functools.update_wrapper(async_view, view)
+        async_view.view_class = view.view_class
+        async_view.view_initkwargs = view.view_initkwargs
+        return async_view
+
+
+# Ejecuta codigo sincronico desde una vista async en el hilo compartido de
+# Django (el mismo que usan el middleware y la sesion)
+async def run_sync(func, *args, **kwargs):
+    return await sync_to_async(func)(*args, **kwargs)
+
+
+def _in_worker(func, *args, **kwargs):
+    try:
+        return func(*args, **kwargs)
+    finally:
+        # Cada hilo del pool tiene su conexion: respeta CONN_MAX_AGE
+        close_old_connections()
+
+
+def parallel_queries():
+    return getattr(settings, "ASYNC_PARALLEL_QUERIES", True)
+
+
+# Ejecuta una lectura (ORM, cache) en un hilo del pool, con su propia
+# conexion, sin bloquear el hilo compartido mientras espera la base. Con
+# ASYNC_PARALLEL_QUERIES = False corre en el hilo compartido (por ejemplo
+# dentro de una transaccion que las demas conexiones no verian).
+async def run_query(func, *args, **kwargs):
+    if not parallel_queries():
+        return await run_sync(func, *args, **kwargs)
+    return await sync_to_async(_in_worker, thread_sensitive=False)(func, *args, **kwargs)
+
+
+# Ejecuta lecturas independientes a la vez y devuelve sus resultados en orden
+async def gather(*funcs):
+    if not parallel_queries():
+        return [await run_sync(func) for func in funcs]
+    return await asyncio.gather(*(run_query(func) for func in funcs))
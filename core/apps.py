@@ -0,0 +1,15 @@
+from django.apps import AppConfig
+
+
+class CoreConfig(AppConfig):
+    name = 'core'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from .db import configure_connection
+        from .instrumentation import install_context_wrapper
+
+        # PRAGMA de rendimiento en cada conexion a SQLite
+        connection_created.connect(configure_connection, dispatch_uid="sqlite_pragmas")
+        # Conteo de consultas de los requests async (ver instrumentation)
+        connection_created.connect(install_context_wrapper, dispatch_uid="instrumentation")
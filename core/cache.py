@@ -0,0 +1,144 @@
+import hashlib
+
+from django import forms
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.forms.models import ModelChoiceIterator
+
+
+# Version de cada grupo de datos ("stock", "machines", "orders"). Las claves de
+# cache llevan la version de los grupos de los que dependen: al modificar un
+# dato se incrementa la version y las claves anteriores quedan obsoletas sin
+# tener que buscarlas ni borrarlas.
+def version_key(group):
+    return "version:%s" % group
+
+
+def get_versions(*groups):
+    keys = [version_key(group) for group in groups]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, 1, None)
+            versions[key] = cache.get(key, 1)
+    return [versions[key] for key in keys]
+
+
+def get_version(group):
+    return get_versions(group)[0]
+
+
+def _incr(group):
+    try:
+        cache.incr(version_key(group))
+    except ValueError:
+        cache.set(version_key(group), 1, None)
+
+
+# Incrementa ya (para la misma transaccion) y otra vez al confirmar: un request
+# concurrente pudo cachear los datos viejos con la version intermedia
+def bump_version(group):
+    _incr(group)
+    transaction.on_commit(lambda: _incr(group))
+
+
+def versioned_key(prefix, groups, *parts):
+    versions = ".".join(str(version) for version in get_versions(*groups))
+    digest = hashlib.md5(repr(parts).encode()).hexdigest()
+    return "%s:%s:%s" % (prefix, versions, digest)
+
+
+def cache_timeout():
+    return getattr(settings, "CACHE_VERSIONED_TIMEOUT", 300)
+
+
+# Incrementa la version del grupo cada vez que se guarda o borra un objeto de
+# los modelos (los borrados logicos son un save). Los cambios con update() o
+# bulk_create no disparan senales: quien los hace llama a bump_version.
+def connect_versions(group, *models):
+    def handler(sender, **kwargs):
+        bump_version(group)
+
+    for model in models:
+        uid = "version:%s:%s" % (group, model._meta.label_lower)
+        post_save.connect(handler, sender=model, weak=False, dispatch_uid=uid + ":save")
+        post_delete.connect(handler, sender=model, weak=False, dispatch_uid=uid + ":delete")
+
+
+# Mixin para ListView/FilterView: cachea la pagina (objetos y datos de
+# paginacion) por version de --cache_groups-- y parametros de la URL. Solo se
+# guardan listas ya evaluadas, nunca el queryset.
+class CachedPageMixin:
+    cache_groups = ()
+
+    def paginate_queryset(self, queryset, page_size):
+        key = versioned_key(
+            "page:%s" % self.__class__.__name__,
+            self.cache_groups,
+            self.request.path,
+            sorted(self.request.GET.lists()),
+        )
+        result = cache.get(key)
+        if result is None:
+            paginator, page, object_list, is_paginated = super().paginate_queryset(
+                queryset, page_size
+            )
+            object_list = list(object_list)
+            page.object_list = object_list
+            # El paginador conserva el total ya calculado, no el queryset
+            if hasattr(paginator, "count"):
+                paginator.object_list = ()
+            if hasattr(paginator, "queryset"):
+                paginator.queryset = None
+            result = paginator, page, object_list, is_paginated
+            cache.set(key, result, cache_timeout())
+        return result
+
+
+# Opciones de un select cacheadas como lista de (valor, etiqueta); igual que
+# ModelChoiceIterator solo se evaluan al renderizar
+class CachedChoiceIterator(ModelChoiceIterator):
+    def cached_choices(self):
+        key = self.field.cache_key("list", self.field.empty_label)
+        choices = cache.get(key)
+        if choices is None:
+            choices = [(str(value), label) for value, label in super().__iter__()]
+            cache.set(key, choices, cache_timeout())
+        return choices
+
+    def __iter__(self):
+        return iter(self.cached_choices())
+
+    def __len__(self):
+        return len(self.cached_choices())
+
+    def __bool__(self):
+        return bool(self.cached_choices())
+
+
+# ModelChoiceField que valida contra el cache en lugar de consultar la base
+# por cada linea del formulario. Con cache_choices tambien cachea las opciones
+# del select (para selects chicos que se renderizan completos).
+class CachedModelChoiceField(forms.ModelChoiceField):
+    def __init__(self, queryset, *, cache_group, cache_choices=False, **kwargs):
+        self.cache_group = cache_group
+        if cache_choices:
+            self.iterator = CachedChoiceIterator
+        super().__init__(queryset, **kwargs)
+
+    def cache_key(self, kind, *parts):
+        return versioned_key(
+            "choice:%s" % kind, (self.cache_group,), str(self.queryset.query), *parts
+        )
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        key = self.cache_key("value", str(value))
+        obj = cache.get(key)
+        if obj is None:
+            obj = super().to_python(value)
+            cache.set(key, obj, cache_timeout())
+        return obj
@@ -0,0 +1,96 @@
+import csv
+import itertools
+import json
+import sys
+from contextlib import contextmanager
+
+from django.core.management.base import CommandError
+
+
+FORMATS = ("csv", "jsonl")
+
+
+# Formato segun la extension del archivo si no se indica explicitamente
+def detect_format(path, fmt=None):
+    if fmt:
+        return fmt
+    for name in FORMATS:
+        if path.endswith("." + name):
+            return name
+    raise CommandError("No se reconoce el formato de %s, use --format" % path)
+
+
+# Lee un archivo CSV o JSONL registro por registro: (nro de linea, dict)
+def read_records(fh, fmt):
+    if fmt == "csv":
+        reader = csv.DictReader(fh)
+        for record in reader:
+            yield reader.line_num, record
+    else:
+        for lineno, line in enumerate(fh, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as exc:
+                yield lineno, exc
+                continue
+            yield lineno, record
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# Escribe registros en CSV o JSONL sin acumularlos en memoria
+class RecordWriter:
+    def __init__(self, fh, fmt, fieldnames):
+        self.fh = fh
+        self.fmt = fmt
+        self.fieldnames = fieldnames
+        if fmt == "csv":
+            self.writer = csv.DictWriter(fh, fieldnames=fieldnames, extrasaction="ignore")
+            self.writer.writeheader()
+
+    def write(self, record):
+        if self.fmt == "csv":
+            self.writer.writerow(record)
+        else:
+            self.fh.write(json.dumps(record, default=str, separators=(",", ":")) + "\n")
+
+
+@contextmanager
+def open_input(path):
+    if path == "-":
+        yield sys.stdin
+        return
+    with open(path, newline="", encoding="utf-8") as fh:
+        yield fh
+
+
+# Sin archivo escribe en --default-- (normalmente el stdout del comando)
+@contextmanager
+def open_output(path, default):
+    if not path or path == "-":
+        yield default
+        return
+    with open(path, "w", newline="", encoding="utf-8") as fh:
+        yield fh
+
+
+# bulk_create que completa los pk aunque la base no los devuelva (SQLite en
+# Django 3.2). Debe llamarse dentro de una transaccion: mientras se escribe,
+# SQLite no admite otros escritores, asi que las ultimas filas son las nuestras.
+def bulk_create_with_pks(model, objs, batch_size=None):
+    model.objects.bulk_create(objs, batch_size=batch_size)
+    if objs and objs[0].pk is None:
+        pks = model.objects.order_by("-pk").values_list("pk", flat=True)[: len(objs)]
+        for obj, pk in zip(objs, reversed(list(pks))):
+            obj.pk = pk
+    return objs
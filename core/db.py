@@ -0,0 +1,20 @@
+from django.conf import settings
+
+
+# Aplica SQLITE_PRAGMAS a cada conexion nueva (connection_created). Los PRAGMA
+# de SQLite valen por conexion, salvo journal_mode=wal que queda en el archivo.
+def configure_connection(sender, connection, **kwargs):
+    if connection.vendor != "sqlite":
+        return
+    pragmas = getattr(settings, "SQLITE_PRAGMAS", {})
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            if value in (None, ""):
+                continue
+            cursor.execute("PRAGMA %s = %s" % (name, value))
+
+
+def pragma(connection, name):
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA %s" % name)
+        return cursor.fetchone()[0]
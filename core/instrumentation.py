@@ -0,0 +1,169 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import Counter, deque
+from contextlib import ExitStack
+from contextvars import ContextVar
+from logging.handlers import RotatingFileHandler
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+
+logger = logging.getLogger("core.instrumentation")
+
+# Ultimos requests medidos, para la pagina de staff. Compartido por los hilos
+# del proceso; cada proceso tiene el suyo.
+BUFFER = deque(maxlen=getattr(settings, "INSTRUMENTATION_BUFFER_SIZE", 500))
+_lock = threading.Lock()
+
+
+def sample_rate():
+    return getattr(settings, "INSTRUMENTATION_SAMPLE_RATE", 0.0)
+
+
+# Cuenta y cronometra cada consulta ejecutada durante el request
+class QueryRecorder:
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - start))
+
+    # Misma consulta con distintos parametros varias veces: tipico N+1
+    def duplicates(self, threshold):
+        counts = Counter(sql for sql, duration in self.queries)
+        return [(count, sql) for sql, count in counts.most_common() if count >= threshold]
+
+
+# Recorder del request async en curso. Las consultas de un request async
+# corren en otros hilos (sync_to_async), que heredan el contexto pero no
+# comparten la conexion: cada conexion consulta esta variable.
+current_recorder = ContextVar("current_recorder", default=None)
+
+
+def context_wrapper(execute, sql, params, many, context):
+    recorder = current_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+# Se conecta a connection_created: agrega context_wrapper a cada conexion
+def install_context_wrapper(sender, connection, **kwargs):
+    if context_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(context_wrapper)
+
+
+def sampled():
+    rate = sample_rate()
+    return rate > 0 and (rate >= 1 or random.random() < rate)
+
+
+# Mide tiempo total, cantidad y tiempo de SQL de una fraccion de los requests.
+# Con INSTRUMENTATION_SAMPLE_RATE = 0 solo cuesta una comparacion por request.
+# Funciona bajo WSGI y ASGI (sin forzar las vistas async a un hilo).
+class InstrumentationMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # Marca la instancia como async para el handler de Django
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not sampled():
+            return self.get_response(request)
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        record(request, response, time.perf_counter() - start, recorder)
+        return response
+
+    async def __acall__(self, request):
+        if not sampled():
+            return await self.get_response(request)
+        recorder = QueryRecorder()
+        token = current_recorder.set(recorder)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_recorder.reset(token)
+        record(request, response, time.perf_counter() - start, recorder)
+        return response
+
+
+def record(request, response, duration, recorder):
+    threshold = getattr(settings, "INSTRUMENTATION_DUPLICATE_THRESHOLD", 3)
+    duplicates = recorder.duplicates(threshold)
+    match = getattr(request, "resolver_match", None)
+    entry = {
+        "time": timezone.now().isoformat(),
+        "method": request.method,
+        "path": request.path,
+        "view": match.view_name if match else "",
+        "status": response.status_code,
+        "duration_ms": round(duration * 1000, 2),
+        "queries": len(recorder.queries),
+        "sql_ms": round(sum(d for sql, d in recorder.queries) * 1000, 2),
+        "duplicates": [[count, sql[:300]] for count, sql in duplicates[:5]],
+    }
+    with _lock:
+        BUFFER.append(entry)
+    level = logging.WARNING if duplicates else logging.INFO
+    logger.log(level, json.dumps(entry))
+    return entry
+
+
+def recent(limit=None):
+    with _lock:
+        entries = list(BUFFER)
+    entries.reverse()
+    return entries[:limit] if limit else entries
+
+
+# Resumen por view de los requests en el buffer, los mas lentos primero
+def summary():
+    views = {}
+    for entry in recent():
+        views.setdefault(entry["view"] or entry["path"], []).append(entry)
+    rows = []
+    for view, entries in views.items():
+        durations = sorted(entry["duration_ms"] for entry in entries)
+        rows.append(
+            {
+                "view": view,
+                "requests": len(entries),
+                "avg_ms": round(sum(durations) / len(durations), 2),
+                "p95_ms": durations[min(len(durations) - 1, int(len(durations) * 0.95))],
+                "avg_queries": round(sum(e["queries"] for e in entries) / len(entries), 1),
+                "max_queries": max(e["queries"] for e in entries),
+                "flagged": sum(1 for e in entries if e["duplicates"]),
+            }
+        )
+    return sorted(rows, key=lambda row: row["p95_ms"], reverse=True)
+
+
+# RotatingFileHandler que crea la carpeta del log al abrir el archivo
+class RotatingLogHandler(RotatingFileHandler):
+    def _open(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.baseFilename)), exist_ok=True)
+        return super()._open()
@@ -0,0 +1,56 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.utils import timezone
+
+
+class SoftDeleteQuerySet(models.QuerySet):
+    def active(self):
+        return self.filter(is_deleted=False)
+
+    # Borrados logicos; con --before-- solo los borrados antes de esa fecha
+    def deleted(self, before=None):
+        deleted = self.filter(is_deleted=True)
+        if before is not None:
+            deleted = deleted.filter(deleted_at__lt=before)
+        return deleted
+
+
+# Solo filas activas. Los modelos lo acompanan con un indice parcial
+# (condition=Q(is_deleted=False)) para que los listados no lean las borradas.
+class ActiveManager(models.Manager.from_queryset(SoftDeleteQuerySet)):
+    def get_queryset(self):
+        return super().get_queryset().active()
+
+
+# Borrado logico: la fila queda marcada con la fecha de baja y sigue visible
+# desde las ordenes que la usan. objects trae todas las filas (admin, ordenes
+# viejas); active solo las activas (listados, formularios).
+class SoftDeleteModel(models.Model):
+    is_deleted = models.BooleanField(default=False)
+    deleted_at = models.DateTimeField(blank=True, null=True)
+
+    objects = SoftDeleteQuerySet.as_manager()
+    active = ActiveManager()
+
+    class Meta:
+        abstract = True
+
+    def soft_delete(self):
+        self.is_deleted = True
+        self.deleted_at = timezone.now()
+        self.save()
+
+
+# Copia de una fila quitada de las tablas de uso diario (ver archive.py):
+# modelo, id y valores de sus campos
+class ArchivedRow(models.Model):
+    model = models.CharField(max_length=100)
+    object_id = models.IntegerField()
+    data = models.JSONField(encoder=DjangoJSONEncoder)
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=["model", "object_id"], name="archived_row_idx")]
+
+    def __str__(self):
+        return "%s %s" % (self.model, self.object_id)
@@ -0,0 +1,155 @@
+import base64
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import Http404
+
+
+# Paginacion por cursor (keyset): en lugar de OFFSET y COUNT(*) filtra por los
+# valores de orden de la ultima fila vista, asi todas las paginas cuestan igual.
+class KeysetPage:
+    def __init__(self, object_list, has_next, has_previous, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.next_querystring = ""
+        self.previous_querystring = ""
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+
+class KeysetPaginator:
+    # ordering: campos de orden, el ultimo debe ser unico (ej. pk)
+    def __init__(self, queryset, per_page, ordering):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordering = list(ordering)
+        self.model = queryset.model
+
+    def _fields(self):
+        fields = []
+        for name in self.ordering:
+            field = name.lstrip("-")
+            if field == "pk":
+                field = self.model._meta.pk.name
+            fields.append((field, name.startswith("-")))
+        return fields
+
+    def encode_cursor(self, obj, direction):
+        values = []
+        for name, desc in self._fields():
+            field = self.model._meta.get_field(name)
+            values.append(field.value_to_string(obj))
+        data = json.dumps({"d": direction, "v": values}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            data = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+            direction, raw = data["d"], data["v"]
+            if direction not in ("n", "p") or len(raw) != len(self.ordering):
+                raise ValueError
+            values = [
+                self.model._meta.get_field(name).to_python(value)
+                for (name, desc), value in zip(self._fields(), raw)
+            ]
+        except (ValueError, KeyError, TypeError, ValidationError):
+            raise Http404("Cursor invalido")
+        return direction, values
+
+    # Condicion (a, b) > (va, vb) expresada como OR de comparaciones
+    def _after(self, values, backwards):
+        condition = Q()
+        equal = Q()
+        for (name, desc), value in zip(self._fields(), values):
+            lookup = "lt" if desc != backwards else "gt"
+            condition |= equal & Q(**{"%s__%s" % (name, lookup): value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def page(self, cursor=None):
+        queryset = self.queryset
+        direction, values = "n", None
+        if cursor:
+            direction, values = self.decode_cursor(cursor)
+        backwards = direction == "p"
+        ordering = [("-" if desc != backwards else "") + name for name, desc in self._fields()]
+        queryset = queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self._after(values, backwards))
+        rows = list(queryset[: self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        if backwards:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, values is not None
+        next_cursor = previous_cursor = None
+        if rows and has_next:
+            next_cursor = self.encode_cursor(rows[-1], "n")
+        if rows and has_previous:
+            previous_cursor = self.encode_cursor(rows[0], "p")
+        return KeysetPage(rows, has_next, has_previous, next_cursor, previous_cursor)
+
+
+# Modo keyset activo si esta habilitado en settings o si la URL trae un cursor
+def keyset_requested(request):
+    return getattr(settings, "KEYSET_PAGINATION", False) or "cursor" in request.GET
+
+
+# Completa los links prev/next conservando los demas parametros (ej. filtros)
+def set_page_links(page, request):
+    params = request.GET.copy()
+    params.pop("page", None)
+    for attr, cursor in (
+        ("next_querystring", page.next_cursor),
+        ("previous_querystring", page.previous_cursor),
+    ):
+        if cursor:
+            params["cursor"] = cursor
+            setattr(page, attr, "?" + params.urlencode())
+    return page
+
+
+def keyset_page(request, queryset, per_page, ordering):
+    paginator = KeysetPaginator(queryset, per_page, ordering)
+    page = paginator.page(request.GET.get("cursor"))
+    return paginator, set_page_links(page, request)
+
+
+# Mixin para ListView/FilterView: agrega el modo keyset a la paginacion
+class KeysetPaginationMixin:
+    keyset_ordering = ("pk",)
+
+    def paginate_queryset(self, queryset, page_size):
+        if not keyset_requested(self.request):
+            return super().paginate_queryset(queryset, page_size)
+        paginator, page = keyset_page(self.request, queryset, page_size, self.keyset_ordering)
+        return paginator, page, page.object_list, page.has_other_pages()
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["keyset"] = keyset_requested(self.request)
+        return context
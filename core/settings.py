@@ -20,6 +20,7 @@ ALLOWED_HOSTS = ['*']
 # Application definition
 
 INSTALLED_APPS = [
+    'core',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -31,6 +32,8 @@ INSTALLED_APPS = [
     'frontend',
     'inventory',
     'operations',
+    'jobs',
+    'api',
 
     'widget_tweaks',
     'crispy_forms',
@@ -39,6 +42,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primero, para medir tambien al resto de los middleware
+    'core.instrumentation.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -76,11 +81,75 @@ WSGI_APPLICATION = 'core.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # sqlite3 de Django con BEGIN IMMEDIATE, ver SQLITE_TRANSACTION_MODE
+        'ENGINE': 'core.sqlite3',
+        'NAME': os.environ.get('SQLITE_PATH', os.path.join(BASE_DIR, 'db.sqlite3')),
+        # Segundos que se reutiliza la conexion de cada hilo; 0 la cierra en
+        # cada request
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        # Base de tests en archivo: las pruebas de concurrencia usan varias
+        # conexiones, que con una base en memoria compartida no esperan el lock
+        'TEST': {'NAME': os.path.join(BASE_DIR, 'test_db.sqlite3')},
     }
 }
 
+# Las tablas existentes usan claves enteras de 32 bits
+DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
+
+# PRAGMA aplicados a cada conexion (core.db.configure_connection). Un valor
+# vacio en la variable de entorno deja el valor por defecto de SQLite.
+SQLITE_PRAGMAS = {
+    # WAL: los lectores no bloquean al escritor ni al reves
+    'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'wal'),
+    # Con WAL, NORMAL no pierde consistencia y evita un fsync por commit
+    'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'normal'),
+    # Milisegundos que se espera el lock de escritura antes de fallar
+    'busy_timeout': os.environ.get('SQLITE_BUSY_TIMEOUT', 20000),
+    'mmap_size': os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024),
+    # Negativo: en KiB por conexion
+    'cache_size': os.environ.get('SQLITE_CACHE_SIZE', -64000),
+    'temp_store': os.environ.get('SQLITE_TEMP_STORE', 'memory'),
+}
+# DEFERRED, IMMEDIATE o EXCLUSIVE. IMMEDIATE toma el lock de escritura al
+# empezar, asi las transacciones esperan su turno en vez de fallar.
+SQLITE_TRANSACTION_MODE = os.environ.get('SQLITE_TRANSACTION_MODE', 'IMMEDIATE')
+
+
+# Cache de listados, opciones de formularios y dashboard. locmem es por
+# proceso: con varios workers de gunicorn usar CACHE_BACKEND=file para que
+# todos vean los cambios de version (ver core/cache.py).
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+}
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND],
+        'LOCATION': os.environ.get(
+            'CACHE_LOCATION',
+            os.path.join(BASE_DIR, 'cache', 'django') if CACHE_BACKEND == 'file' else 'slapp3',
+        ),
+        'TIMEOUT': 300,
+        'OPTIONS': {'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', 5000))},
+    }
+}
+# Segundos que duran las paginas y opciones cacheadas por version
+CACHE_VERSIONED_TIMEOUT = int(os.environ.get('CACHE_VERSIONED_TIMEOUT', 300))
+
+# Vistas async (ASGI): las lecturas corren en hilos del pool, cada uno con su
+# conexion, y las independientes de un mismo request en paralelo (core/aio.py)
+ASYNC_PARALLEL_QUERIES = os.environ.get('ASYNC_PARALLEL_QUERIES', '1') != '0'
+
+# API JSON (/api/): registros por pagina y lineas por pedido masivo
+API_PAGE_SIZE = 100
+API_MAX_PAGE_SIZE = 1000
+API_BULK_MAX_LINES = int(os.environ.get('API_BULK_MAX_LINES', 1000))
+
+# Dias que productos y equipos borrados quedan en las tablas antes de que
+# archive_deleted los mueva (con sus ordenes) a la tabla de archivo
+ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', 365))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
@@ -129,4 +198,50 @@ LOGIN_URL = 'login'
 LOGIN_REQUIRED_IGNORE_VIEW_NAMES = [
     'login',
     'logout'
-]
\ No newline at end of file
+]
+# Paginacion por cursor (sin COUNT ni OFFSET) en todos los listados.
+# Tambien se activa por request con el parametro ?cursor=
+KEYSET_PAGINATION = False
+
+# PDF de ordenes generados, identificados por el contenido de la orden
+DOCUMENT_CACHE_DIR = os.environ.get(
+    'DOCUMENT_CACHE_DIR', os.path.join(BASE_DIR, 'cache', 'documents')
+)
+
+# Cola de trabajos en segundo plano (python manage.py run_jobs)
+# Segundos que un worker retiene un trabajo antes de que otro pueda retomarlo
+JOBS_VISIBILITY_TIMEOUT = int(os.environ.get('JOBS_VISIBILITY_TIMEOUT', 300))
+JOBS_OUTPUT_DIR = os.environ.get('JOBS_OUTPUT_DIR', os.path.join(BASE_DIR, 'cache', 'jobs'))
+# Las ordenes con mas items que esto se borran en segundo plano
+JOBS_DELETE_INLINE_ITEMS = int(os.environ.get('JOBS_DELETE_INLINE_ITEMS', 500))
+
+# Medicion de requests (tiempo, consultas SQL, consultas repetidas).
+# Fraccion de requests medidos: 0 desactiva, 1 mide todos
+INSTRUMENTATION_SAMPLE_RATE = float(os.environ.get('INSTRUMENTATION_SAMPLE_RATE', 0))
+INSTRUMENTATION_BUFFER_SIZE = 500
+# Veces que debe repetirse una consulta en un request para marcarla
+INSTRUMENTATION_DUPLICATE_THRESHOLD = 3
+INSTRUMENTATION_LOG = os.environ.get(
+    'INSTRUMENTATION_LOG', os.path.join(BASE_DIR, 'logs', 'requests.log')
+)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'instrumentation': {
+            'class': 'core.instrumentation.RotatingLogHandler',
+            'filename': INSTRUMENTATION_LOG,
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+            'delay': True,
+        },
+    },
+    'loggers': {
+        'core.instrumentation': {
+            'handlers': ['instrumentation'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
@@ -0,0 +1,12 @@
+from django.conf import settings
+from django.db.backends.sqlite3 import base
+
+
+# Backend sqlite3 que abre las transacciones con BEGIN IMMEDIATE (configurable
+# con SQLITE_TRANSACTION_MODE). Con BEGIN a secas la transaccion lee primero y
+# pide el lock de escritura despues; si otro proceso escribio en el medio,
+# SQLite devuelve "database is locked" sin esperar el busy_timeout.
+class DatabaseWrapper(base.DatabaseWrapper):
+    def _start_transaction_under_autocommit(self):
+        mode = getattr(settings, "SQLITE_TRANSACTION_MODE", "")
+        self.cursor().execute("BEGIN %s" % mode if mode else "BEGIN")
@@ -0,0 +1,120 @@
+import multiprocessing
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import OperationalError, connection, connections, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from inventory.models import Stock
+from operations.models import ProductionMachine
+from .cache import CachedModelChoiceField, bump_version, get_version, versioned_key
+from .db import pragma
+
+
+class SQLiteConfigurationTest(TestCase):
+    def test_pragmas_applied(self):
+        pragmas = settings.SQLITE_PRAGMAS
+        self.assertEqual(pragma(connection, "journal_mode"), pragmas["journal_mode"])
+        self.assertEqual(pragma(connection, "synchronous"), 1)  # NORMAL
+        self.assertEqual(pragma(connection, "busy_timeout"), int(pragmas["busy_timeout"]))
+        self.assertEqual(pragma(connection, "cache_size"), int(pragmas["cache_size"]))
+
+
+# Lee la cantidad y la escribe incrementada, en una transaccion: el patron de
+# los formularios (validar y despues guardar) que choca entre procesos
+def increment(stock_id, times, barrier, done, errors):
+    barrier.wait()
+    for _ in range(times):
+        try:
+            with transaction.atomic():
+                quantity = Stock.objects.get(pk=stock_id).quantity
+                time.sleep(0.001)
+                Stock.objects.filter(pk=stock_id).update(quantity=quantity + 1)
+            with done.get_lock():
+                done.value += 1
+        except OperationalError:
+            with errors.get_lock():
+                errors.value += 1
+    connections.close_all()
+
+
+class SQLiteMultiProcessWriteTest(TransactionTestCase):
+    PROCESSES = 4
+    TIMES = 25
+
+    def run_writers(self):
+        stock = Stock.objects.create(name="Contador", quantity=0)
+        context = multiprocessing.get_context("fork")
+        barrier = context.Barrier(self.PROCESSES)
+        done, errors = context.Value("i", 0), context.Value("i", 0)
+        # Cada proceso debe abrir su propia conexion
+        connections.close_all()
+        processes = [
+            context.Process(target=increment, args=(stock.pk, self.TIMES, barrier, done, errors))
+            for _ in range(self.PROCESSES)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(60)
+        stock.refresh_from_db()
+        return stock.quantity, done.value, errors.value
+
+    def test_immediate_transactions_serialize_writers(self):
+        quantity, done, errors = self.run_writers()
+        self.assertEqual(errors, 0)
+        self.assertEqual(done, self.PROCESSES * self.TIMES)
+        self.assertEqual(quantity, self.PROCESSES * self.TIMES)
+
+    @override_settings(SQLITE_TRANSACTION_MODE="")
+    def test_deferred_transactions_fail_under_contention(self):
+        quantity, done, errors = self.run_writers()
+        self.assertGreater(errors, 0)
+        self.assertEqual(quantity, done)
+
+
+class CacheVersionTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_bump_changes_keys(self):
+        key = versioned_key("page", ("stock", "machines"), "/inventory/")
+        self.assertEqual(key, versioned_key("page", ("stock", "machines"), "/inventory/"))
+        bump_version("machines")
+        self.assertNotEqual(key, versioned_key("page", ("stock", "machines"), "/inventory/"))
+
+    def test_bumped_again_on_commit(self):
+        version = get_version("stock")
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_version("stock")
+            self.assertEqual(get_version("stock"), version + 1)
+        self.assertEqual(get_version("stock"), version + 2)
+
+    def test_model_signals_bump_version(self):
+        version = get_version("machines")
+        machine = ProductionMachine.objects.create(name="Equipo 1")
+        self.assertGreater(get_version("machines"), version)
+        version = get_version("machines")
+        machine.is_deleted = True
+        machine.save()
+        self.assertGreater(get_version("machines"), version)
+
+    def test_choice_field_cached_until_change(self):
+        machine = ProductionMachine.objects.create(name="Equipo 1")
+        field = CachedModelChoiceField(
+            ProductionMachine.objects.filter(is_deleted=False),
+            cache_group="machines",
+            cache_choices=True,
+        )
+        self.assertEqual(field.clean(machine.pk), machine)
+        self.assertEqual(len(field.choices), 2)
+        with self.assertNumQueries(0):
+            self.assertEqual(field.clean(machine.pk), machine)
+            self.assertEqual(list(field.choices), [("", "---------"), (str(machine.pk), "Equipo 1")])
+        machine.is_deleted = True
+        machine.save()
+        self.assertEqual(list(field.choices), [("", "---------")])
+        with self.assertRaises(ValidationError):
+            field.clean(machine.pk)
@@ -13,4 +13,6 @@ urlpatterns = [
     path('frontend/', include('frontend.urls')),
     path('inventory/', include('inventory.urls')),
     path('operations/', include('operations.urls')),
+    path('jobs/', include('jobs.urls')),
+    path('api/', include('api.urls')),
 ]
\ No newline at end of file
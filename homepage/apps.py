@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class HomepageConfig(AppConfig):
     name = 'homepage'
+
+    def ready(self):
+        # Conecta las señales que invalidan el cache del dashboard
+        from . import dashboard  # noqa: F401
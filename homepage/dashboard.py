@@ -0,0 +1,109 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from core.aio import gather, run_query
+from inventory.models import Stock, StockShortfall
+from inventory.signals import shortfalls_changed, stock_changed
+from operations.models import DispatchOrder, ProductionOrder
+
+
+DASHBOARD_CACHE_KEY = "dashboard:data"
+DASHBOARD_CACHE_TIMEOUT = getattr(settings, "DASHBOARD_CACHE_TIMEOUT", 300)
+# Cantidad de productos que se muestran en el grafico, el resto se agrupa
+DASHBOARD_STOCK_LIMIT = getattr(settings, "DASHBOARD_STOCK_LIMIT", 20)
+DASHBOARD_OTHER_LABEL = "Otros"
+# Cantidad de faltantes listados en el dashboard
+DASHBOARD_SHORTFALL_LIMIT = getattr(settings, "DASHBOARD_SHORTFALL_LIMIT", 10)
+
+
+# Datos del grafico: los productos con mas stock y el resto sumado en "Otros"
+def get_stock_chart(limit=DASHBOARD_STOCK_LIMIT):
+    stocks = Stock.active.all()
+    top = list(stocks.order_by("-quantity").values_list("name", "quantity")[:limit])
+    labels = [name for name, quantity in top]
+    data = [quantity for name, quantity in top]
+    if len(top) == limit:
+        totals = stocks.aggregate(total=Sum("quantity"), count=Count("pk"))
+        if totals["count"] > limit:
+            labels.append(DASHBOARD_OTHER_LABEL)
+            data.append(totals["total"] - sum(data))
+    return labels, data
+
+
+# Faltantes de mayor a menor, leidos de la tabla precalculada
+def get_shortfalls(limit=DASHBOARD_SHORTFALL_LIMIT):
+    shortfalls = StockShortfall.objects.select_related("stock").order_by("-shortfall")
+    return list(shortfalls[:limit]), StockShortfall.objects.count()
+
+
+def get_latest_dispatches(limit=3):
+    return list(DispatchOrder.objects.order_by("-time")[:limit])
+
+
+def get_latest_productions(limit=3):
+    return list(ProductionOrder.objects.select_related("machine").order_by("-time")[:limit])
+
+
+# Partes independientes del dashboard: cada una es una o dos consultas
+DASHBOARD_PARTS = (get_stock_chart, get_shortfalls, get_latest_dispatches, get_latest_productions)
+
+
+def dashboard_context(chart, shortfalls, orders, productions):
+    labels, data = chart
+    shortfalls, shortfall_count = shortfalls
+    return {
+        "shortfalls": shortfalls,
+        "shortfall_count": shortfall_count,
+        "labels": labels,
+        "data": data,
+        "orders": orders,
+        "productions": productions,
+    }
+
+
+def build_dashboard_data():
+    return dashboard_context(*(part() for part in DASHBOARD_PARTS))
+
+
+# Datos compartidos por las vistas de inicio, cacheados hasta que cambie el stock
+def get_dashboard_data():
+    data = cache.get(DASHBOARD_CACHE_KEY)
+    if data is None:
+        data = build_dashboard_data()
+        cache.set(DASHBOARD_CACHE_KEY, data, DASHBOARD_CACHE_TIMEOUT)
+    return data
+
+
+# Version async: si no esta en cache, las partes se consultan a la vez
+async def aget_dashboard_data():
+    data = await run_query(cache.get, DASHBOARD_CACHE_KEY)
+    if data is None:
+        data = dashboard_context(*await gather(*DASHBOARD_PARTS))
+        await run_query(cache.set, DASHBOARD_CACHE_KEY, data, DASHBOARD_CACHE_TIMEOUT)
+    return data
+
+
+# Se borra ya y otra vez al confirmar la transaccion: un request concurrente
+# podria volver a cachear los datos anteriores al commit (igual que bump_version)
+def invalidate_dashboard(**kwargs):
+    cache.delete(DASHBOARD_CACHE_KEY)
+    transaction.on_commit(lambda: cache.delete(DASHBOARD_CACHE_KEY))
+
+
+@receiver(stock_changed)
+@receiver(shortfalls_changed)
+def stock_changed_handler(sender, **kwargs):
+    invalidate_dashboard()
+
+
+@receiver(post_save, sender=Stock)
+@receiver(post_delete, sender=Stock)
+@receiver(post_save, sender=DispatchOrder)
+@receiver(post_delete, sender=DispatchOrder)
+@receiver(post_save, sender=ProductionOrder)
+@receiver(post_delete, sender=ProductionOrder)
+def model_changed_handler(sender, **kwargs):
+    invalidate_dashboard()
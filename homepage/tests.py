@@ -1,3 +1,187 @@
-from django.test import TestCase
+import logging
+import os
+import tempfile
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from asgiref.sync import async_to_sync
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from core import instrumentation
+from inventory.models import Stock
+from inventory.services import STOCK_OUT, add_order_items
+from operations.models import DispatchOrder, DispatchItem, ProductionMachine, ProductionOrder
+from .dashboard import (
+    DASHBOARD_CACHE_KEY,
+    aget_dashboard_data,
+    build_dashboard_data,
+    get_dashboard_data,
+    get_stock_chart,
+)
+
+
+class DashboardDataTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="tester", password="secret")
+        self.client.force_login(self.user)
+        for i in range(5):
+            Stock.objects.create(name="Producto %d" % i, quantity=(i + 1) * 10)
+        Stock.objects.create(name="Borrado", quantity=1000, is_deleted=True)
+
+    def test_top_stocks_and_other_bucket(self):
+        labels, data = get_stock_chart(limit=3)
+        self.assertEqual(labels, ["Producto 4", "Producto 3", "Producto 2", "Otros"])
+        self.assertEqual(data, [50, 40, 30, 30])
+
+    def test_no_other_bucket_when_under_limit(self):
+        labels, data = get_stock_chart(limit=5)
+        self.assertNotIn("Otros", labels)
+        self.assertEqual(sum(data), 150)
+
+    def test_cached_until_stock_changes(self):
+        get_dashboard_data()
+        with self.assertNumQueries(0):
+            get_dashboard_data()
+
+        order = DispatchOrder.objects.create(
+            name="Cliente", phone="1234567890", address="Calle 1", email="a@b.com"
+        )
+        stock = Stock.objects.get(name="Producto 4")
+        with self.captureOnCommitCallbacks(execute=True):
+            add_order_items(order, [DispatchItem(stock=stock, quantity=45)], STOCK_OUT)
+        data = get_dashboard_data()
+        self.assertEqual(data["labels"][0], "Producto 3")
+        self.assertEqual(data["orders"], [order])
+
+    def test_invalidated_again_on_commit(self):
+        get_dashboard_data()
+        with self.captureOnCommitCallbacks(execute=True):
+            Stock.objects.create(name="Producto 5", quantity=100)
+            # Un request concurrente cachea los datos previos al commit
+            cache.set(DASHBOARD_CACHE_KEY, {"stale": True})
+        self.assertIsNone(cache.get(DASHBOARD_CACHE_KEY))
+        self.assertEqual(get_dashboard_data()["labels"][0], "Producto 5")
+
+    def test_home_views(self):
+        response = self.client.get(reverse("home"))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Producto 4", response.context["labels"])
+        response = self.client.get("/frontend/")
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(ASYNC_PARALLEL_QUERIES=False)
+class AsyncDashboardTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="tester", password="secret")
+        self.async_client.force_login(self.user)
+        self.client.force_login(self.user)
+        Stock.objects.create(name="Producto A", quantity=10, reorder_level=20)
+        DispatchOrder.objects.create(
+            name="Cliente", phone="1234567890", address="Calle 1", email="a@b.com"
+        )
+
+    async def test_async_view_matches_sync_view(self):
+        response = await self.async_client.get(reverse("home-async"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["labels"], ["Producto A"])
+        self.assertEqual(response.context["shortfall_count"], 1)
+        self.assertEqual(len(response.context["orders"]), 1)
+
+    def test_under_wsgi(self):
+        async_response = self.client.get(reverse("home-async"))
+        cache.clear()
+        response = self.client.get("/")
+        for key in ("labels", "data", "shortfall_count", "orders", "productions"):
+            self.assertEqual(async_response.context[key], response.context[key], key)
+
+    def test_method_not_allowed(self):
+        self.assertEqual(self.client.post(reverse("home-async")).status_code, 405)
+
+    @override_settings(INSTRUMENTATION_SAMPLE_RATE=1)
+    async def test_instrumentation_counts_async_queries(self):
+        instrumentation.BUFFER.clear()
+        with self.assertLogs("core.instrumentation", "INFO"):
+            await self.async_client.get(reverse("home-async"))
+        entry = instrumentation.recent()[0]
+        self.assertEqual(entry["view"], "home-async")
+        # Sesion, usuario y las consultas del dashboard
+        self.assertGreater(entry["queries"], 2)
+
+
+# Las partes del dashboard en hilos separados, cada uno con su conexion
+class AsyncDashboardParallelTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        machine = ProductionMachine.objects.create(name="Equipo 1")
+        for i in range(3):
+            Stock.objects.create(name="Producto %d" % i, quantity=i, reorder_level=2)
+            ProductionOrder.objects.create(machine=machine)
+
+    def test_parallel_parts_match_sync_build(self):
+        data = async_to_sync(aget_dashboard_data)()
+        expected = build_dashboard_data()
+        self.assertEqual(data["labels"], expected["labels"])
+        self.assertEqual(data["shortfall_count"], 2)
+        self.assertEqual(data["productions"], expected["productions"])
+        self.assertEqual(data["productions"][0].machine.name, "Equipo 1")
+        self.assertEqual(cache.get(DASHBOARD_CACHE_KEY)["shortfall_count"], 2)
+
+
+class InstrumentationTest(TestCase):
+    def setUp(self):
+        instrumentation.BUFFER.clear()
+        self.user = User.objects.create_user(username="tester", password="secret")
+        self.client.force_login(self.user)
+
+    def test_off_by_default(self):
+        self.client.get(reverse("inventory"))
+        self.assertEqual(instrumentation.recent(), [])
+
+    @override_settings(INSTRUMENTATION_SAMPLE_RATE=1)
+    def test_records_sampled_requests(self):
+        with self.assertLogs("core.instrumentation", "INFO") as logs:
+            self.client.get(reverse("inventory"))
+        entry = instrumentation.recent()[0]
+        self.assertEqual((entry["view"], entry["status"]), ("inventory", 200))
+        self.assertGreater(entry["queries"], 0)
+        self.assertGreaterEqual(entry["duration_ms"], entry["sql_ms"])
+        self.assertIn('"view": "inventory"', logs.output[0])
+
+    def test_flags_repeated_queries(self):
+        stocks = [Stock.objects.create(name="Producto %d" % i) for i in range(4)]
+        recorder = instrumentation.QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            for stock in stocks:
+                Stock.objects.get(pk=stock.pk)
+            Stock.objects.count()
+        duplicates = recorder.duplicates(3)
+        self.assertEqual(len(duplicates), 1)
+        self.assertEqual(duplicates[0][0], 4)
+
+    @override_settings(INSTRUMENTATION_SAMPLE_RATE=1)
+    def test_staff_page(self):
+        with self.assertLogs("core.instrumentation", "INFO"):
+            self.assertEqual(self.client.get(reverse("instrumentation")).status_code, 404)
+            self.user.is_staff = True
+            self.user.save()
+            self.client.get(reverse("inventory"))
+            response = self.client.get(reverse("instrumentation"))
+        self.assertContains(response, "inventory")
+        self.assertEqual(response.context["summary"][0]["requests"], 1)
+
+    def test_log_handler_creates_directory(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "logs", "requests.log")
+            handler = instrumentation.RotatingLogHandler(
+                path, maxBytes=100, backupCount=1, delay=True
+            )
+            handler.emit(logging.makeLogRecord({"msg": "x" * 80}))
+            handler.emit(logging.makeLogRecord({"msg": "y" * 80}))
+            handler.close()
+            files = sorted(os.listdir(os.path.dirname(path)))
+            self.assertEqual(files, ["requests.log", "requests.log.1"])
@@ -4,4 +4,6 @@ from . import views
 
 urlpatterns = [
     path('', views.HomeView.as_view(), name='home'),
+    path('async/', views.AsyncHomeView.as_view(), name='home-async'),
+    path('instrumentation/', views.InstrumentationView.as_view(), name='instrumentation'),
 ]
\ No newline at end of file
@@ -1,25 +1,38 @@
+from django.http import Http404
 from django.shortcuts import render
 from django.views.generic import View, TemplateView
-from inventory.models import Stock
-from operations.models import DispatchOrder, ProductionOrder
+from core import instrumentation
+from core.aio import AsyncView, run_sync
+from .dashboard import aget_dashboard_data, get_dashboard_data
 
 
 class HomeView(View):
     template_name = "home.html"
-    def get(self, request):        
-        labels = []
-        data = []        
-        stockqueryset = Stock.objects.filter(is_deleted=False).order_by('-quantity')
-        for item in stockqueryset:
-            labels.append(item.name)
-            data.append(item.quantity)
-        orders = DispatchOrder.objects.order_by('-time')[:3]
-        productions = ProductionOrder.objects.order_by('-time')[:3]
+    def get(self, request):
+        context = get_dashboard_data()
+        return render(request, self.template_name, context)
+
+
+# Dashboard para ASGI: no ocupa un hilo mientras espera las consultas
+class AsyncHomeView(AsyncView):
+    template_name = "home.html"
+
+    async def get(self, request):
+        context = await aget_dashboard_data()
+        return await run_sync(render, request, self.template_name, context)
+
+
+# Requests medidos por el middleware de instrumentacion (solo staff)
+class InstrumentationView(View):
+    template_name = "instrumentation.html"
+    limit = 100
+
+    def get(self, request):
+        if not request.user.is_staff:
+            raise Http404
         context = {
-            'labels'    : labels,
-            'data'      : data,
-            'orders'     : orders,
-            'productions' : productions
+            "sample_rate": instrumentation.sample_rate(),
+            "summary": instrumentation.summary(),
+            "entries": instrumentation.recent(self.limit),
         }
         return render(request, self.template_name, context)
-
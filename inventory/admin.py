@@ -1,4 +1,24 @@
 from django.contrib import admin
-from .models import Stock
+from .models import Stock, StockMovement, StockSnapshot
 
-admin.site.register(Stock)
\ No newline at end of file
+
+# El historial es de solo lectura: los movimientos se registran desde los
+# servicios junto con el cambio de cantidad, y el borrado masivo del admin
+# no pasa por StockMovement.delete
+class StockMovementAdmin(admin.ModelAdmin):
+    list_display = ("stock", "quantity", "reason", "orderno", "time")
+    list_filter = ("reason",)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+admin.site.register(Stock)
+admin.site.register(StockMovement, StockMovementAdmin)
+admin.site.register(StockSnapshot)
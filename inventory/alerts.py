@@ -0,0 +1,81 @@
+from django.db import transaction
+from django.utils import timezone
+from .models import Stock, StockAlert, StockShortfall
+from .signals import shortfalls_changed
+
+
+# Un producto activo esta en faltante si su cantidad es menor a su nivel de
+# reposicion; con nivel 0 solo cuando la cantidad es negativa
+def is_short(quantity, reorder_level, is_deleted=False):
+    return not is_deleted and quantity < reorder_level
+
+
+def alert(stock_id, kind, quantity, reorder_level, time):
+    return StockAlert(
+        stock_id=stock_id, kind=kind, quantity=quantity, reorder_level=reorder_level, time=time
+    )
+
+
+# Reevalua solo los productos indicados (o todos con stock_ids=None) contra la
+# tabla de faltantes, y registra una alerta en cada entrada o salida de faltante.
+# La lectura y la escritura van en la misma transaccion (BEGIN IMMEDIATE), asi
+# dos evaluaciones concurrentes no insertan el mismo faltante
+def evaluate_stocks(stock_ids=None):
+    if stock_ids is not None:
+        stock_ids = list(stock_ids)
+        if not stock_ids:
+            return 0
+    with transaction.atomic():
+        changes = apply_shortfalls(stock_ids)
+    if changes:
+        shortfalls_changed.send(sender=StockShortfall)
+    return changes
+
+
+def apply_shortfalls(stock_ids):
+    stocks = Stock.objects.all()
+    current = StockShortfall.objects.all()
+    if stock_ids is not None:
+        stocks = stocks.filter(pk__in=stock_ids)
+        current = current.filter(stock_id__in=stock_ids)
+    current = {shortfall.stock_id: shortfall for shortfall in current}
+    now = timezone.now()
+    created, changed, restored, alerts = [], [], [], []
+    rows = stocks.values_list("pk", "quantity", "reorder_level", "is_deleted")
+    for pk, quantity, reorder_level, is_deleted in rows.iterator():
+        existing = current.get(pk)
+        if is_short(quantity, reorder_level, is_deleted):
+            if existing is None:
+                created.append(
+                    StockShortfall(
+                        stock_id=pk,
+                        quantity=quantity,
+                        reorder_level=reorder_level,
+                        shortfall=reorder_level - quantity,
+                        since=now,
+                    )
+                )
+                alerts.append(alert(pk, StockAlert.LOW, quantity, reorder_level, now))
+            elif (existing.quantity, existing.reorder_level) != (quantity, reorder_level):
+                existing.quantity = quantity
+                existing.reorder_level = reorder_level
+                existing.shortfall = reorder_level - quantity
+                changed.append(existing)
+        elif existing is not None:
+            restored.append(pk)
+            if not is_deleted:
+                alerts.append(alert(pk, StockAlert.RESTORED, quantity, reorder_level, now))
+    StockShortfall.objects.bulk_create(created, ignore_conflicts=True)
+    StockShortfall.objects.bulk_update(changed, ["quantity", "reorder_level", "shortfall"])
+    StockShortfall.objects.filter(stock_id__in=restored).delete()
+    StockAlert.objects.bulk_create(alerts)
+    return len(created) + len(changed) + len(restored)
+
+
+def stock_changed_handler(sender, stock_ids=(), **kwargs):
+    evaluate_stocks(stock_ids)
+
+
+def stock_saved_handler(sender, instance, raw=False, **kwargs):
+    if not raw:
+        evaluate_stocks([instance.pk])
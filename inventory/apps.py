@@ -3,3 +3,19 @@ from django.apps import AppConfig
 
 class InventoryConfig(AppConfig):
     name = 'inventory'
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save
+        from .alerts import stock_changed_handler, stock_saved_handler
+        from .cache import bump_stock_version
+        from .models import Stock
+        from .signals import stock_changed
+
+        # Invalida las claves de cache de stock ante cualquier cambio
+        post_save.connect(bump_stock_version, sender=Stock, dispatch_uid="stock_version_save")
+        post_delete.connect(bump_stock_version, sender=Stock, dispatch_uid="stock_version_delete")
+        stock_changed.connect(bump_stock_version, dispatch_uid="stock_version_changed")
+
+        # Reevalua los faltantes de los productos modificados
+        post_save.connect(stock_saved_handler, sender=Stock, dispatch_uid="stock_alerts_save")
+        stock_changed.connect(stock_changed_handler, dispatch_uid="stock_alerts_changed")
@@ -0,0 +1,14 @@
+from core.cache import bump_version, get_version
+
+
+# Version de los datos de stock: cambia cada vez que se modifica un producto,
+# asi las claves de cache anteriores quedan obsoletas sin tener que borrarlas
+STOCK_GROUP = "stock"
+
+
+def get_stock_version():
+    return get_version(STOCK_GROUP)
+
+
+def bump_stock_version(**kwargs):
+    bump_version(STOCK_GROUP)
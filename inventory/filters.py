@@ -1,8 +1,12 @@
 import django_filters
 from .models import Stock    
+from .search import search_stocks
 
 class StockFilter(django_filters.FilterSet): # Filtro para buscar por nombre
-    name = django_filters.CharFilter(lookup_expr='icontains')
+    name = django_filters.CharFilter(method='search_name')
     class Meta:
         model = Stock
-        fields = ['name']
\ No newline at end of file
+        fields = ['name']
+
+    def search_name(self, queryset, name, value): # Usa el indice de busqueda en vez de LIKE
+        return search_stocks(queryset, value)
\ No newline at end of file
@@ -6,7 +6,39 @@ class StockForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
         self.fields['name'].widget.attrs.update({'class': 'textinput form-control'})
         self.fields['quantity'].widget.attrs.update({'class': 'textinput form-control', 'min': '0'})
+        self.fields['reorder_level'].widget.attrs.update({'class': 'textinput form-control', 'min': '0'})
+        self.fields['reorder_level'].required = False
+
+    def clean_reorder_level(self): # Vacio equivale a sin nivel de reposicion
+        return self.cleaned_data['reorder_level'] or 0
 
     class Meta:
         model = Stock
-        fields = ['name', 'quantity']
\ No newline at end of file
+        fields = ['name', 'quantity', 'reorder_level']
+
+class StockHistoryForm(forms.Form):
+    MAX_STOCKS = 500
+
+    stocks = forms.CharField(required=False)
+    start = forms.DateField(required=False)
+    end = forms.DateField(required=False)
+    points = forms.IntegerField(required=False, min_value=2, max_value=500)
+
+    def clean_stocks(self): # Lista de ids separados por coma
+        value = self.cleaned_data['stocks']
+        if not value:
+            return []
+        try:
+            ids = sorted({int(pk) for pk in value.split(',') if pk.strip()})
+        except ValueError:
+            raise forms.ValidationError('Lista de productos invalida')
+        if len(ids) > self.MAX_STOCKS:
+            raise forms.ValidationError('Maximo %d productos por consulta' % self.MAX_STOCKS)
+        return ids
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start, end = cleaned_data.get('start'), cleaned_data.get('end')
+        if start and end and start > end:
+            raise forms.ValidationError('La fecha inicial es posterior a la final')
+        return cleaned_data
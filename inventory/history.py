@@ -0,0 +1,136 @@
+import datetime
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+from .models import Stock, StockDaily, StockMovement
+
+
+# Actualiza la fila del dia de cada producto movido: suma la variacion y toma
+# como cierre la cantidad actual menos lo movido en los dias siguientes. Un
+# movimiento con fecha pasada (ordenes importadas) tambien corre el cierre de
+# los dias posteriores. Se llama despues de modificar Stock, dentro de la
+# misma transaccion.
+def record_daily(deltas, day=None):
+    deltas = {pk: qty for pk, qty in deltas.items() if qty}
+    if not deltas:
+        return
+    today = timezone.localdate()
+    day = day or today
+    StockDaily.objects.bulk_create(
+        [StockDaily(stock_id=pk, day=day, quantity=0) for pk in deltas],
+        ignore_conflicts=True,
+    )
+    delta = Case(
+        *[When(stock_id=pk, then=Value(qty)) for pk, qty in deltas.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    rows = StockDaily.objects.filter(stock_id__in=deltas.keys())
+    if day < today:
+        rows.filter(day__gt=day).update(quantity=F("quantity") + delta)
+    current = Stock.objects.filter(pk=OuterRef("stock_id")).values("quantity")[:1]
+    later = (
+        StockDaily.objects.filter(stock_id=OuterRef("stock_id"), day__gt=day)
+        .values("stock_id")
+        .annotate(total=Sum("delta"))
+        .values("total")
+    )
+    rows.filter(day=day).update(
+        delta=F("delta") + delta,
+        quantity=Subquery(current) - Coalesce(Subquery(later), Value(0)),
+    )
+
+
+# Reconstruye la serie desde el historial de movimientos. El cierre de cada
+# dia es la suma acumulada, corrida para que el ultimo dia coincida con la
+# cantidad actual (cubre cantidades cargadas antes de existir el historial).
+@transaction.atomic
+def rebuild_daily(batch_size=2000):
+    StockDaily.objects.all().delete()
+    tz = timezone.get_current_timezone()
+    days = (
+        StockMovement.objects.values_list("stock_id", TruncDate("time", tzinfo=tz))
+        .annotate(delta=Sum("quantity"))
+        .order_by("stock_id", TruncDate("time", tzinfo=tz))
+    )
+    quantities = dict(Stock.objects.values_list("pk", "quantity"))
+    created = []
+    count = 0
+    stock_rows = []
+
+    def flush_stock(rows):
+        if not rows:
+            return []
+        offset = quantities.get(rows[0].stock_id, 0) - rows[-1].quantity
+        for row in rows:
+            row.quantity += offset
+        return rows
+
+    for stock_id, day, delta in days.iterator():
+        if stock_rows and stock_rows[0].stock_id != stock_id:
+            created.extend(flush_stock(stock_rows))
+            stock_rows = []
+        total = (stock_rows[-1].quantity if stock_rows else 0) + delta
+        stock_rows.append(StockDaily(stock_id=stock_id, day=day, quantity=total, delta=delta))
+        if len(created) >= batch_size:
+            StockDaily.objects.bulk_create(created)
+            count += len(created)
+            created = []
+    created.extend(flush_stock(stock_rows))
+    StockDaily.objects.bulk_create(created)
+    return count + len(created)
+
+
+# Cantidad de cada producto al empezar --start--: el cierre del ultimo dia
+# anterior; si no hay, lo que habia antes del primer movimiento posterior;
+# si el producto nunca se movio, su cantidad actual
+def opening_quantity(start):
+    daily = StockDaily.objects.filter(stock=OuterRef("pk"))
+    before = daily.filter(day__lt=start).order_by("-day").values("quantity")[:1]
+    after = (
+        daily.filter(day__gte=start)
+        .order_by("day")
+        .annotate(opening=F("quantity") - F("delta"))
+        .values("opening")[:1]
+    )
+    return Coalesce(Subquery(before), Subquery(after), F("quantity"))
+
+
+# Serie de cada producto entre --start-- y --end-- reducida a --points-- puntos
+# como maximo: cada punto es la cantidad al cierre de su tramo de dias
+def daily_series(stock_ids, start, end, points):
+    span = (end - start).days + 1
+    step = max(-(-span // points), 1)
+    bucket_ends = [
+        min(start + datetime.timedelta(days=step * (i + 1) - 1), end)
+        for i in range(-(-span // step))
+    ]
+    stocks = (
+        Stock.objects.filter(pk__in=stock_ids)
+        .annotate(opening=opening_quantity(start))
+        .order_by("pk")
+        .values_list("pk", "name", "opening")
+    )
+    openings = {}
+    series = []
+    for pk, name, opening in stocks:
+        openings[pk] = opening
+        series.append({"id": pk, "name": name, "points": []})
+    days = {pk: [] for pk in openings}
+    rows = (
+        StockDaily.objects.filter(stock_id__in=openings.keys(), day__gte=start, day__lte=end)
+        .order_by("stock_id", "day")
+        .values_list("stock_id", "day", "quantity")
+    )
+    for stock_id, day, quantity in rows.iterator():
+        days[stock_id].append((day, quantity))
+    for data in series:
+        value, changes, index = openings[data["id"]], days[data["id"]], 0
+        for bucket_end in bucket_ends:
+            while index < len(changes) and changes[index][0] <= bucket_end:
+                value = changes[index][1]
+                index += 1
+            data["points"].append(value)
+    return {"start": start, "end": end, "step": step, "days": bucket_ends, "series": series}
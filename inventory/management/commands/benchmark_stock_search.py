@@ -0,0 +1,55 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from inventory.models import Stock
+from inventory.search import search_stocks
+
+BATCH_SIZE = 5000
+WORDS = ["cubierta", "rueda", "llanta", "eje", "buje", "disco", "resorte", "tapa"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide la busqueda de productos por nombre (LIKE vs indice) a medida "
+        "que crece el catalogo, sobre una base de prueba"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="10000,50000,100000")
+        parser.add_argument("--queries", type=int, default=50)
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(size) for size in options["sizes"].split(","))
+        rng = random.Random(0)
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            self.stdout.write("%10s %14s %14s" % ("productos", "LIKE ms", "indice ms"))
+            created = 0
+            for size in sizes:
+                Stock.objects.bulk_create(
+                    (
+                        Stock(name="%s %06d" % (rng.choice(WORDS), i))
+                        for i in range(created, size)
+                    ),
+                    batch_size=BATCH_SIZE,
+                )
+                created = size
+                # Busquedas de un codigo concreto, como al tipear en el buscador
+                queries = ["%06d" % rng.randrange(size) for _ in range(options["queries"])]
+                active = Stock.active.all()
+                like = self.time(lambda q: active.filter(name__icontains=q)[:10], queries)
+                indexed = self.time(lambda q: search_stocks(active, q)[:10], queries)
+                self.stdout.write("%10d %14.3f %14.3f" % (size, like, indexed))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def time(self, build, queries):
+        timings = []
+        for query in queries:
+            start = time.perf_counter()
+            list(build(query))
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
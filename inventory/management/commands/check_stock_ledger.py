@@ -0,0 +1,71 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Sum
+from inventory import tasks
+from inventory.models import Stock, StockMovement
+
+
+class Command(BaseCommand):
+    help = "Compara Stock.quantity con la suma del historial de movimientos"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=2000)
+        parser.add_argument(
+            "--repair",
+            action="store_true",
+            help="Registra un ajuste por cada diferencia encontrada",
+        )
+        parser.add_argument(
+            "--background", action="store_true", help="Encola el trabajo (ver run_jobs)"
+        )
+
+    def handle(self, *args, **options):
+        if options["background"]:
+            job = tasks.check_stock_ledger.delay(repair=options["repair"])
+            self.stdout.write("Trabajo %d encolado" % job.pk)
+            return
+        chunk_size = options["chunk_size"]
+        # Ambos cursores vienen ordenados por producto y se recorren en paralelo,
+        # sin cargar la tabla en memoria
+        stocks = (
+            Stock.objects.order_by("pk")
+            .values_list("pk", "name", "quantity")
+            .iterator(chunk_size)
+        )
+        ledger = (
+            StockMovement.objects.values_list("stock_id")
+            .annotate(total=Sum("quantity"))
+            .order_by("stock_id")
+            .iterator(chunk_size)
+        )
+        entry = next(ledger, None)
+        checked = mismatched = 0
+        repairs = []
+        for pk, name, quantity in stocks:
+            while entry is not None and entry[0] < pk:
+                entry = next(ledger, None)
+            total = 0
+            if entry is not None and entry[0] == pk:
+                total = entry[1]
+            checked += 1
+            if total != quantity:
+                mismatched += 1
+                self.stdout.write(
+                    "%s: stock %d, historial %d" % (name, quantity, total)
+                )
+                if options["repair"]:
+                    repairs.append(
+                        StockMovement(
+                            stock_id=pk,
+                            quantity=quantity - total,
+                            reason=StockMovement.ADJUSTMENT,
+                        )
+                    )
+            if len(repairs) >= chunk_size:
+                StockMovement.objects.bulk_create(repairs)
+                repairs = []
+        if repairs:
+            StockMovement.objects.bulk_create(repairs)
+
+        self.stdout.write("%d productos revisados, %d con diferencias" % (checked, mismatched))
+        if mismatched and not options["repair"]:
+            raise CommandError("El stock no coincide con el historial")
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from inventory.alerts import evaluate_stocks
+from inventory.models import StockShortfall
+
+
+class Command(BaseCommand):
+    help = "Recalcula la tabla de faltantes revisando todos los productos"
+
+    def handle(self, *args, **options):
+        changed = evaluate_stocks()
+        self.stdout.write(
+            "%d faltantes actualizados, %d faltantes actuales"
+            % (changed, StockShortfall.objects.count())
+        )
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from core.dataio import RecordWriter, open_output
+from inventory.models import Stock
+
+FIELDS = ["name", "quantity", "is_deleted"]
+
+
+class Command(BaseCommand):
+    help = "Exporta los productos a CSV/JSONL"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=["csv", "jsonl"], default="csv")
+        parser.add_argument("--output", help="Archivo de salida (por defecto stdout)")
+        parser.add_argument("--chunk-size", type=int, default=2000)
+        parser.add_argument("--include-deleted", action="store_true")
+
+    def handle(self, *args, **options):
+        stocks = Stock.objects.order_by("pk")
+        if not options["include_deleted"]:
+            stocks = stocks.active()
+        with open_output(options["output"], self.stdout) as fh:
+            writer = RecordWriter(fh, options["format"], FIELDS)
+            for record in stocks.values(*FIELDS).iterator(options["chunk_size"]):
+                writer.write(record)
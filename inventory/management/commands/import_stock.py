@@ -0,0 +1,96 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from core.dataio import chunked, detect_format, open_input, read_records
+from inventory.models import Stock, StockMovement
+from inventory.services import STOCK_IN, notify_changed, record_movements
+
+TRUE_VALUES = ("1", "true", "si", "yes")
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa productos desde CSV/JSONL (campos name, quantity, is_deleted). "
+        "Los productos existentes se actualizan por nombre"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Archivo a importar, o - para stdin")
+        parser.add_argument("--format", choices=["csv", "jsonl"])
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        fmt = detect_format(options["path"], options["format"])
+        processed = created = updated = errors = 0
+        with open_input(options["path"]) as fh:
+            for chunk in chunked(read_records(fh, fmt), options["batch_size"]):
+                rows = {}
+                for lineno, record in chunk:
+                    try:
+                        name, values = self.parse(record)
+                    except ValueError as exc:
+                        errors += 1
+                        self.stderr.write("Linea %d: %s" % (lineno, exc))
+                        continue
+                    rows[name] = values
+                new, changed = self.apply(rows)
+                processed += len(chunk)
+                created += new
+                updated += changed
+                self.stdout.write("%d filas procesadas" % processed)
+        self.stdout.write(
+            "%d creados, %d actualizados, %d filas con errores" % (created, updated, errors)
+        )
+
+    def parse(self, record):
+        if not isinstance(record, dict):
+            raise ValueError(record)
+        name = str(record.get("name") or "").strip()
+        if not name:
+            raise ValueError("falta el nombre")
+        if len(name) > Stock._meta.get_field("name").max_length:
+            raise ValueError("nombre demasiado largo: %s" % name)
+        values = {}
+        quantity = record.get("quantity")
+        if quantity not in (None, ""):
+            try:
+                values["quantity"] = int(quantity)
+            except (TypeError, ValueError):
+                raise ValueError("cantidad invalida: %s" % quantity)
+        is_deleted = record.get("is_deleted")
+        if is_deleted not in (None, ""):
+            values["is_deleted"] = str(is_deleted).strip().lower() in TRUE_VALUES
+            values["deleted_at"] = timezone.now() if values["is_deleted"] else None
+        return name, values
+
+    # Crea o actualiza un lote de productos y registra los ajustes en el historial
+    @transaction.atomic
+    def apply(self, rows):
+        if not rows:
+            return 0, 0
+        existing = Stock.objects.filter(name__in=rows.keys()).in_bulk(field_name="name")
+        deltas, to_update, to_create = {}, [], []
+        for name, values in rows.items():
+            stock = existing.get(name)
+            if stock is None:
+                to_create.append(Stock(name=name, **values))
+                continue
+            if stock.is_deleted and values.get("is_deleted"):
+                # Ya estaba borrado: conserva la fecha de baja original
+                values["deleted_at"] = stock.deleted_at
+            deltas[stock.pk] = values.get("quantity", stock.quantity) - stock.quantity
+            if any(getattr(stock, field) != value for field, value in values.items()):
+                for field, value in values.items():
+                    setattr(stock, field, value)
+                to_update.append(stock)
+        Stock.objects.bulk_update(to_update, ["quantity", "is_deleted", "deleted_at"])
+        Stock.objects.bulk_create(to_create)
+        if to_create:
+            ids = Stock.objects.filter(name__in=[s.name for s in to_create]).in_bulk(
+                field_name="name"
+            )
+            deltas.update((ids[stock.name].pk, stock.quantity) for stock in to_create)
+        # Los ajustes van al historial y a la serie diaria como los de la vista
+        movements = record_movements(deltas, STOCK_IN, StockMovement.ADJUSTMENT)
+        notify_changed({s.pk for s in to_update} | {m.stock_id for m in movements})
+        return len(to_create), len(to_update)
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from inventory.history import rebuild_daily
+
+
+class Command(BaseCommand):
+    help = "Reconstruye la serie diaria de cantidades desde el historial de movimientos"
+
+    def handle(self, *args, **options):
+        count = rebuild_daily()
+        self.stdout.write("%d dias de stock generados" % count)
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from inventory import tasks
+from inventory.services import SNAPSHOT_INTERVAL, take_snapshots
+
+
+class Command(BaseCommand):
+    help = "Guarda fotos de cantidad de los productos con muchos movimientos nuevos"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=int, default=SNAPSHOT_INTERVAL)
+        parser.add_argument(
+            "--background", action="store_true", help="Encola el trabajo (ver run_jobs)"
+        )
+
+    def handle(self, *args, **options):
+        if options["background"]:
+            job = tasks.take_snapshots.delay(options["interval"])
+            self.stdout.write("Trabajo %d encolado" % job.pk)
+            return
+        created = take_snapshots(options["interval"])
+        self.stdout.write("%d fotos de stock creadas" % created)
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.16 on 2026-10-18 14:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Stock',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=30, unique=True, verbose_name='Name')),
+                ('quantity', models.IntegerField(default=1)),
+                ('is_deleted', models.BooleanField(default=False)),
+            ],
+        ),
+    ]
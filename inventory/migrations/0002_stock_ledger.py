@@ -0,0 +1,60 @@
+# Generated by Django 3.2.16 on 2026-10-18 14:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+# Saldo inicial: un ajuste por producto con su cantidad actual, asi la suma
+# del historial coincide con Stock.quantity desde el primer movimiento
+def opening_balances(apps, schema_editor):
+    Stock = apps.get_model("inventory", "Stock")
+    StockMovement = apps.get_model("inventory", "StockMovement")
+    now = django.utils.timezone.now()
+    StockMovement.objects.bulk_create(
+        [
+            StockMovement(stock_id=pk, quantity=quantity, reason="adjustment", time=now)
+            for pk, quantity in Stock.objects.exclude(quantity=0).values_list("pk", "quantity")
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField()),
+                ('last_movement_id', models.IntegerField()),
+                ('time', models.DateTimeField()),
+                ('stock', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='inventory.stock')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField()),
+                ('reason', models.CharField(choices=[('production', 'Produccion'), ('dispatch', 'Despacho'), ('production-delete', 'Produccion eliminada'), ('dispatch-delete', 'Despacho eliminado'), ('adjustment', 'Ajuste manual')], max_length=20)),
+                ('orderno', models.IntegerField(blank=True, null=True)),
+                ('time', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('stock', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movements', to='inventory.stock')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='stocksnapshot',
+            index=models.Index(fields=['stock', 'time'], name='inventory_s_stock_i_35b86a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['stock', 'id'], name='inventory_s_stock_i_a21344_idx'),
+        ),
+        migrations.RunPython(opening_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.2.16 on 2026-10-18 14:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0002_stock_ledger'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='stock',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['id'], name='stock_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stock',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['-quantity'], name='stock_active_quantity_idx'),
+        ),
+    ]
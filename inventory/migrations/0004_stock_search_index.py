@@ -0,0 +1,26 @@
+from django.db import migrations
+
+from inventory.search import CREATE_SQL, DROP_SQL, fts_supported
+
+
+def create_search_index(apps, schema_editor):
+    if fts_supported(schema_editor.connection):
+        for sql in CREATE_SQL:
+            schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        for sql in DROP_SQL:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0003_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 3.2.16 on 2026-10-18 14:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+from inventory.search import recreate_search_index
+
+
+# Los productos existentes con cantidad negativa ya estan en faltante
+def populate_shortfalls(apps, schema_editor):
+    Stock = apps.get_model("inventory", "Stock")
+    StockShortfall = apps.get_model("inventory", "StockShortfall")
+    stocks = Stock.objects.filter(is_deleted=False, quantity__lt=0)
+    StockShortfall.objects.bulk_create(
+        StockShortfall(stock_id=pk, quantity=quantity, reorder_level=0, shortfall=-quantity)
+        for pk, quantity in stocks.values_list("pk", "quantity").iterator()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0004_stock_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockAlert',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('low', 'Bajo nivel de reposicion'), ('restored', 'Repuesto')], max_length=10)),
+                ('quantity', models.IntegerField()),
+                ('reorder_level', models.PositiveIntegerField()),
+                ('time', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StockShortfall',
+            fields=[
+                ('stock', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='shortfall', serialize=False, to='inventory.stock')),
+                ('quantity', models.IntegerField()),
+                ('reorder_level', models.PositiveIntegerField()),
+                ('shortfall', models.IntegerField()),
+                ('since', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='stock',
+            name='reorder_level',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='stockshortfall',
+            index=models.Index(fields=['-shortfall'], name='shortfall_idx'),
+        ),
+        migrations.AddField(
+            model_name='stockalert',
+            name='stock',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alerts', to='inventory.stock'),
+        ),
+        migrations.RunPython(recreate_search_index, migrations.RunPython.noop),
+        migrations.RunPython(populate_shortfalls, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 3.2.16 on 2026-10-18 14:27
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+# Serie inicial desde el historial de movimientos, anclada a la cantidad actual
+def populate_daily(apps, schema_editor):
+    Stock = apps.get_model("inventory", "Stock")
+    StockDaily = apps.get_model("inventory", "StockDaily")
+    StockMovement = apps.get_model("inventory", "StockMovement")
+    day = TruncDate("time", tzinfo=timezone.get_current_timezone())
+    rows = (
+        StockMovement.objects.values_list("stock_id", day)
+        .annotate(delta=Sum("quantity"))
+        .order_by("stock_id", day)
+    )
+    quantities = dict(Stock.objects.values_list("pk", "quantity"))
+    totals = {}
+    created = []
+    for stock_id, date, delta in rows.iterator():
+        totals[stock_id] = totals.get(stock_id, 0) + delta
+        created.append(
+            StockDaily(stock_id=stock_id, day=date, quantity=totals[stock_id], delta=delta)
+        )
+    for row in created:
+        row.quantity += quantities.get(row.stock_id, 0) - totals[row.stock_id]
+    StockDaily.objects.bulk_create(created, batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0005_stock_alerts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockDaily',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('quantity', models.IntegerField()),
+                ('delta', models.IntegerField(default=0)),
+                ('stock', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily', to='inventory.stock')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='stockdaily',
+            constraint=models.UniqueConstraint(fields=('stock', 'day'), name='stock_daily_unique'),
+        ),
+        migrations.RunPython(populate_daily, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 3.2.16 on 2026-10-18 14:54
+
+from django.db import migrations, models
+import django.utils.timezone
+
+from inventory.search import recreate_search_index
+
+
+# Los borrados anteriores no tienen fecha: se toma la de la migracion, asi
+# se archivan recien cuando pase el plazo de retencion
+def date_existing_deletes(apps, schema_editor):
+    Stock = apps.get_model("inventory", "Stock")
+    Stock.objects.filter(is_deleted=True, deleted_at__isnull=True).update(
+        deleted_at=django.utils.timezone.now()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0006_stock_daily'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stock',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='stock',
+            index=models.Index(condition=models.Q(('is_deleted', True)), fields=['deleted_at'], name='stock_deleted_idx'),
+        ),
+        migrations.RunPython(recreate_search_index, migrations.RunPython.noop),
+        migrations.RunPython(date_existing_deletes, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,142 @@
 from django.db import models
+from django.utils import timezone
+from core.models import SoftDeleteModel
 
 
-class Stock(models.Model):
+class Stock(SoftDeleteModel):
     id = models.AutoField(primary_key=True)
     name = models.CharField(max_length=30, unique=True, verbose_name="Name")
     quantity = models.IntegerField(default=1)
-    is_deleted = models.BooleanField(default=False)
+    # Por debajo de este nivel el producto figura como faltante
+    reorder_level = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # Listados y formularios: solo productos activos, ordenados por id
+            models.Index(
+                fields=["id"],
+                name="stock_active_idx",
+                condition=models.Q(is_deleted=False),
+            ),
+            # Grafico del dashboard: productos activos con mas stock
+            models.Index(
+                fields=["-quantity"],
+                name="stock_active_quantity_idx",
+                condition=models.Q(is_deleted=False),
+            ),
+            # Borrados pendientes de archivar (archive_deleted)
+            models.Index(
+                fields=["deleted_at"],
+                name="stock_deleted_idx",
+                condition=models.Q(is_deleted=True),
+            ),
+        ]
 
     def __str__(self):
         return self.name
+
+
+# Registro de solo escritura de cada cambio de cantidad de un producto
+class StockMovement(models.Model):
+    PRODUCTION = "production"
+    DISPATCH = "dispatch"
+    PRODUCTION_DELETE = "production-delete"
+    DISPATCH_DELETE = "dispatch-delete"
+    ADJUSTMENT = "adjustment"
+    REASON_CHOICES = [
+        (PRODUCTION, "Produccion"),
+        (DISPATCH, "Despacho"),
+        (PRODUCTION_DELETE, "Produccion eliminada"),
+        (DISPATCH_DELETE, "Despacho eliminado"),
+        (ADJUSTMENT, "Ajuste manual"),
+    ]
+
+    stock = models.ForeignKey(Stock, on_delete=models.CASCADE, related_name="movements")
+    quantity = models.IntegerField()
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    orderno = models.IntegerField(blank=True, null=True)
+    time = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["stock", "id"])]
+
+    def __str__(self):
+        return "%s %+d (%s)" % (self.stock_id, self.quantity, self.reason)
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Los movimientos de stock no se pueden modificar")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("Los movimientos de stock no se pueden borrar")
+
+
+# Cantidad acumulada de un producto hasta un movimiento del registro
+class StockSnapshot(models.Model):
+    stock = models.ForeignKey(Stock, on_delete=models.CASCADE, related_name="snapshots")
+    quantity = models.IntegerField()
+    last_movement_id = models.IntegerField()
+    time = models.DateTimeField()
+
+    class Meta:
+        indexes = [models.Index(fields=["stock", "time"])]
+
+    def __str__(self):
+        return "%s = %d (%s)" % (self.stock_id, self.quantity, self.time)
+
+
+# Faltantes actuales: una fila por producto activo con cantidad por debajo de
+# su nivel de reposicion. Se mantiene incrementalmente (ver alerts.py) para que
+# el dashboard no tenga que recorrer toda la tabla de productos.
+class StockShortfall(models.Model):
+    stock = models.OneToOneField(
+        Stock, on_delete=models.CASCADE, primary_key=True, related_name="shortfall"
+    )
+    quantity = models.IntegerField()
+    reorder_level = models.PositiveIntegerField()
+    shortfall = models.IntegerField()
+    since = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=["-shortfall"], name="shortfall_idx")]
+
+    def __str__(self):
+        return "%s: faltan %d" % (self.stock_id, self.shortfall)
+
+
+# Historial de alertas: se registra al entrar y al salir de faltante
+class StockAlert(models.Model):
+    LOW = "low"
+    RESTORED = "restored"
+    KIND_CHOICES = [
+        (LOW, "Bajo nivel de reposicion"),
+        (RESTORED, "Repuesto"),
+    ]
+
+    stock = models.ForeignKey(Stock, on_delete=models.CASCADE, related_name="alerts")
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    quantity = models.IntegerField()
+    reorder_level = models.PositiveIntegerField()
+    time = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return "%s %s (%d/%d)" % (self.stock_id, self.kind, self.quantity, self.reorder_level)
+
+
+# Serie diaria de cantidad por producto. Solo hay fila para los dias con
+# movimientos: la cantidad de un dia sin fila es la del ultimo dia anterior.
+class StockDaily(models.Model):
+    stock = models.ForeignKey(Stock, on_delete=models.CASCADE, related_name="daily")
+    day = models.DateField()
+    # Cantidad al cierre del dia y variacion neta del dia
+    quantity = models.IntegerField()
+    delta = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["stock", "day"], name="stock_daily_unique"),
+        ]
+
+    def __str__(self):
+        return "%s %s: %d" % (self.stock_id, self.day, self.quantity)
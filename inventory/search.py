@@ -0,0 +1,80 @@
+import sqlite3
+
+from django.db import connection
+from django.db.models import Case, IntegerField, When
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Length
+
+
+# Indice FTS5 con tokenizer trigram (SQLite >= 3.34): permite buscar
+# subcadenas de 3 o mas caracteres sin recorrer toda la tabla
+SEARCH_TABLE = "inventory_stock_search"
+MIN_QUERY_LENGTH = 3
+
+CREATE_SQL = [
+    "CREATE VIRTUAL TABLE %s USING fts5(name, tokenize='trigram')" % SEARCH_TABLE,
+    "INSERT INTO %s(rowid, name) SELECT id, name FROM inventory_stock WHERE NOT is_deleted"
+    % SEARCH_TABLE,
+    # Triggers para mantener el indice igual a los productos activos
+    """CREATE TRIGGER inventory_stock_search_ai AFTER INSERT ON inventory_stock
+    WHEN NOT new.is_deleted BEGIN
+        INSERT INTO %(t)s(rowid, name) VALUES (new.id, new.name);
+    END""" % {"t": SEARCH_TABLE},
+    """CREATE TRIGGER inventory_stock_search_au AFTER UPDATE OF name, is_deleted ON inventory_stock
+    BEGIN
+        DELETE FROM %(t)s WHERE rowid = old.id;
+        INSERT INTO %(t)s(rowid, name) SELECT new.id, new.name WHERE NOT new.is_deleted;
+    END""" % {"t": SEARCH_TABLE},
+    """CREATE TRIGGER inventory_stock_search_ad AFTER DELETE ON inventory_stock
+    BEGIN
+        DELETE FROM %(t)s WHERE rowid = old.id;
+    END""" % {"t": SEARCH_TABLE},
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS inventory_stock_search_ai",
+    "DROP TRIGGER IF EXISTS inventory_stock_search_au",
+    "DROP TRIGGER IF EXISTS inventory_stock_search_ad",
+    "DROP TABLE IF EXISTS %s" % SEARCH_TABLE,
+]
+
+
+def fts_supported(conn=connection):
+    return conn.vendor == "sqlite" and sqlite3.sqlite_version_info >= (3, 34, 0)
+
+
+# En SQLite, alterar inventory_stock recrea la tabla y pierde los triggers:
+# las migraciones que la modifiquen deben terminar con esta operacion
+def recreate_search_index(apps, schema_editor):
+    if fts_supported(schema_editor.connection):
+        for sql in DROP_SQL + CREATE_SQL:
+            schema_editor.execute(sql)
+
+
+# Frase FTS5 escapada: busca la cadena completa, no palabras sueltas
+def fts_phrase(query):
+    return '"%s"' % query.replace('"', '""')
+
+
+# Filtra productos por nombre y los ordena por relevancia:
+# nombre exacto, luego los que empiezan con la busqueda, luego el resto
+def search_stocks(queryset, query):
+    query = query.strip()
+    if not query:
+        return queryset
+    if fts_supported() and len(query) >= MIN_QUERY_LENGTH:
+        matches = RawSQL(
+            "SELECT rowid FROM %s WHERE %s MATCH %%s" % (SEARCH_TABLE, SEARCH_TABLE),
+            [fts_phrase(query)],
+        )
+        queryset = queryset.filter(pk__in=matches)
+    else:
+        queryset = queryset.filter(name__icontains=query)
+    return queryset.annotate(
+        search_rank=Case(
+            When(name__iexact=query, then=0),
+            When(name__istartswith=query, then=1),
+            default=2,
+            output_field=IntegerField(),
+        )
+    ).order_by("search_rank", Length("name"), "name")
@@ -0,0 +1,210 @@
+import logging
+from collections import defaultdict
+from django.db import connection, transaction
+from django.db.models import Case, Count, F, IntegerField, Max, Sum, Value, When
+from .history import record_daily
+from .models import Stock, StockMovement, StockSnapshot
+from .signals import stock_changed
+
+
+logger = logging.getLogger(__name__)
+
+# Sentido del movimiento: produccion suma stock, despacho resta
+STOCK_IN = 1
+STOCK_OUT = -1
+
+# Motivo registrado en el historial segun el sentido de la orden
+ORDER_REASONS = {
+    STOCK_IN: StockMovement.PRODUCTION,
+    STOCK_OUT: StockMovement.DISPATCH,
+}
+REVERT_REASONS = {
+    STOCK_IN: StockMovement.PRODUCTION_DELETE,
+    STOCK_OUT: StockMovement.DISPATCH_DELETE,
+}
+
+# Cantidad de movimientos a partir de la cual se toma una nueva foto del stock
+SNAPSHOT_INTERVAL = 500
+
+
+# Agrupa las cantidades por producto sumando las lineas repetidas
+def aggregate_quantities(items):
+    totals = defaultdict(int)
+    for item in items:
+        totals[item.stock_id] += item.quantity
+    return dict(totals)
+
+
+# Aplica todos los cambios de cantidad en un solo UPDATE con expresiones F()
+def update_quantities(totals, direction):
+    totals = {pk: qty for pk, qty in totals.items() if qty}
+    if not totals:
+        return 0
+    delta = Case(
+        *[When(pk=pk, then=Value(direction * qty)) for pk, qty in totals.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    stocks = Stock.objects.filter(pk__in=totals.keys())
+    updated = stocks.update(quantity=F("quantity") + delta)
+    notify_changed(totals)
+    return updated
+
+
+# Avisa a los receptores de stock_changed cuando se confirma la transaccion. La
+# orden ya quedo guardada: un receptor que falla se registra y no corta la vista
+def notify_changed(stock_ids):
+    stock_ids = list(stock_ids)
+    transaction.on_commit(lambda: send_changed(stock_ids))
+
+
+def send_changed(stock_ids):
+    for receiver, response in stock_changed.send_robust(sender=Stock, stock_ids=stock_ids):
+        if isinstance(response, Exception):
+            logger.error("Fallo el receptor de stock_changed %r", receiver, exc_info=response)
+
+
+# Lineas que piden mas de lo disponible: {stock_id: cantidad disponible}
+class InsufficientStock(Exception):
+    def __init__(self, available):
+        self.available = available
+        super().__init__("Stock insuficiente para los productos %s" % sorted(available))
+
+
+# Descuenta las cantidades solo si alcanza el stock de todos los productos.
+# Debe llamarse dentro de una transaccion: si falta alguno se lanza
+# InsufficientStock y el rollback deshace lo ya descontado.
+def reserve_quantities(totals):
+    totals = {pk: qty for pk, qty in totals.items() if qty}
+    if not totals:
+        return
+    if connection.features.has_select_for_update:
+        # Bloqueo de filas siempre en orden de id, asi dos ordenes con los
+        # mismos productos no pueden esperarse mutuamente (deadlock)
+        stocks = (
+            Stock.objects.select_for_update()
+            .filter(pk__in=totals.keys())
+            .order_by("pk")
+            .values_list("pk", "quantity")
+        )
+        available = {pk: quantity for pk, quantity in stocks if quantity < totals[pk]}
+        if available:
+            raise InsufficientStock(available)
+        update_quantities(totals, STOCK_OUT)
+        return
+    # SQLite no tiene bloqueo de filas pero serializa las escrituras: cada
+    # UPDATE condicional resta solo si la cantidad alcanza
+    available = {}
+    for pk in sorted(totals):
+        updated = Stock.objects.filter(pk=pk, quantity__gte=totals[pk]).update(
+            quantity=F("quantity") - totals[pk]
+        )
+        if not updated:
+            available[pk] = Stock.objects.filter(pk=pk).values_list("quantity", flat=True).first()
+    if available:
+        raise InsufficientStock(available)
+    notify_changed(totals)
+
+
+# Agrega al historial un movimiento por producto y actualiza la serie diaria
+def record_movements(totals, direction, reason, orderno=None):
+    movements = [
+        StockMovement(stock_id=pk, quantity=direction * qty, reason=reason, orderno=orderno)
+        for pk, qty in totals.items()
+        if qty
+    ]
+    record_daily({pk: direction * qty for pk, qty in totals.items()})
+    return StockMovement.objects.bulk_create(movements)
+
+
+# Registra un ajuste manual de cantidad (alta o edicion de un producto)
+def record_adjustment(stock, delta):
+    if delta:
+        StockMovement.objects.create(
+            stock=stock, quantity=delta, reason=StockMovement.ADJUSTMENT
+        )
+        record_daily({stock.pk: delta})
+
+
+# Guarda los items de una orden y mueve el stock en una sola transaccion.
+# Las salidas se reservan: si algun producto no alcanza no se guarda nada.
+# Una linea con cantidad no positiva invertiria el sentido de la orden.
+@transaction.atomic
+def add_order_items(order, items, direction):
+    items = list(items)
+    if not items:
+        return items
+    invalid = [item.quantity for item in items if item.quantity is None or item.quantity <= 0]
+    if invalid:
+        raise ValueError("Cantidad invalida en la orden: %s" % invalid[0])
+    for item in items:
+        item.orderno = order
+    type(items[0]).objects.bulk_create(items)
+    totals = aggregate_quantities(items)
+    if direction == STOCK_OUT:
+        reserve_quantities(totals)
+    else:
+        update_quantities(totals, direction)
+    record_movements(totals, direction, ORDER_REASONS[direction], order.pk)
+    return items
+
+
+# Revierte el movimiento de stock de los items de una orden que se va a borrar
+@transaction.atomic
+def revert_order_items(items, direction, orderno=None):
+    items = list(items)
+    totals = aggregate_quantities(items)
+    if not totals:
+        return items
+    # Los productos eliminados no se modifican
+    active = Stock.active.filter(pk__in=totals.keys())
+    totals = {pk: totals[pk] for pk in active.values_list("pk", flat=True)}
+    if orderno is None:
+        orderno = items[0].orderno_id
+    update_quantities(totals, -direction)
+    record_movements(totals, -direction, REVERT_REASONS[direction], orderno)
+    return items
+
+
+# Cantidad de un producto en un momento dado: ultima foto anterior mas los
+# movimientos posteriores a ella
+def quantity_at(stock, when):
+    snapshot = (
+        StockSnapshot.objects.filter(stock=stock, time__lte=when)
+        .order_by("-last_movement_id")
+        .first()
+    )
+    tail = StockMovement.objects.filter(stock=stock, time__lte=when)
+    base = 0
+    if snapshot is not None:
+        tail = tail.filter(id__gt=snapshot.last_movement_id)
+        base = snapshot.quantity
+    return base + (tail.aggregate(total=Sum("quantity"))["total"] or 0)
+
+
+# Toma una foto de cada producto con al menos --interval-- movimientos desde
+# la ultima, para que quantity_at solo sume una cola acotada de movimientos
+def take_snapshots(interval=SNAPSHOT_INTERVAL, chunk_size=2000):
+    created = 0
+    for stock_id in Stock.objects.values_list("pk", flat=True).iterator(chunk_size):
+        last = (
+            StockSnapshot.objects.filter(stock_id=stock_id)
+            .order_by("-last_movement_id")
+            .values("quantity", "last_movement_id")
+            .first()
+        ) or {"quantity": 0, "last_movement_id": 0}
+        tail = StockMovement.objects.filter(
+            stock_id=stock_id, id__gt=last["last_movement_id"]
+        ).aggregate(
+            count=Count("id"), total=Sum("quantity"), last_id=Max("id"), last_time=Max("time")
+        )
+        if tail["count"] < interval:
+            continue
+        StockSnapshot.objects.create(
+            stock_id=stock_id,
+            quantity=last["quantity"] + tail["total"],
+            last_movement_id=tail["last_id"],
+            time=tail["last_time"],
+        )
+        created += 1
+    return created
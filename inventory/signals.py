@@ -0,0 +1,9 @@
+from django.dispatch import Signal
+
+
+# Se envia (al confirmar la transaccion) cuando cambian cantidades de stock
+# con UPDATE masivos, que no disparan post_save. Argumento: stock_ids
+stock_changed = Signal()
+
+# Se envia cuando cambia la tabla de faltantes (alta, baja o nueva cantidad)
+shortfalls_changed = Signal()
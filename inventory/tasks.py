@@ -0,0 +1,25 @@
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+
+from jobs.queue import task
+from .services import SNAPSHOT_INTERVAL, take_snapshots as take_stock_snapshots
+
+
+# Tareas en segundo plano de inventario (ver jobs.queue)
+@task()
+def take_snapshots(interval=SNAPSHOT_INTERVAL):
+    return {"created": take_stock_snapshots(interval)}
+
+
+# Recalcula el stock contra el historial de movimientos. Las diferencias son
+# parte del resultado, no un error que deba reintentarse.
+@task(timeout=3600)
+def check_stock_ledger(repair=False):
+    out = StringIO()
+    try:
+        call_command("check_stock_ledger", repair=repair, stdout=out)
+        consistent = True
+    except CommandError:
+        consistent = False
+    return {"consistent": consistent, "output": out.getvalue()}
@@ -1,3 +1,763 @@
-from django.test import TestCase
+import datetime
+import os
+import tempfile
+import threading
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.db.migrations.recorder import MigrationRecorder
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
 
-# Create your tests here.
+from operations.models import (
+    ProductionMachine,
+    ProductionOrder,
+    ProductionItem,
+    DispatchOrder,
+    DispatchItem,
+)
+from .alerts import evaluate_stocks
+from .history import daily_series, rebuild_daily, record_daily
+from .models import (
+    Stock,
+    StockAlert,
+    StockDaily,
+    StockMovement,
+    StockShortfall,
+    StockSnapshot,
+)
+from .search import search_stocks
+from .signals import stock_changed
+from .services import (
+    STOCK_IN,
+    STOCK_OUT,
+    InsufficientStock,
+    aggregate_quantities,
+    add_order_items,
+    revert_order_items,
+    update_quantities,
+    record_adjustment,
+    quantity_at,
+    take_snapshots,
+)
+
+
+class StockServiceTest(TestCase):
+    def setUp(self):
+        self.machine = ProductionMachine.objects.create(name="Equipo 1")
+        self.stock_a = Stock.objects.create(name="Producto A", quantity=10)
+        self.stock_b = Stock.objects.create(name="Producto B", quantity=10)
+
+    def dispatch_order(self):
+        return DispatchOrder.objects.create(
+            name="Cliente", phone="1234567890", address="Calle 1", email="a@b.com"
+        )
+
+    def test_aggregate_duplicate_lines(self):
+        items = [
+            ProductionItem(stock=self.stock_a, quantity=2),
+            ProductionItem(stock=self.stock_b, quantity=1),
+            ProductionItem(stock=self.stock_a, quantity=3),
+        ]
+        self.assertEqual(
+            aggregate_quantities(items), {self.stock_a.pk: 5, self.stock_b.pk: 1}
+        )
+
+    def test_add_production_items(self):
+        order = ProductionOrder.objects.create(machine=self.machine)
+        items = [
+            ProductionItem(stock=self.stock_a, quantity=2),
+            ProductionItem(stock=self.stock_a, quantity=3),
+            ProductionItem(stock=self.stock_b, quantity=4),
+        ]
+        with self.assertNumQueries(7):
+            add_order_items(order, items, STOCK_IN)
+        self.assertEqual(order.productionorderno.count(), 3)
+        self.stock_a.refresh_from_db()
+        self.stock_b.refresh_from_db()
+        self.assertEqual(self.stock_a.quantity, 15)
+        self.assertEqual(self.stock_b.quantity, 14)
+
+    def test_dispatch_and_revert(self):
+        order = self.dispatch_order()
+        add_order_items(
+            order,
+            [
+                DispatchItem(stock=self.stock_a, quantity=4),
+                DispatchItem(stock=self.stock_b, quantity=1),
+            ],
+            STOCK_OUT,
+        )
+        self.stock_a.refresh_from_db()
+        self.assertEqual(self.stock_a.quantity, 6)
+
+        Stock.objects.filter(pk=self.stock_b.pk).update(is_deleted=True)
+        revert_order_items(order.dispatchorderno.all(), STOCK_OUT)
+        self.stock_a.refresh_from_db()
+        self.stock_b.refresh_from_db()
+        self.assertEqual(self.stock_a.quantity, 10)
+        # Los productos eliminados no se modifican
+        self.assertEqual(self.stock_b.quantity, 9)
+
+    def test_dispatch_rejects_oversell(self):
+        order = self.dispatch_order()
+        items = [
+            DispatchItem(stock=self.stock_a, quantity=6),
+            DispatchItem(stock=self.stock_b, quantity=4),
+            DispatchItem(stock=self.stock_a, quantity=6),
+        ]
+        with self.assertRaises(InsufficientStock) as ctx:
+            add_order_items(order, items, STOCK_OUT)
+        self.assertEqual(ctx.exception.available, {self.stock_a.pk: 10})
+        # No se desconto nada ni quedaron items o movimientos
+        self.assertEqual(
+            list(Stock.objects.order_by("pk").values_list("quantity", flat=True)), [10, 10]
+        )
+        self.assertFalse(order.dispatchorderno.exists())
+        self.assertFalse(StockMovement.objects.exists())
+
+        add_order_items(order, [DispatchItem(stock=self.stock_a, quantity=10)], STOCK_OUT)
+        self.stock_a.refresh_from_db()
+        self.assertEqual(self.stock_a.quantity, 0)
+
+
+    def test_non_positive_lines_are_rejected(self):
+        order = self.dispatch_order()
+        for direction in (STOCK_OUT, STOCK_IN):
+            items = [
+                DispatchItem(stock=self.stock_a, quantity=2),
+                DispatchItem(stock=self.stock_b, quantity=-5),
+            ]
+            with self.assertRaises(ValueError):
+                add_order_items(order, items, direction)
+        self.assertEqual(
+            list(Stock.objects.order_by("pk").values_list("quantity", flat=True)), [10, 10]
+        )
+        self.assertFalse(order.dispatchorderno.exists())
+        self.assertFalse(StockMovement.objects.exists())
+        self.assertFalse(StockDaily.objects.exists())
+
+# Muchos despachos simultaneos desde hilos, cada uno con su conexion a la base
+class StockReservationConcurrencyTest(TransactionTestCase):
+    THREADS = 16
+
+    def dispatch(self, stocks, quantity, results):
+        try:
+            with transaction.atomic():
+                order = DispatchOrder.objects.create(
+                    name="Cliente", phone="1234567890", address="Calle 1", email="a@b.com"
+                )
+                items = [DispatchItem(stock=stock, quantity=quantity) for stock in stocks]
+                add_order_items(order, items, STOCK_OUT)
+            results.append(True)
+        except InsufficientStock:
+            results.append(False)
+        except Exception as exc:
+            results.append(exc)
+        finally:
+            connection.close()
+
+    def test_concurrent_dispatches_never_oversell(self):
+        scarce = Stock.objects.create(name="Producto A", quantity=50)
+        plenty = Stock.objects.create(name="Producto B", quantity=1000)
+        results = []
+        threads = [
+            # La mitad pide los productos en orden inverso
+            threading.Thread(
+                target=self.dispatch,
+                args=([scarce, plenty] if i % 2 else [plenty, scarce], 5, results),
+            )
+            for i in range(self.THREADS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([r for r in results if r not in (True, False)], [])
+        self.assertEqual(results.count(True), 10)
+        scarce.refresh_from_db()
+        plenty.refresh_from_db()
+        self.assertEqual(scarce.quantity, 0)
+        self.assertEqual(plenty.quantity, 1000 - 50)
+        self.assertEqual(DispatchOrder.objects.count(), 10)
+        totals = dict(
+            StockMovement.objects.values_list("stock").annotate(total=Sum("quantity"))
+        )
+        self.assertEqual(totals, {scarce.pk: -50, plenty.pk: -50})
+
+
+class StockLedgerTest(TestCase):
+    def setUp(self):
+        self.machine = ProductionMachine.objects.create(name="Equipo 1")
+        self.stock = Stock.objects.create(name="Producto A", quantity=10)
+        record_adjustment(self.stock, 10)
+
+    def produce(self, quantity):
+        order = ProductionOrder.objects.create(machine=self.machine)
+        add_order_items(order, [ProductionItem(stock=self.stock, quantity=quantity)], STOCK_IN)
+        return order
+
+    def test_movements_recorded(self):
+        order = self.produce(5)
+        revert_order_items(order.productionorderno.all(), STOCK_IN)
+        reasons = list(
+            StockMovement.objects.order_by("id").values_list("reason", "quantity", "orderno")
+        )
+        self.assertEqual(
+            reasons,
+            [
+                (StockMovement.ADJUSTMENT, 10, None),
+                (StockMovement.PRODUCTION, 5, order.pk),
+                (StockMovement.PRODUCTION_DELETE, -5, order.pk),
+            ],
+        )
+
+    def test_movements_are_append_only(self):
+        movement = StockMovement.objects.first()
+        movement.quantity = 100
+        with self.assertRaises(ValueError):
+            movement.save()
+        # Tampoco se editan ni borran desde el admin (el borrado masivo no
+        # pasa por StockMovement.delete)
+        admin = User.objects.create_superuser(username="admin", password="secret")
+        self.client.force_login(admin)
+        url = reverse("admin:inventory_stockmovement_changelist")
+        self.client.post(
+            url, {"action": "delete_selected", "_selected_action": [movement.pk], "post": "yes"}
+        )
+        self.assertTrue(StockMovement.objects.filter(pk=movement.pk).exists())
+        url = reverse("admin:inventory_stockmovement_delete", args=[movement.pk])
+        self.assertEqual(self.client.post(url, {"post": "yes"}).status_code, 403)
+        url = reverse("admin:inventory_stockmovement_change", args=[movement.pk])
+        response = self.client.get(url)
+        self.assertNotContains(response, 'name="_save"')
+
+    def test_quantity_at_uses_snapshots(self):
+        for _ in range(4):
+            self.produce(1)
+        self.assertEqual(take_snapshots(interval=3), 1)
+        self.assertEqual(take_snapshots(interval=3), 0)
+        snapshot = StockSnapshot.objects.get()
+        self.assertEqual(snapshot.quantity, 14)
+        self.produce(2)
+
+        now = timezone.now()
+        with self.assertNumQueries(2):
+            self.assertEqual(quantity_at(self.stock, now), 16)
+        StockMovement.objects.update(time=now - timedelta(days=2))
+        StockSnapshot.objects.update(time=now - timedelta(days=2))
+        self.assertEqual(quantity_at(self.stock, now - timedelta(days=3)), 0)
+
+    def test_check_command(self):
+        self.produce(3)
+        out = StringIO()
+        call_command("check_stock_ledger", stdout=out)
+        self.assertIn("0 con diferencias", out.getvalue())
+
+        Stock.objects.filter(pk=self.stock.pk).update(quantity=50)
+        with self.assertRaises(CommandError):
+            call_command("check_stock_ledger", stdout=StringIO())
+        call_command("check_stock_ledger", "--repair", stdout=StringIO())
+        call_command("check_stock_ledger", stdout=StringIO())
+
+
+class StockViewLedgerTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="secret")
+        self.client.force_login(self.user)
+
+    def test_create_and_edit_record_adjustments(self):
+        self.client.post(reverse("new-stock"), {"name": "Producto A", "quantity": 7})
+        stock = Stock.objects.get(name="Producto A")
+        self.client.post(reverse("edit-stock", args=[stock.pk]), {"name": "Producto A", "quantity": 4})
+        self.assertEqual(
+            list(stock.movements.order_by("id").values_list("quantity", flat=True)), [7, -3]
+        )
+
+
+class StockAlertTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="secret")
+        self.client.force_login(self.user)
+        self.stock = Stock.objects.create(name="Producto A", quantity=10, reorder_level=5)
+        self.other = Stock.objects.create(name="Producto B", quantity=10, reorder_level=5)
+
+    def dispatch(self, stock, quantity):
+        order = DispatchOrder.objects.create(
+            name="Cliente", phone="1234567890", address="Calle 1", email="a@b.com"
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            add_order_items(order, [DispatchItem(stock=stock, quantity=quantity)], STOCK_OUT)
+        return order
+
+    def alert_kinds(self, stock):
+        return list(stock.alerts.order_by("id").values_list("kind", flat=True))
+
+    def test_dispatch_below_level_and_restore(self):
+        order = self.dispatch(self.stock, 7)
+        shortfall = StockShortfall.objects.get(stock=self.stock)
+        self.assertEqual((shortfall.quantity, shortfall.shortfall), (3, 2))
+        self.assertEqual(self.alert_kinds(self.stock), [StockAlert.LOW])
+
+        # Seguir bajando actualiza el faltante sin repetir la alerta
+        self.dispatch(self.stock, 3)
+        self.assertEqual(StockShortfall.objects.get(stock=self.stock).shortfall, 5)
+        self.assertEqual(self.alert_kinds(self.stock), [StockAlert.LOW])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            revert_order_items(order.dispatchorderno.all(), STOCK_OUT, order.pk)
+        self.assertFalse(StockShortfall.objects.filter(stock=self.stock).exists())
+        self.assertEqual(self.alert_kinds(self.stock), [StockAlert.LOW, StockAlert.RESTORED])
+
+    def test_only_touched_stocks_are_evaluated(self):
+        # Un cambio fuera de la aplicacion no se detecta hasta recalcular todo
+        Stock.objects.filter(pk=self.other.pk).update(quantity=1)
+        self.dispatch(self.stock, 1)
+        self.assertFalse(StockShortfall.objects.exists())
+        out = StringIO()
+        call_command("evaluate_stock_alerts", stdout=out)
+        self.assertEqual(list(StockShortfall.objects.values_list("stock", flat=True)), [self.other.pk])
+        self.assertIn("1 faltantes actuales", out.getvalue())
+
+    def test_threshold_edit_and_delete(self):
+        self.client.post(
+            reverse("edit-stock", args=[self.stock.pk]),
+            {"name": "Producto A", "quantity": 10, "reorder_level": 20},
+        )
+        self.assertEqual(StockShortfall.objects.get(stock=self.stock).shortfall, 10)
+        self.client.post(reverse("delete-stock", args=[self.stock.pk]))
+        self.assertFalse(StockShortfall.objects.exists())
+
+    def test_default_level_flags_negative_stock(self):
+        stock = Stock.objects.create(name="Producto C", quantity=0)
+        production = ProductionOrder.objects.create(
+            machine=ProductionMachine.objects.create(name="Equipo 1")
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            add_order_items(production, [ProductionItem(stock=stock, quantity=3)], STOCK_IN)
+        self.dispatch(stock, 2)
+        # Borrar la produccion ya despachada deja el stock negativo
+        with self.captureOnCommitCallbacks(execute=True):
+            revert_order_items(production.productionorderno.all(), STOCK_IN, production.pk)
+        self.assertEqual(StockShortfall.objects.get(stock=stock).shortfall, 2)
+        self.assertEqual(evaluate_stocks(), 0)
+
+    def test_existing_shortfall_is_not_inserted_twice(self):
+        # Otra evaluacion ya registro el faltante entre la lectura y la escritura
+        Stock.objects.filter(pk=self.stock.pk).update(quantity=1)
+        StockShortfall.objects.create(
+            stock=self.stock, quantity=1, reorder_level=5, shortfall=4, since=timezone.now()
+        )
+        self.assertEqual(evaluate_stocks([self.stock.pk]), 0)
+        with mock.patch.object(StockShortfall.objects, "all", return_value=StockShortfall.objects.none()):
+            self.assertEqual(evaluate_stocks([self.stock.pk]), 1)
+        self.assertEqual(StockShortfall.objects.count(), 1)
+
+    def test_failing_receiver_does_not_break_the_order(self):
+        def broken(sender, **kwargs):
+            raise RuntimeError("fallo")
+
+        stock_changed.connect(broken, dispatch_uid="broken_receiver")
+        self.addCleanup(stock_changed.disconnect, dispatch_uid="broken_receiver")
+        with self.assertLogs("inventory.services", "ERROR"):
+            self.dispatch(self.stock, 7)
+        self.assertEqual(Stock.objects.get(pk=self.stock.pk).quantity, 3)
+        self.assertTrue(StockShortfall.objects.filter(stock=self.stock).exists())
+
+    def test_dashboard_widget(self):
+        cache.clear()
+        self.dispatch(self.stock, 8)
+        response = self.client.get("/")
+        self.assertEqual(response.context["shortfall_count"], 1)
+        self.assertContains(response, "Faltantes (1)")
+        self.dispatch(self.other, 9)
+        response = self.client.get("/")
+        self.assertEqual(
+            [item.stock for item in response.context["shortfalls"]], [self.other, self.stock]
+        )
+
+
+class StockHistoryTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="tester", password="secret")
+        self.client.force_login(self.user)
+        self.stock = Stock.objects.create(name="Producto A", quantity=0)
+        self.other = Stock.objects.create(name="Producto B", quantity=7)
+
+    def set_daily(self, stock, rows):
+        StockDaily.objects.bulk_create(
+            StockDaily(stock=stock, day=datetime.date(2023, 5, day), quantity=quantity, delta=delta)
+            for day, quantity, delta in rows
+        )
+
+    def test_orders_update_today(self):
+        machine = ProductionMachine.objects.create(name="Equipo 1")
+        production = ProductionOrder.objects.create(machine=machine)
+        add_order_items(production, [ProductionItem(stock=self.stock, quantity=10)], STOCK_IN)
+        dispatch = DispatchOrder.objects.create(
+            name="Cliente", phone="1234567890", address="Calle 1", email="a@b.com"
+        )
+        add_order_items(dispatch, [DispatchItem(stock=self.stock, quantity=4)], STOCK_OUT)
+        daily = StockDaily.objects.get(stock=self.stock)
+        self.assertEqual((daily.day, daily.quantity, daily.delta), (timezone.localdate(), 6, 6))
+
+        incremental = list(StockDaily.objects.values_list("stock", "day", "quantity", "delta"))
+        rebuild_daily()
+        self.assertEqual(
+            list(StockDaily.objects.values_list("stock", "day", "quantity", "delta")), incremental
+        )
+
+    def test_backdated_day_shifts_later_closings(self):
+        self.set_daily(self.stock, [(2, 5, 5), (8, 9, 4)])
+        Stock.objects.filter(pk=self.stock.pk).update(quantity=12)
+        record_daily({self.stock.pk: 3}, datetime.date(2023, 5, 5))
+        self.assertEqual(
+            list(self.stock.daily.order_by("day").values_list("day__day", "quantity", "delta")),
+            [(2, 5, 5), (5, 8, 3), (8, 12, 4)],
+        )
+
+    def test_rebuild_anchors_to_current_quantity(self):
+        # 5 unidades cargadas antes de existir el historial
+        Stock.objects.filter(pk=self.stock.pk).update(quantity=8)
+        for day, quantity in ((1, 4), (1, -1), (3, 0), (6, 2), (6, -2)):
+            StockMovement.objects.create(
+                stock=self.stock,
+                quantity=quantity,
+                reason=StockMovement.ADJUSTMENT,
+                time=timezone.make_aware(datetime.datetime(2023, 5, day, 12)),
+            )
+        rebuild_daily()
+        self.assertEqual(
+            list(self.stock.daily.order_by("day").values_list("day__day", "quantity", "delta")),
+            [(1, 8, 3), (3, 8, 0), (6, 8, 0)],
+        )
+
+    def test_downsampled_series(self):
+        self.set_daily(self.stock, [(2, 5, 5), (3, 9, 4), (8, 1, -8)])
+        self.set_daily(self.other, [(12, 7, 3)])
+        data = daily_series(
+            [self.stock.pk, self.other.pk], datetime.date(2023, 5, 1), datetime.date(2023, 5, 10), 4
+        )
+        self.assertEqual(data["step"], 3)
+        self.assertEqual(data["days"], [datetime.date(2023, 5, d) for d in (3, 6, 9, 10)])
+        self.assertEqual(
+            [(serie["name"], serie["points"]) for serie in data["series"]],
+            [("Producto A", [9, 9, 1, 1]), ("Producto B", [4, 4, 4, 4])],
+        )
+        # Desde una fecha posterior parte del ultimo cierre anterior
+        start, end = datetime.date(2023, 5, 20), datetime.date(2023, 5, 21)
+        data = daily_series([self.stock.pk], start, end, 10)
+        self.assertEqual(data["series"][0]["points"], [1, 1])
+
+    def test_history_view(self):
+        self.set_daily(self.stock, [(2, 5, 5)])
+        url = reverse("stock-history")
+        params = {"stocks": "%d" % self.stock.pk, "start": "2023-05-01", "end": "2023-05-04"}
+        response = self.client.get(url, params)
+        self.assertEqual(response.json()["series"][0]["points"], [0, 5, 5, 5])
+        # Cacheada: solo las consultas de sesion y usuario
+        with self.assertNumQueries(2):
+            self.client.get(url, params)
+        self.assertEqual(self.client.get(url, {"stocks": "a,b"}).status_code, 400)
+        self.assertEqual(
+            self.client.get(url, {"start": "2023-05-04", "end": "2023-05-01"}).status_code, 400
+        )
+        names = [serie["name"] for serie in self.client.get(url).json()["series"]]
+        self.assertEqual(names, ["Producto A", "Producto B"])
+
+
+class StockListKeysetTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="secret")
+        self.client.force_login(self.user)
+        for i in range(15):
+            Stock.objects.create(name="Producto %02d" % i)
+        Stock.objects.create(name="Otro")
+
+    def test_filter_kept_between_pages(self):
+        response = self.client.get(reverse("inventory") + "?name=Producto&cursor=")
+        page = response.context["page_obj"]
+        self.assertTrue(page.has_next())
+        self.assertIn("name=Producto", page.next_querystring)
+        response = self.client.get(reverse("inventory") + page.next_querystring)
+        names = [stock.name for stock in response.context["page_obj"]]
+        self.assertEqual(names, ["Producto %02d" % i for i in range(10, 15)])
+
+
+class StockListCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="tester", password="secret")
+        self.client.force_login(self.user)
+        self.stock = Stock.objects.create(name="Producto A", quantity=5)
+
+    def names(self):
+        response = self.client.get(reverse("inventory"))
+        return {stock.name: stock.quantity for stock in response.context["object_list"]}
+
+    def test_cached_page_skips_queries(self):
+        self.names()
+        # Solo sesion y usuario
+        with self.assertNumQueries(2):
+            self.assertEqual(self.names(), {"Producto A": 5})
+
+    def test_never_stale_after_writes(self):
+        self.assertEqual(self.names(), {"Producto A": 5})
+        self.client.post(reverse("new-stock"), {"name": "Producto B", "quantity": 3})
+        self.assertEqual(self.names(), {"Producto A": 5, "Producto B": 3})
+        self.client.post(
+            reverse("edit-stock", args=[self.stock.pk]), {"name": "Producto A", "quantity": 9}
+        )
+        self.assertEqual(self.names()["Producto A"], 9)
+        machine = ProductionMachine.objects.create(name="Equipo 1")
+        order = ProductionOrder.objects.create(machine=machine)
+        with self.captureOnCommitCallbacks(execute=True):
+            add_order_items(order, [ProductionItem(stock=self.stock, quantity=1)], STOCK_IN)
+        self.assertEqual(self.names()["Producto A"], 10)
+        self.client.post(reverse("delete-stock", args=[self.stock.pk]))
+        self.assertEqual(self.names(), {"Producto B": 3})
+
+    def test_filters_cached_separately(self):
+        Stock.objects.create(name="Otro", quantity=1)
+        response = self.client.get(reverse("inventory"), {"name": "Otro"})
+        self.assertEqual([stock.name for stock in response.context["object_list"]], ["Otro"])
+        self.assertEqual(len(self.names()), 2)
+
+
+class StockSearchTest(TestCase):
+    def setUp(self):
+        for name in ["Cubierta 300", "Rueda cubierta", "Cubierta", "Llanta 12", "Cubierta 3000"]:
+            Stock.objects.create(name=name)
+        Stock.objects.create(name="Cubierta vieja", is_deleted=True)
+
+    def names(self, query):
+        queryset = search_stocks(Stock.objects.filter(is_deleted=False), query)
+        return [stock.name for stock in queryset]
+
+    def test_ranked_substring_matches(self):
+        self.assertEqual(
+            self.names("cubierta"),
+            ["Cubierta", "Cubierta 300", "Cubierta 3000", "Rueda cubierta"],
+        )
+
+    def test_short_queries_fall_back_to_like(self):
+        self.assertEqual(self.names("12"), ["Llanta 12"])
+
+    def test_index_follows_updates_and_soft_delete(self):
+        stock = Stock.objects.get(name="Llanta 12")
+        stock.name = "Llanta 14"
+        stock.save()
+        self.assertEqual(self.names("llanta 14"), ["Llanta 14"])
+        stock.is_deleted = True
+        stock.save()
+        self.assertEqual(search_stocks(Stock.objects.all(), "llanta").count(), 0)
+        self.assertEqual(search_stocks(Stock.objects.all(), "vieja").count(), 0)
+
+    def test_inventory_view_uses_search(self):
+        user = User.objects.create_user(username="tester", password="secret")
+        self.client.force_login(user)
+        response = self.client.get(reverse("inventory") + "?name=rueda")
+        self.assertEqual([s.name for s in response.context["object_list"]], ["Rueda cubierta"])
+
+
+class StockLookupTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="tester", password="secret")
+        self.client.force_login(self.user)
+        for i in range(25):
+            Stock.objects.create(name="Producto %02d" % i, quantity=i)
+        Stock.objects.create(name="Producto borrado", is_deleted=True)
+
+    def test_paginated_results(self):
+        data = self.client.get(reverse("stock-lookup")).json()
+        self.assertEqual(len(data["results"]), 20)
+        self.assertTrue(data["more"])
+        self.assertEqual(data["results"][0], {"id": 1, "name": "Producto 00", "quantity": 0})
+        data = self.client.get(reverse("stock-lookup") + "?page=2").json()
+        self.assertEqual(len(data["results"]), 5)
+        self.assertFalse(data["more"])
+
+    def test_search_and_cache_invalidation(self):
+        url = reverse("stock-lookup") + "?q=producto 07"
+        self.assertEqual(self.client.get(url).json()["results"][0]["quantity"], 7)
+        stock = Stock.objects.get(name="Producto 07")
+        with self.captureOnCommitCallbacks(execute=True):
+            update_quantities({stock.pk: 5}, STOCK_IN)
+        self.assertEqual(self.client.get(url).json()["results"][0]["quantity"], 12)
+        stock.refresh_from_db()
+        stock.is_deleted = True
+        stock.save()
+        self.assertEqual(self.client.get(url).json()["results"], [])
+
+    @override_settings(ASYNC_PARALLEL_QUERIES=False)
+    def test_async_view_matches_sync_view(self):
+        for params in ("", "?page=2", "?q=producto 07", "?page=x"):
+            expected = self.client.get(reverse("stock-lookup") + params).json()
+            cache.clear()
+            response = self.client.get(reverse("stock-lookup-async") + params)
+            self.assertEqual(response.json(), expected, params)
+
+    def test_item_form_renders_only_selected_stock(self):
+        from operations.forms import DispatchItemForm
+
+        html = str(DispatchItemForm()["stock"])
+        self.assertIn('data-lookup-url="%s"' % reverse("stock-lookup"), html)
+        self.assertNotIn("Producto 00", html)
+        stock = Stock.objects.get(name="Producto 03")
+        form = DispatchItemForm(data={"stock": stock.pk, "quantity": 1})
+        # Una consulta por id del producto y otra de la validacion del modelo
+        with self.assertNumQueries(2):
+            self.assertTrue(form.is_valid())
+        self.assertIn("Producto 03", str(form["stock"]))
+        self.assertNotIn("Producto 04", str(form["stock"]))
+        deleted = Stock.objects.get(name="Producto borrado")
+        self.assertFalse(DispatchItemForm(data={"stock": deleted.pk, "quantity": 1}).is_valid())
+
+
+class StockImportExportTest(TestCase):
+    def write(self, name, content):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, "w") as fh:
+            fh.write(content)
+        return path
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        record_adjustment(Stock.objects.create(name="Existente", quantity=5), 5)
+
+    def test_import_csv_upserts_and_reports_bad_rows(self):
+        path = self.write(
+            "stock.csv",
+            "name,quantity,is_deleted\nNuevo,3,\nExistente,8,\n,4,\nMalo,abc,\nNuevo,6,\n",
+        )
+        out, err = StringIO(), StringIO()
+        call_command("import_stock", path, "--batch-size", "2", stdout=out, stderr=err)
+        self.assertIn("Linea 4: falta el nombre", err.getvalue())
+        self.assertIn("Linea 5: cantidad invalida", err.getvalue())
+        self.assertIn("5 filas procesadas", out.getvalue())
+        self.assertEqual(Stock.objects.get(name="Nuevo").quantity, 6)
+        self.assertEqual(Stock.objects.get(name="Existente").quantity, 8)
+        call_command(
+            "import_stock",
+            self.write("stock.jsonl", '{"name": "Existente", "quantity": 2}\n'),
+            stdout=StringIO(),
+        )
+        self.assertEqual(Stock.objects.get(name="Existente").quantity, 2)
+        # El historial queda consistente con las cantidades importadas
+        out = StringIO()
+        call_command("check_stock_ledger", stdout=out)
+        self.assertIn("0 con diferencias", out.getvalue())
+
+    def test_import_updates_daily_series(self):
+        call_command(
+            "import_stock",
+            self.write("stock.csv", "name,quantity,is_deleted\nNuevo,3,\nExistente,8,\n"),
+            stdout=StringIO(),
+        )
+        today = timezone.localdate()
+        self.assertEqual(
+            sorted(StockDaily.objects.values_list("stock__name", "day", "quantity", "delta")),
+            [("Existente", today, 8, 8), ("Nuevo", today, 3, 3)],
+        )
+
+    def test_export_round_trip(self):
+        Stock.objects.create(name="Borrado", quantity=1, is_deleted=True)
+        out = StringIO()
+        call_command("export_stock", "--format", "jsonl", stdout=out)
+        self.assertEqual(out.getvalue(), '{"name":"Existente","quantity":5,"is_deleted":false}\n')
+        path = os.path.join(self.tmpdir.name, "all.csv")
+        call_command("export_stock", "--include-deleted", "--output", path, stdout=StringIO())
+        Stock.objects.all().delete()
+        call_command("import_stock", path, stdout=StringIO())
+        self.assertEqual(
+            sorted(Stock.objects.values_list("name", "quantity", "is_deleted")),
+            [("Borrado", 1, True), ("Existente", 5, False)],
+        )
+
+
+class SoftDeleteTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="secret")
+        self.client.force_login(self.user)
+        self.kept = Stock.objects.create(name="Activo", quantity=1)
+        self.stock = Stock.objects.create(name="Borrar", quantity=1)
+
+    def test_delete_view_marks_date(self):
+        self.client.post(reverse("delete-stock", args=[self.stock.pk]))
+        self.stock.refresh_from_db()
+        self.assertTrue(self.stock.is_deleted)
+        self.assertIsNotNone(self.stock.deleted_at)
+        self.assertEqual(list(Stock.active.all()), [self.kept])
+        self.assertEqual(Stock.objects.count(), 2)
+        self.assertEqual(list(Stock.objects.deleted(timezone.now())), [self.stock])
+        self.assertFalse(Stock.objects.deleted(self.stock.deleted_at).exists())
+
+    def test_deleted_stock_cannot_be_edited_or_deleted_again(self):
+        self.stock.soft_delete()
+        response = self.client.get(reverse("edit-stock", args=[self.stock.pk]))
+        self.assertEqual(response.status_code, 404)
+        response = self.client.post(reverse("delete-stock", args=[self.stock.pk]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_active_queries_use_partial_indexes(self):
+        plan = Stock.active.order_by("id")[:10].explain()
+        self.assertIn("stock_active_idx", plan)
+        plan = Stock.objects.deleted(timezone.now()).order_by("deleted_at").explain()
+        self.assertIn("stock_deleted_idx", plan)
+
+    def test_import_keeps_original_delete_date(self):
+        self.stock.soft_delete()
+        deleted_at = self.stock.deleted_at
+        path = os.path.join(tempfile.mkdtemp(), "stock.csv")
+        self.addCleanup(os.remove, path)
+        with open(path, "w") as fh:
+            fh.write("name,quantity,is_deleted\nBorrar,1,1\nActivo,1,1\n")
+        call_command("import_stock", path, stdout=StringIO())
+        self.stock.refresh_from_db()
+        self.assertEqual(self.stock.deleted_at, deleted_at)
+        self.assertIsNotNone(Stock.objects.get(name="Activo").deleted_at)
+
+
+# Una base creada antes de las migraciones (solo tablas base, sin historial)
+# se actualiza con migrate --fake-initial
+class BaselineUpgradeTest(TransactionTestCase):
+    def test_fake_initial_upgrades_baseline_schema(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate([("inventory", None), ("operations", None)])
+        executor = MigrationExecutor(connection)
+        executor.migrate([("inventory", "0001_initial"), ("operations", "0001_initial")])
+        MigrationRecorder(connection).migration_qs.filter(app__in=["inventory", "operations"]).delete()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO inventory_stock (name, quantity, is_deleted) VALUES ('Base', 3, 0), ('Viejo', 1, 1)"
+            )
+
+        call_command("migrate", fake_initial=True, verbosity=0)
+
+        applied = MigrationRecorder(connection).applied_migrations()
+        self.assertIn(("inventory", "0007_stock_deleted_at"), applied)
+        self.assertIn(("operations", "0006_machine_deleted_at"), applied)
+        self.assertEqual(list(Stock.active.values_list("name", "quantity")), [("Base", 3)])
+        self.assertIsNotNone(Stock.objects.get(name="Viejo").deleted_at)
+        found = search_stocks(Stock.active.all(), "base").values_list("name", flat=True)
+        self.assertEqual(list(found), ["Base"])
+        # Las cantidades existentes quedan como saldo inicial del historial
+        self.assertEqual(
+            sorted(StockMovement.objects.values_list("stock__name", "quantity", "reason")),
+            [("Base", 3, StockMovement.ADJUSTMENT), ("Viejo", 1, StockMovement.ADJUSTMENT)],
+        )
+        out = StringIO()
+        call_command("check_stock_ledger", stdout=out)
+        self.assertIn("0 con diferencias", out.getvalue())
@@ -5,6 +5,9 @@ from . import views
 urlpatterns = [
     path('', views.StockListView.as_view(), name='inventory'),
     path('new', views.StockCreateView.as_view(), name='new-stock'),
+    path('lookup', views.StockLookupView.as_view(), name='stock-lookup'),
+    path('lookup/async', views.AsyncStockLookupView.as_view(), name='stock-lookup-async'),
+    path('history', views.StockHistoryView.as_view(), name='stock-history'),
     path('stock/<pk>/edit', views.StockUpdateView.as_view(), name='edit-stock'),
     path('stock/<pk>/delete', views.StockDeleteView.as_view(), name='delete-stock'),
 ]
\ No newline at end of file
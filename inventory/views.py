@@ -1,4 +1,9 @@
+import datetime
+import hashlib
+from django.core.cache import cache
+from django.http import JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
+from django.utils import timezone
 from django.views.generic import (
     View,
     CreateView, 
@@ -6,17 +11,26 @@ from django.views.generic import (
 )
 from django.contrib.messages.views import SuccessMessageMixin
 from django.contrib import messages
+from django.db import transaction
 from .models import Stock
-from .forms import StockForm
+from .forms import StockForm, StockHistoryForm
+from .services import record_adjustment
 from django_filters.views import FilterView
 from .filters import StockFilter
+from .search import search_stocks
+from .cache import get_stock_version
+from .history import daily_series
+from core.aio import AsyncView, run_query
+from core.cache import CachedPageMixin
+from core.pagination import KeysetPaginationMixin
 
 
-class StockListView(FilterView):
+class StockListView(CachedPageMixin, KeysetPaginationMixin, FilterView):
     filterset_class = StockFilter
-    queryset = Stock.objects.filter(is_deleted=False)
+    queryset = Stock.active.all()
     template_name = 'inventory.html'
     paginate_by = 10
+    cache_groups = ('stock',)
 
 
 class StockCreateView(SuccessMessageMixin, CreateView):
@@ -32,9 +46,17 @@ class StockCreateView(SuccessMessageMixin, CreateView):
         context["savebtn"] = 'Crear Producto'
         return context       
 
+    @transaction.atomic
+    def form_valid(self, form):
+        response = super().form_valid(form)
+        # La cantidad inicial queda registrada en el historial
+        record_adjustment(self.object, self.object.quantity)
+        return response
+
 
 class StockUpdateView(SuccessMessageMixin, UpdateView):
     model = Stock
+    queryset = Stock.active.all()
     form_class = StockForm
     template_name = "edit_stock.html"
     success_url = '/inventory'
@@ -47,18 +69,109 @@ class StockUpdateView(SuccessMessageMixin, UpdateView):
         context["delbtn"] = 'Eliminar Producto'
         return context
 
+    @transaction.atomic
+    def form_valid(self, form):
+        response = super().form_valid(form)
+        # Registra la diferencia con la cantidad anterior
+        record_adjustment(self.object, self.object.quantity - form.initial['quantity'])
+        return response
+
 
 class StockDeleteView(View):
     template_name = "delete_stock.html"
     success_message = "El producto ha sido eliminado!"
     
     def get(self, request, pk):
-        stock = get_object_or_404(Stock, pk=pk)
+        stock = get_object_or_404(Stock.active, pk=pk)
         return render(request, self.template_name, {'object' : stock})
 
     def post(self, request, pk):  
-        stock = get_object_or_404(Stock, pk=pk)
-        stock.is_deleted = True
-        stock.save()                                               
+        stock = get_object_or_404(Stock.active, pk=pk)
+        stock.soft_delete()
         messages.success(request, self.success_message)
-        return redirect('inventory')
\ No newline at end of file
+        return redirect('inventory')
+
+
+def lookup_params(request):
+    query = request.GET.get('q', '').strip()
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+    return query, page
+
+
+# Pagina de la busqueda de productos, cacheada hasta que cambie el stock
+def lookup_data(query, page, per_page, timeout):
+    key = 'stock-lookup:%s:%s:%d' % (
+        get_stock_version(), hashlib.md5(query.encode()).hexdigest(), page
+    )
+    data = cache.get(key)
+    if data is None:
+        stocks = Stock.active.all()
+        stocks = search_stocks(stocks, query) if query else stocks.order_by('name')
+        offset = (page - 1) * per_page
+        # Trae una fila de mas para saber si hay otra pagina, sin COUNT
+        rows = list(stocks.values_list('id', 'name', 'quantity')[offset:offset + per_page + 1])
+        data = {
+            'results': [
+                {'id': pk, 'name': name, 'quantity': quantity}
+                for pk, name, quantity in rows[:per_page]
+            ],
+            'page': page,
+            'more': len(rows) > per_page,
+        }
+        cache.set(key, data, timeout)
+    return data
+
+
+# Busqueda paginada de productos en JSON para los formularios de ordenes
+class StockLookupView(View):
+    paginate_by = 20
+    cache_timeout = 300
+
+    def get(self, request):
+        query, page = lookup_params(request)
+        return JsonResponse(lookup_data(query, page, self.paginate_by, self.cache_timeout))
+
+
+# Misma busqueda para ASGI
+class AsyncStockLookupView(AsyncView):
+    paginate_by = 20
+    cache_timeout = 300
+
+    async def get(self, request):
+        query, page = lookup_params(request)
+        data = await run_query(lookup_data, query, page, self.paginate_by, self.cache_timeout)
+        return JsonResponse(data)
+
+
+# Serie diaria de cantidades en JSON para graficar, ya reducida a --points--
+# puntos. Lee la tabla de cierres diarios, nunca los items de las ordenes.
+class StockHistoryView(View):
+    default_days = 90
+    default_points = 60
+    default_stocks = 20
+    cache_timeout = 300
+
+    def get(self, request):
+        form = StockHistoryForm(request.GET)
+        if not form.is_valid():
+            return JsonResponse({'errors': form.errors}, status=400)
+        end = form.cleaned_data['end'] or timezone.localdate()
+        start = form.cleaned_data['start'] or end - datetime.timedelta(days=self.default_days - 1)
+        points = form.cleaned_data['points'] or self.default_points
+        stock_ids = form.cleaned_data['stocks']
+        key = 'stock-history:%s:%s' % (
+            get_stock_version(),
+            hashlib.md5(repr((stock_ids, start, end, points)).encode()).hexdigest(),
+        )
+        data = cache.get(key)
+        if data is None:
+            if not stock_ids:
+                # Por defecto los productos activos con mas stock
+                stocks = Stock.active.order_by('-quantity')
+                stock_ids = list(stocks.values_list('pk', flat=True)[:self.default_stocks])
+            data = daily_series(stock_ids, start, end, points)
+            cache.set(key, data, self.cache_timeout)
+        return JsonResponse(data)
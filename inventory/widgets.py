@@ -0,0 +1,24 @@
+from django import forms
+from django.urls import reverse
+
+
+# Select de productos que solo renderiza la opcion elegida; las demas se
+# cargan desde el endpoint JSON de busqueda a medida que el usuario escribe
+class StockLookupWidget(forms.Select):
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context["widget"]["attrs"]["data-lookup-url"] = reverse("stock-lookup")
+        return context
+
+    def optgroups(self, name, value, attrs=None):
+        choices = self.choices
+        selected = [v for v in value if str(v).isdigit()]
+        self.choices = [("", "---------")]
+        if selected and hasattr(choices, "queryset"):
+            self.choices += [
+                (stock.pk, str(stock)) for stock in choices.queryset.filter(pk__in=selected)
+            ]
+        try:
+            return super().optgroups(name, value, attrs)
+        finally:
+            self.choices = choices
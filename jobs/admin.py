@@ -0,0 +1,8 @@
+from django.contrib import admin
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("pk", "name", "status", "attempts", "run_at", "finished")
+    list_filter = ("status", "name")
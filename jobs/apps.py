@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class JobsConfig(AppConfig):
+    name = 'jobs'
+
+    def ready(self):
+        # Registra las tareas definidas en el modulo tasks.py de cada app
+        from django.utils.module_loading import autodiscover_modules
+        autodiscover_modules("tasks")
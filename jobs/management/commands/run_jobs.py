@@ -0,0 +1,61 @@
+import os
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from jobs.queue import claim_jobs, run_job
+
+
+# Cada hilo usa su propia conexion; se cierra al terminar el trabajo
+def execute(job):
+    try:
+        return run_job(job)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = "Ejecuta los trabajos en segundo plano de la cola"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=2, help="Trabajos en paralelo")
+        parser.add_argument("--poll", type=float, default=2.0, help="Segundos entre consultas")
+        parser.add_argument(
+            "--once", action="store_true", help="Termina cuando no quedan trabajos disponibles"
+        )
+
+    def handle(self, *args, **options):
+        worker = "%s:%d" % (socket.gethostname(), os.getpid())
+        if options["workers"] <= 1:
+            return self.run_inline(worker, options)
+        running = set()
+        with ThreadPoolExecutor(max_workers=options["workers"]) as pool:
+            while True:
+                free = options["workers"] - len(running)
+                jobs = claim_jobs(worker, free) if free else []
+                for job in jobs:
+                    running.add(pool.submit(execute, job))
+                if not running:
+                    if options["once"]:
+                        break
+                    time.sleep(options["poll"])
+                    continue
+                done, running = wait(running, options["poll"], FIRST_COMPLETED)
+                for future in done:
+                    self.report(future.result())
+
+    # Sin hilos: un trabajo a la vez en el proceso actual
+    def run_inline(self, worker, options):
+        while True:
+            jobs = claim_jobs(worker)
+            if not jobs:
+                if options["once"]:
+                    return
+                time.sleep(options["poll"])
+                continue
+            self.report(run_job(jobs[0]))
+
+    def report(self, job):
+        self.stdout.write("%s #%d: %s" % (job.name, job.pk, job.get_status_display()))
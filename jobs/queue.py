@@ -0,0 +1,126 @@
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+
+# Tareas registradas: nombre -> (funcion, opciones)
+TASKS = {}
+RETRY_DELAY = 10  # segundos; se duplica en cada reintento
+
+
+def visibility_timeout():
+    return getattr(settings, "JOBS_VISIBILITY_TIMEOUT", 300)
+
+
+# Decorador que registra una funcion como tarea. Los argumentos deben poder
+# guardarse como JSON. Agrega task.delay(...) para encolarla.
+def task(name=None, max_attempts=3, timeout=None):
+    def register(func):
+        task_name = name or "%s.%s" % (func.__module__.rsplit(".", 1)[0], func.__name__)
+        TASKS[task_name] = (func, {"max_attempts": max_attempts, "timeout": timeout})
+        func.task_name = task_name
+        func.delay = lambda *args, **kwargs: enqueue(task_name, *args, **kwargs)
+        return func
+
+    return register
+
+
+def enqueue(name, *args, user=None, run_at=None, **kwargs):
+    if name not in TASKS:
+        raise LookupError("Tarea desconocida: %s" % name)
+    return Job.objects.create(
+        name=name,
+        args=list(args),
+        kwargs=kwargs,
+        user=user,
+        run_at=run_at or timezone.now(),
+        max_attempts=TASKS[name][1]["max_attempts"],
+    )
+
+
+def task_timeout(name):
+    options = TASKS.get(name, (None, {}))[1]
+    return options.get("timeout") or visibility_timeout()
+
+
+# Trabajos cuyo worker dejo de responder y ya no tienen reintentos
+def expire_jobs(now=None):
+    now = now or timezone.now()
+    return Job.objects.filter(
+        status=Job.RUNNING, locked_until__lt=now, attempts__gte=F("max_attempts")
+    ).update(
+        status=Job.FAILED,
+        error="Se agoto el tiempo de ejecucion",
+        finished=now,
+        locked_until=None,
+    )
+
+
+# Toma hasta --limit-- trabajos disponibles: en cola y con run_at vencido, o en
+# ejecucion con el alquiler vencido. Cada toma es un UPDATE condicional, asi
+# dos workers nunca obtienen el mismo trabajo (no requiere SELECT FOR UPDATE).
+def claim_jobs(worker, limit=1):
+    now = timezone.now()
+    expire_jobs(now)
+    available = Q(status=Job.QUEUED, run_at__lte=now) | Q(
+        status=Job.RUNNING, locked_until__lt=now
+    )
+    candidates = (
+        Job.objects.filter(available)
+        .order_by("run_at", "pk")
+        .values_list("pk", "name")[: limit * 2]
+    )
+    claimed = []
+    for pk, name in candidates:
+        token = "%s:%s" % (worker, uuid.uuid4().hex[:8])
+        updated = (
+            Job.objects.filter(available, pk=pk)
+            .update(
+                status=Job.RUNNING,
+                locked_by=token,
+                locked_until=now + timedelta(seconds=task_timeout(name)),
+                attempts=F("attempts") + 1,
+                started=now,
+            )
+        )
+        if updated:
+            claimed.append(Job.objects.get(pk=pk))
+            if len(claimed) == limit:
+                break
+    return claimed
+
+
+# Ejecuta un trabajo tomado. Solo lo actualiza si sigue siendo de este worker:
+# si el alquiler vencio y otro lo tomo, el resultado tardio se descarta.
+def run_job(job):
+    own = Job.objects.filter(pk=job.pk, locked_by=job.locked_by)
+    try:
+        if job.name not in TASKS:
+            raise LookupError("Tarea desconocida: %s" % job.name)
+        result = TASKS[job.name][0](*job.args, **job.kwargs)
+    except Exception:
+        now = timezone.now()
+        error = traceback.format_exc()
+        if job.attempts < job.max_attempts and job.name in TASKS:
+            delay = RETRY_DELAY * 2 ** (job.attempts - 1)
+            own.update(
+                status=Job.QUEUED,
+                error=error,
+                run_at=now + timedelta(seconds=delay),
+                locked_until=None,
+                locked_by="",
+            )
+        else:
+            own.update(status=Job.FAILED, error=error, finished=now, locked_until=None)
+    else:
+        own.update(
+            status=Job.DONE, result=result, error="", finished=timezone.now(), locked_until=None
+        )
+    job.refresh_from_db()
+    return job
@@ -0,0 +1,19 @@
+import os
+
+from django.conf import settings
+
+
+# Carpeta donde las tareas dejan los archivos que generan (exportaciones, etc.)
+def output_dir():
+    return getattr(settings, "JOBS_OUTPUT_DIR", os.path.join(settings.BASE_DIR, "cache", "jobs"))
+
+
+# Solo el nombre del archivo, sin rutas: el resultado del trabajo no puede
+# apuntar fuera de la carpeta de salida
+def output_path(name):
+    return os.path.join(output_dir(), os.path.basename(name))
+
+
+def open_output_file(name):
+    os.makedirs(output_dir(), exist_ok=True)
+    return open(output_path(name), "w", newline="", encoding="utf-8")
@@ -0,0 +1,188 @@
+import csv
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from inventory.models import Stock
+from inventory.services import STOCK_IN, add_order_items
+from operations.models import ProductionMachine, ProductionOrder, ProductionItem
+from operations.tasks import delete_orders
+from .models import Job
+from .queue import claim_jobs, enqueue, run_job, task
+
+CALLS = []
+
+
+@task(name="tests.add")
+def add(a, b):
+    CALLS.append((a, b))
+    return a + b
+
+
+@task(name="tests.broken", max_attempts=2)
+def broken():
+    raise ValueError("sin conexion")
+
+
+class JobQueueTest(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_worker_runs_jobs(self):
+        first = add.delay(1, 2)
+        second = enqueue("tests.add", 3, b=4)
+        out = StringIO()
+        call_command("run_jobs", "--once", "--workers=1", stdout=out)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.status, first.result, first.attempts), (Job.DONE, 3, 1))
+        self.assertEqual(second.result, 7)
+        self.assertEqual(CALLS, [(1, 2), (3, 4)])
+        self.assertIn("tests.add #%d: Terminado" % first.pk, out.getvalue())
+
+    def test_unknown_task(self):
+        with self.assertRaises(LookupError):
+            enqueue("tests.missing")
+
+    def test_retry_with_backoff_then_fail(self):
+        job = broken.delay()
+        job = run_job(claim_jobs("w1")[0])
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertIn("sin conexion", job.error)
+        self.assertGreater(job.run_at, timezone.now())
+        # El reintento no esta disponible hasta que pase la espera
+        self.assertEqual(claim_jobs("w1"), [])
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        job = run_job(claim_jobs("w1")[0])
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+        self.assertIsNotNone(job.finished)
+
+    def test_visibility_timeout(self):
+        add.delay(1, 1)
+        stale = claim_jobs("w1")[0]
+        # Mientras dura el alquiler nadie mas lo toma
+        self.assertEqual(claim_jobs("w2"), [])
+
+        Job.objects.filter(pk=stale.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+        fresh = claim_jobs("w2")[0]
+        self.assertEqual((fresh.pk, fresh.attempts), (stale.pk, 2))
+        self.assertNotEqual(fresh.locked_by, stale.locked_by)
+
+        # El worker viejo termina tarde: su resultado se descarta
+        self.assertEqual(run_job(stale).status, Job.RUNNING)
+        self.assertEqual(run_job(fresh).status, Job.DONE)
+
+    def test_expired_without_attempts_fails(self):
+        job = broken.delay()
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.RUNNING, attempts=2, locked_until=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertEqual(claim_jobs("w1"), [])
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+
+    def test_delete_orders_task(self):
+        stock = Stock.objects.create(name="Producto A", quantity=0)
+        machine = ProductionMachine.objects.create(name="Equipo 1")
+        orders = [ProductionOrder.objects.create(machine=machine) for i in range(3)]
+        for order in orders:
+            add_order_items(order, [ProductionItem(stock=stock, quantity=5)], STOCK_IN)
+        job = delete_orders.delay("production", [orders[0].pk, orders[1].pk])
+        job = run_job(claim_jobs("w1")[0])
+        self.assertEqual(job.result, {"deleted": 2})
+        stock.refresh_from_db()
+        self.assertEqual(stock.quantity, 5)
+        self.assertEqual(list(ProductionOrder.objects.all()), [orders[2]])
+
+
+    def test_commands_enqueue_in_background(self):
+        out = StringIO()
+        call_command(
+            "rebuild_production_rollups", "--start", "2023-05-01", "--background", stdout=out
+        )
+        call_command("check_stock_ledger", "--background", stdout=out)
+        call_command("snapshot_stock", "--background", stdout=out)
+        call_command("render_documents", "dispatch", "--background", stdout=out)
+        self.assertEqual(out.getvalue().count("encolado"), 4)
+        self.assertEqual(
+            list(Job.objects.order_by("pk").values_list("name", "args")),
+            [
+                ("operations.rebuild_production_rollups", ["2023-05-01", None]),
+                ("inventory.check_stock_ledger", []),
+                ("inventory.take_snapshots", [500]),
+                ("operations.render_documents", ["dispatch", None, None, None]),
+            ],
+        )
+        call_command("run_jobs", "--once", "--workers=1", stdout=StringIO())
+        self.assertFalse(Job.objects.exclude(status=Job.DONE).exists())
+
+
+class JobViewsTest(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        settings = override_settings(JOBS_OUTPUT_DIR=self.tmp.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.user = User.objects.create_user(username="tester", password="secret")
+        self.client.force_login(self.user)
+
+    def test_status_only_for_owner(self):
+        job = enqueue("tests.add", 1, 2, user=self.user)
+        response = self.client.get(reverse("job-status", args=[job.pk]))
+        self.assertEqual(response.json()["status"], Job.QUEUED)
+
+        other = User.objects.create_user(username="otro", password="secret")
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(reverse("job-status", args=[job.pk])).status_code, 404)
+
+    def test_background_export(self):
+        stock = Stock.objects.create(name="Producto A", quantity=0)
+        machine = ProductionMachine.objects.create(name="Equipo 1")
+        order = ProductionOrder.objects.create(machine=machine)
+        ProductionItem.objects.create(orderno=order, stock=stock, quantity=7)
+
+        response = self.client.get(reverse("production-export"), {"background": 1})
+        self.assertEqual(response.status_code, 202)
+        status_url = response.json()["url"]
+        self.assertNotIn("download", response.json())
+
+        call_command("run_jobs", "--once", "--workers=1", stdout=StringIO())
+        data = self.client.get(status_url).json()
+        self.assertEqual((data["status"], data["result"]["rows"]), (Job.DONE, 1))
+        response = self.client.get(data["download"])
+        content = b"".join(response.streaming_content).decode()
+        rows = list(csv.DictReader(StringIO(content)))
+        self.assertEqual((rows[0]["stock"], rows[0]["quantity"]), ("Producto A", "7"))
+
+    @override_settings(JOBS_DELETE_INLINE_ITEMS=1)
+    def test_large_order_is_deleted_in_background(self):
+        stock = Stock.objects.create(name="Producto A", quantity=0)
+        machine = ProductionMachine.objects.create(name="Equipo 1")
+        small = ProductionOrder.objects.create(machine=machine)
+        large = ProductionOrder.objects.create(machine=machine)
+        add_order_items(small, [ProductionItem(stock=stock, quantity=1)], STOCK_IN)
+        add_order_items(large, [ProductionItem(stock=stock, quantity=2) for i in range(2)], STOCK_IN)
+
+        self.client.post(reverse("delete-production", args=[small.pk]))
+        self.assertFalse(ProductionOrder.objects.filter(pk=small.pk).exists())
+        self.assertFalse(Job.objects.exists())
+
+        response = self.client.post(reverse("delete-production", args=[large.pk]), follow=True)
+        self.assertContains(response, "se eliminara en segundo plano")
+        job = Job.objects.get()
+        self.assertEqual(
+            (job.name, job.args, job.user),
+            ("operations.delete_orders", ["production", [large.pk]], self.user),
+        )
+        call_command("run_jobs", "--once", "--workers=1", stdout=StringIO())
+        self.assertFalse(ProductionOrder.objects.exists())
+        stock.refresh_from_db()
+        self.assertEqual(stock.quantity, 0)
@@ -0,0 +1,58 @@
+import os
+
+from django.http import FileResponse, Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.views.generic import View
+
+from .models import Job
+from .storage import output_path
+
+
+# Cada usuario consulta solo sus trabajos; el staff ve todos
+def user_jobs(request):
+    jobs = Job.objects.all()
+    if not request.user.is_staff:
+        jobs = jobs.filter(user=request.user)
+    return jobs
+
+
+def job_data(job):
+    data = {
+        "id": job.pk,
+        "name": job.name,
+        "status": job.status,
+        "status_display": job.get_status_display(),
+        "attempts": job.attempts,
+        "created": job.created,
+        "started": job.started,
+        "finished": job.finished,
+        "result": job.result,
+        "error": job.error.strip().splitlines()[-1] if job.error else "",
+        "url": reverse("job-status", args=[job.pk]),
+    }
+    if job.status == Job.DONE and isinstance(job.result, dict) and job.result.get("file"):
+        data["download"] = reverse("job-download", args=[job.pk])
+    return data
+
+
+# Respuesta al encolar: 202 y la URL para consultar el estado
+def job_accepted(job):
+    return JsonResponse(job_data(job), status=202)
+
+
+# Estado del trabajo en JSON, para consultar periodicamente desde el navegador
+class JobStatusView(View):
+    def get(self, request, pk):
+        job = get_object_or_404(user_jobs(request), pk=pk)
+        return JsonResponse(job_data(job))
+
+
+# Descarga el archivo generado por un trabajo terminado
+class JobDownloadView(View):
+    def get(self, request, pk):
+        job = get_object_or_404(user_jobs(request), pk=pk, status=Job.DONE)
+        name = isinstance(job.result, dict) and job.result.get("file")
+        if not name or not os.path.exists(output_path(name)):
+            raise Http404("El trabajo no genero un archivo")
+        return FileResponse(open(output_path(name), "rb"), as_attachment=True, filename=name)
@@ -3,3 +3,20 @@ from django.apps import AppConfig
 
 class OperationsConfig(AppConfig):
     name = 'operations'
+
+    def ready(self):
+        from core.cache import connect_versions
+        from .models import (
+            DispatchOrder,
+            DispatchOrderDetails,
+            ProductionMachine,
+            ProductionOrder,
+            ProductionOrderDetails,
+        )
+
+        # Invalida las claves de cache de equipos y ordenes ante cualquier cambio.
+        # Los items se crean y borran junto con su orden.
+        connect_versions("machines", ProductionMachine)
+        connect_versions(
+            "orders", ProductionOrder, DispatchOrder, ProductionOrderDetails, DispatchOrderDetails
+        )
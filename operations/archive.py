@@ -0,0 +1,115 @@
+import datetime
+from collections import defaultdict
+
+from django.conf import settings
+from django.core import serializers
+from django.db import transaction
+from django.utils import timezone
+
+from core.cache import bump_version
+from core.dataio import chunked
+from core.models import ArchivedRow
+from inventory.models import (
+    Stock,
+    StockAlert,
+    StockDaily,
+    StockMovement,
+    StockShortfall,
+    StockSnapshot,
+)
+from .history import ORDER_TYPES
+from .models import ProductionMachine, ProductionOrder, ProductionRollup
+from .rollups import remove_production
+
+
+# Dias que un producto o equipo borrado queda en las tablas antes de archivarse
+def archive_after_days():
+    return getattr(settings, "ARCHIVE_AFTER_DAYS", 365)
+
+
+def archive_cutoff(days=None):
+    return timezone.now() - datetime.timedelta(days=archive_after_days() if days is None else days)
+
+
+# Copia las filas del queryset a ArchivedRow y las borra, de a --chunk_size--
+def archive_rows(queryset, chunk_size=2000):
+    count = 0
+    for chunk in chunked(queryset.order_by("pk").iterator(chunk_size), chunk_size):
+        ArchivedRow.objects.bulk_create(
+            ArchivedRow(model=row["model"], object_id=row["pk"], data=row["fields"])
+            for row in serializers.serialize("python", chunk)
+        )
+        count += len(chunk)
+    queryset.delete()
+    return count
+
+
+# Archiva ordenes completas (orden, items y detalles). Con adjust_rollups las
+# producciones se descuentan de los totales por dia, que deben coincidir con
+# las ordenes que quedan.
+def archive_orders(kind, order_ids, adjust_rollups=True):
+    order_model, item_model, details_model, direction = ORDER_TYPES[kind]
+    orders = order_model.objects.filter(pk__in=order_ids)
+    items = item_model.objects.filter(orderno__in=order_ids)
+    if kind == "production" and adjust_rollups:
+        grouped = defaultdict(list)
+        for item in items:
+            grouped[item.orderno_id].append(item)
+        for order in orders.only("orderno", "time", "machine"):
+            remove_production(order, grouped[order.pk])
+    archive_rows(items)
+    archive_rows(details_model.objects.filter(orderno__in=order_ids))
+    return archive_rows(orders)
+
+
+# Productos borrados, con su historial y las ordenes que los incluyen
+@transaction.atomic
+def archive_stocks(stock_ids):
+    orders = 0
+    for kind, (order_model, item_model, details_model, direction) in ORDER_TYPES.items():
+        order_ids = set(
+            item_model.objects.filter(stock__in=stock_ids).values_list("orderno", flat=True)
+        )
+        if order_ids:
+            orders += archive_orders(kind, order_ids)
+    for model in (StockMovement, StockSnapshot, StockDaily, StockAlert, StockShortfall, ProductionRollup):
+        archive_rows(model.objects.filter(stock__in=stock_ids))
+    archive_rows(Stock.objects.filter(pk__in=stock_ids))
+    bump_version("stock")
+    bump_version("orders")
+    return orders
+
+
+# Equipos borrados, con sus producciones y totales por dia
+@transaction.atomic
+def archive_machines(machine_ids):
+    order_ids = list(
+        ProductionOrder.objects.filter(machine__in=machine_ids).values_list("pk", flat=True)
+    )
+    orders = archive_orders("production", order_ids, adjust_rollups=False)
+    archive_rows(ProductionRollup.objects.filter(machine__in=machine_ids))
+    archive_rows(ProductionMachine.objects.filter(pk__in=machine_ids))
+    bump_version("machines")
+    bump_version("orders")
+    return orders
+
+
+ARCHIVES = {
+    "stock": (Stock, archive_stocks),
+    "machines": (ProductionMachine, archive_machines),
+}
+
+
+# Archiva por lotes (una transaccion cada uno) las filas borradas antes de
+# --before--. Devuelve (filas, ordenes) de cada lote a medida que avanza.
+def archive_deleted(name, before, batch_size=100):
+    model, archive = ARCHIVES[name]
+    while True:
+        ids = list(
+            model.objects.deleted(before)
+            .order_by("deleted_at", "pk")
+            .values_list("pk", flat=True)[:batch_size]
+        )
+        if not ids:
+            return
+        yield len(ids), archive(ids)
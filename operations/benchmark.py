@@ -0,0 +1,366 @@
+import asyncio
+import itertools
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection, connections
+from django.test import Client
+from django.urls import reverse
+from django.utils.http import urlencode
+
+from core.instrumentation import QueryRecorder, current_recorder
+from inventory.models import Stock
+from .models import (
+    ProductionMachine,
+    ProductionOrder,
+    ProductionItem,
+    DispatchOrder,
+    DispatchItem,
+)
+
+
+BATCH_SIZE = 5000
+WORDS = ["cubierta", "rueda", "llanta", "eje", "buje", "disco", "resorte", "tapa"]
+
+
+# Datos sinteticos: productos (10% borrados), equipos, ordenes de produccion y
+# despacho con --items-- items cada una. Siempre los mismos para una semilla.
+def seed_data(stocks, machines, orders, items, seed=0):
+    rng = random.Random(seed)
+    Stock.objects.bulk_create(
+        (
+            Stock(
+                name="%s %06d" % (rng.choice(WORDS), i),
+                quantity=rng.randint(1000, 100000),
+                is_deleted=rng.random() < 0.1,
+            )
+            for i in range(stocks)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    ProductionMachine.objects.bulk_create(
+        (ProductionMachine(name="Equipo %04d" % i) for i in range(machines)),
+        batch_size=BATCH_SIZE,
+    )
+    stock_ids = list(Stock.active.values_list("pk", flat=True))
+    machine_ids = list(ProductionMachine.objects.values_list("pk", flat=True))
+    ProductionOrder.objects.bulk_create(
+        (ProductionOrder(machine_id=rng.choice(machine_ids)) for _ in range(orders)),
+        batch_size=BATCH_SIZE,
+    )
+    DispatchOrder.objects.bulk_create(
+        (
+            DispatchOrder(name="Cliente %d" % i, phone="1234567890", address="-", email="a@b.com")
+            for i in range(orders)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    for order_model, item_model in (
+        (ProductionOrder, ProductionItem),
+        (DispatchOrder, DispatchItem),
+    ):
+        item_model.objects.bulk_create(
+            (
+                item_model(orderno_id=orderno, stock_id=rng.choice(stock_ids), quantity=1)
+                for orderno in order_model.objects.values_list("pk", flat=True).iterator()
+                for _ in range(items)
+            ),
+            batch_size=BATCH_SIZE,
+        )
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute("ANALYZE")
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    index = fraction * (len(values) - 1)
+    low = int(index)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (index - low)
+
+
+def formset_data(lines):
+    data = {
+        "form-TOTAL_FORMS": str(len(lines)),
+        "form-INITIAL_FORMS": "0",
+        "form-MIN_NUM_FORMS": "0",
+        "form-MAX_NUM_FORMS": "1000",
+    }
+    for i, (stock_id, quantity) in enumerate(lines):
+        data["form-%d-stock" % i] = stock_id
+        data["form-%d-quantity" % i] = quantity
+    return data
+
+
+# Datos compartidos por los escenarios: ids para armar requests y las ordenes
+# disponibles para borrar (cada una se borra una sola vez)
+class Context:
+    def __init__(self, seed=0):
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stock_ids = list(Stock.active.values_list("pk", flat=True))
+        self.machines = list(ProductionMachine.objects.values_list("pk", "name"))
+        self.deletable = {
+            "production": iter(ProductionOrder.objects.order_by("-pk").values_list("pk", flat=True)),
+            "dispatch": iter(DispatchOrder.objects.order_by("-pk").values_list("pk", flat=True)),
+        }
+
+    def choice(self, values):
+        with self.lock:
+            return self.rng.choice(values)
+
+    def lines(self, count=3):
+        return [(self.choice(self.stock_ids), 1) for _ in range(count)]
+
+    def next_order(self, kind):
+        with self.lock:
+            return next(self.deletable[kind])
+
+
+# Cada escenario devuelve (metodo, url, datos, estado esperado)
+def home(ctx):
+    return "get", "/", None, 200
+
+
+def inventory_search(ctx):
+    return "get", reverse("inventory"), {"name": ctx.choice(WORDS)}, 200
+
+
+def stock_lookup(ctx):
+    return "get", reverse("stock-lookup"), {"q": ctx.choice(WORDS)[:4]}, 200
+
+
+def stock_list(ctx):
+    return "get", reverse("inventory"), None, 200
+
+
+def production_list(ctx):
+    return "get", reverse("production-list"), None, 200
+
+
+def dispatch_list(ctx):
+    return "get", reverse("dispatch-list"), None, 200
+
+
+def machine_orders(ctx):
+    return "get", reverse("machine", args=[ctx.choice(ctx.machines)[1]]), None, 200
+
+
+def home_async(ctx):
+    return "get", reverse("home-async"), None, 200
+
+
+def stock_lookup_async(ctx):
+    return "get", reverse("stock-lookup-async"), {"q": ctx.choice(WORDS)[:4]}, 200
+
+
+def production_json(ctx):
+    return "get", reverse("production-json"), None, 200
+
+
+def dispatch_json(ctx):
+    return "get", reverse("dispatch-json"), None, 200
+
+
+def production_create(ctx):
+    url = reverse("new-production", args=[ctx.choice(ctx.machines)[0]])
+    return "post", url, formset_data(ctx.lines()), 302
+
+
+def dispatch_create(ctx):
+    data = formset_data(ctx.lines())
+    data.update({"name": "Cliente", "phone": "1234567890", "address": "-", "email": "a@b.com"})
+    return "post", reverse("new-dispatch"), data, 302
+
+
+def production_delete(ctx):
+    return "post", reverse("delete-production", args=[ctx.next_order("production")]), {}, 302
+
+
+def dispatch_delete(ctx):
+    return "post", reverse("delete-dispatch", args=[ctx.next_order("dispatch")]), {}, 302
+
+
+SCENARIOS = {
+    "home": home,
+    "inventory_search": inventory_search,
+    "stock_lookup": stock_lookup,
+    "stock_list": stock_list,
+    "production_list": production_list,
+    "dispatch_list": dispatch_list,
+    "machine_orders": machine_orders,
+    "home_async": home_async,
+    "stock_lookup_async": stock_lookup_async,
+    "production_json": production_json,
+    "dispatch_json": dispatch_json,
+    "production_create": production_create,
+    "dispatch_create": dispatch_create,
+    "production_delete": production_delete,
+    "dispatch_delete": dispatch_delete,
+}
+# Escenarios que modifican datos (POST); el resto son de lectura
+WRITE_SCENARIOS = {"production_create", "dispatch_create", "production_delete", "dispatch_delete"}
+
+
+# Ejecuta --requests-- requests del escenario repartidos en --concurrency--
+# hilos, cada uno con su cliente logueado y su conexion a la base
+def run_scenario(name, ctx, user, requests, concurrency):
+    build = SCENARIOS[name]
+    counter = itertools.count()
+    samples = []
+    errors = []
+
+    def worker():
+        client = Client()
+        client.force_login(user)
+        try:
+            while next(counter) < requests:
+                method, url, data, expected = build(ctx)
+                recorder = QueryRecorder()
+                start = time.perf_counter()
+                try:
+                    with connection.execute_wrapper(recorder):
+                        response = getattr(client, method)(url, data or {})
+                except Exception as e:
+                    # Una excepcion (p. ej. base bloqueada) cuenta como error
+                    status = "%s: %s" % (type(e).__name__, e)
+                else:
+                    status = response.status_code
+                elapsed = (time.perf_counter() - start) * 1000
+                samples.append((elapsed, len(recorder.queries)))
+                if status != expected:
+                    errors.append("%s %s -> %s" % (method.upper(), url, status))
+        finally:
+            connections.close_all()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    return summarize(samples, errors, time.perf_counter() - start)
+
+
+def summarize(samples, errors, wall):
+    latencies = [elapsed for elapsed, queries in samples]
+    queries = [count for elapsed, count in samples]
+    return {
+        "requests": len(samples),
+        "errors": len(errors),
+        "first_error": errors[0] if errors else "",
+        "throughput_rps": len(samples) / wall if wall else 0.0,
+        "p50_ms": percentile(latencies, 0.50),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+        "mean_queries": statistics.mean(queries) if queries else 0,
+        "max_queries": max(queries) if queries else 0,
+    }
+
+
+def session_cookie(user):
+    client = Client()
+    client.force_login(user)
+    name = settings.SESSION_COOKIE_NAME
+    return "%s=%s" % (name, client.cookies[name].value)
+
+
+# Un GET a la aplicacion ASGI (core.asgi) sin servidor de por medio
+async def asgi_get(application, url, data, cookie):
+    path, _, query = url.partition("?")
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": (query or urlencode(data or {})).encode(),
+        "root_path": "",
+        "headers": [(b"host", b"testserver"), (b"cookie", cookie.encode())],
+        "client": ("127.0.0.1", 0),
+        "server": ("testserver", 80),
+    }
+    response = {}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+
+    await application(scope, receive, send)
+    return response["status"]
+
+
+# Igual que run_scenario pero por la aplicacion ASGI: --concurrency--
+# tareas en un event loop. Solo escenarios de lectura (los POST necesitarian
+# el token CSRF).
+def run_scenario_asgi(name, ctx, user, requests, concurrency):
+    from core.asgi import application
+
+    build = SCENARIOS[name]
+    cookie = session_cookie(user)
+    counter = itertools.count()
+    samples = []
+    errors = []
+
+    async def worker():
+        while next(counter) < requests:
+            method, url, data, expected = build(ctx)
+            recorder = QueryRecorder()
+            token = current_recorder.set(recorder)
+            start = time.perf_counter()
+            try:
+                status = await asgi_get(application, url, data, cookie)
+            except Exception as e:
+                status = "%s: %s" % (type(e).__name__, e)
+            finally:
+                current_recorder.reset(token)
+            elapsed = (time.perf_counter() - start) * 1000
+            samples.append((elapsed, len(recorder.queries)))
+            if status != expected:
+                errors.append("GET %s -> %s" % (url, status))
+
+    async def main():
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    start = time.perf_counter()
+    asyncio.run(main())
+    return summarize(samples, errors, time.perf_counter() - start)
+
+
+def benchmark_user():
+    user, created = User.objects.get_or_create(
+        username="benchmark", defaults={"is_staff": True, "is_superuser": True}
+    )
+    return user
+
+
+# Compara con una corrida anterior: latencia p95 peor que --threshold-- veces
+# o mas consultas por request que antes
+def compare(results, baseline, threshold):
+    regressions = {}
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        flags = []
+        ratio = result["p95_ms"] / max(previous["p95_ms"], 1e-6)
+        if ratio > threshold:
+            flags.append("p95 x%.2f" % ratio)
+        if result["mean_queries"] > previous["mean_queries"]:
+            flags.append(
+                "consultas %.1f -> %.1f" % (previous["mean_queries"], result["mean_queries"])
+            )
+        if flags:
+            regressions[name] = flags
+    return regressions
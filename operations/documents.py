@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.utils import timezone
+from .history import details_values, iter_orders, order_values
+from .pdf import COLUMNS, PDFDocument
+
+
+# Cambiar al modificar el formato para invalidar los PDF cacheados
+RENDERER_VERSION = 1
+
+TITLES = {
+    "production": "ORDEN DE PRODUCCION",
+    "dispatch": "ORDEN DE DESPACHO",
+}
+
+
+def cache_dir():
+    return getattr(
+        settings, "DOCUMENT_CACHE_DIR", os.path.join(settings.BASE_DIR, "cache", "documents")
+    )
+
+
+# Datos planos de la orden: lo unico que necesita el proceso que genera el PDF
+def document_data(kind, order, items, details):
+    data = {
+        "kind": kind,
+        "orderno": order.pk,
+        "date": timezone.localdate(order.time).isoformat(),
+        "items": [(item.stock.name, item.quantity) for item in items],
+        "details": {k: v for k, v in details_values(details).items() if v},
+    }
+    data.update(order_values(kind, order))
+    return data
+
+
+def content_hash(data):
+    payload = json.dumps([RENDERER_VERSION, data], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def document_path(data):
+    digest = content_hash(data)
+    return os.path.join(cache_dir(), data["kind"], digest[:2], digest + ".pdf")
+
+
+def render_document(data):
+    doc = PDFDocument()
+    doc.text("SL Agro", size=16, bold=True)
+    doc.text("Cubiertas semineumaticas para linea de siembra")
+    doc.text("San Nicolas 3324, Rosario, Santa Fe - info@slagro.com.ar")
+    doc.rule()
+    doc.text("%s Nro: %s" % (TITLES[data["kind"]], data["orderno"]), bold=True)
+    doc.text("Fecha: %s" % data["date"])
+    if data["kind"] == "production":
+        doc.text("Equipo de produccion: %s" % data["machine"])
+    else:
+        doc.text("Cliente: %s" % data["name"])
+        doc.text("Telefono: %s  Email: %s" % (data["phone"], data["email"]))
+        for line in data["address"].splitlines() or [""]:
+            doc.text("Direccion: %s" % line)
+    for field, value in sorted(data["details"].items()):
+        doc.text("%s: %s" % (field.upper(), value))
+    doc.rule()
+    name_width = COLUMNS - 6 - 10
+    doc.text("%-5s %-*s %9s" % ("Nro", name_width, "Producto", "Cantidad"), bold=True)
+    for number, (name, quantity) in enumerate(data["items"], 1):
+        doc.text("%-5d %-*s %9d" % (number, name_width, name[:name_width], quantity))
+    doc.rule()
+    total = sum(quantity for name, quantity in data["items"])
+    doc.text("%-5s %-*s %9d" % ("", name_width, "Total unidades", total))
+    return doc.render()
+
+
+# Genera el PDF si no esta en el cache de disco; devuelve la ruta.
+# Se ejecuta tambien en procesos del pool, por eso solo recibe datos planos.
+def render_to_cache(data, path=None):
+    path = path or document_path(data)
+    if os.path.exists(path):
+        return path
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    content = render_document(data)
+    # Escritura atomica: otro proceso nunca ve un archivo a medio escribir
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "wb") as fh:
+        fh.write(content)
+    os.replace(tmp, path)
+    return path
+
+
+def order_document(kind, order, items, details):
+    return render_to_cache(document_data(kind, order, items, details))
+
+
+# Genera en paralelo los PDF de las ordenes dadas; las ya cacheadas se saltean.
+# Se mantienen a lo sumo --workers * 4-- trabajos pendientes para acotar memoria.
+def render_documents(kind, orders=None, workers=None, chunk_size=500):
+    workers = workers or os.cpu_count() or 1
+    rendered = cached = 0
+    pending = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for order, items, details in iter_orders(kind, orders, chunk_size):
+            data = document_data(kind, order, items, details)
+            path = document_path(data)
+            if os.path.exists(path):
+                cached += 1
+                continue
+            pending.append(pool.submit(render_to_cache, data, path))
+            if len(pending) >= workers * 4:
+                pending.pop(0).result()
+                rendered += 1
+        for future in pending:
+            future.result()
+            rendered += 1
+    return rendered, cached
@@ -7,16 +7,29 @@ from .models import (
     ProductionOrderDetails, 
     DispatchOrder, 
     DispatchItem,
-    DispatchOrderDetails
+    DispatchOrderDetails,
+    TAX_FIELDS,
 )
 from inventory.models import Stock
+from inventory.widgets import StockLookupWidget
+from core.cache import CachedModelChoiceField
+
+
+# Producto de una linea de orden, validado contra el cache (ver CachedModelChoiceField)
+def stock_choice_field():
+    return CachedModelChoiceField(
+        Stock.active.all(), cache_group="stock", widget=StockLookupWidget
+    )
 
 
 # Form para seleccionar equipo
 class SelectMachineForm(forms.ModelForm):
+    machine = CachedModelChoiceField(
+        ProductionMachine.active.all(), cache_group="machines", cache_choices=True
+    )
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.fields['machine'].queryset = ProductionMachine.objects.filter(is_deleted=False)
         self.fields['machine'].widget.attrs.update({'class': 'textinput form-control'})
     class Meta:
         model = ProductionOrder
@@ -24,11 +37,13 @@ class SelectMachineForm(forms.ModelForm):
 
 # Form para renderizar un solo producto en formulario de produccion
 class ProductionItemForm(forms.ModelForm):
+    stock = stock_choice_field()
+    quantity = forms.IntegerField(min_value=1)
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.fields['stock'].queryset = Stock.objects.filter(is_deleted=False)
         self.fields['stock'].widget.attrs.update({'class': 'textinput form-control stock', 'required': 'true'})
-        self.fields['quantity'].widget.attrs.update({'class': 'textinput form-control quantity', 'min': '0', 'required': 'true'})
+        self.fields['quantity'].widget.attrs.update({'class': 'textinput form-control quantity', 'min': '1', 'required': 'true'})
     class Meta:
         model = ProductionItem
         fields = ['stock', 'quantity']
@@ -36,11 +51,29 @@ class ProductionItemForm(forms.ModelForm):
 # FORMSET para renderizar multiples productos desde --ProductionItemForm--
 ProductionItemFormset = formset_factory(ProductionItemForm, extra=1)
 
+# Detalles de una orden. Los importes vacios equivalen a 0; el total se
+# calcula al guardar (ver OrderDetails)
+class OrderDetailsForm(forms.ModelForm):
+    amount_fields = ['amount'] + TAX_FIELDS
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for field in self.amount_fields:
+            self.fields[field].required = False
+
+    def clean(self):
+        cleaned_data = super().clean()
+        for field in self.amount_fields:
+            if field not in self.errors and cleaned_data.get(field) is None:
+                cleaned_data[field] = 0
+        return cleaned_data
+
+
 # Form para integrar datos a los detalles de la order de produccion
-class ProductionDetailsForm(forms.ModelForm):
+class ProductionDetailsForm(OrderDetailsForm):
     class Meta:
         model = ProductionOrderDetails
-        fields = ['eway','veh', 'destination', 'po', 'cgst', 'sgst', 'igst', 'cess', 'tcs', 'total']
+        fields = ['eway','veh', 'destination', 'po', 'amount', 'cgst', 'sgst', 'igst', 'cess', 'tcs']
 
 
 # Form para crear equipos de produccion
@@ -74,11 +107,13 @@ class DispatchForm(forms.ModelForm):
 
 # Form para renderizar un solo producto en formulario de despacho
 class DispatchItemForm(forms.ModelForm):
+    stock = stock_choice_field()
+    quantity = forms.IntegerField(min_value=1)
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.fields['stock'].queryset = Stock.objects.filter(is_deleted=False)
         self.fields['stock'].widget.attrs.update({'class': 'textinput form-control setprice stock', 'required': 'true'})
-        self.fields['quantity'].widget.attrs.update({'class': 'textinput form-control setprice quantity', 'min': '0', 'required': 'true'})
+        self.fields['quantity'].widget.attrs.update({'class': 'textinput form-control setprice quantity', 'min': '1', 'required': 'true'})
     class Meta:
         model = DispatchItem
         fields = ['stock', 'quantity']
@@ -87,7 +122,37 @@ class DispatchItemForm(forms.ModelForm):
 DispatchItemFormset = formset_factory(DispatchItemForm, extra=1)
 
 # Form para obtener datos de detalle en orden de despacho
-class DispatchDetailsForm(forms.ModelForm):
+class DispatchDetailsForm(OrderDetailsForm):
     class Meta:
         model = DispatchOrderDetails
-        fields = ['eway','veh', 'destination', 'po', 'cgst', 'sgst', 'igst', 'cess', 'tcs', 'total']
+        fields = ['eway','veh', 'destination', 'po', 'amount', 'cgst', 'sgst', 'igst', 'cess', 'tcs']
+
+
+
+# Filtros de fecha y equipo para exportar el historial
+class ExportFilterForm(forms.Form):
+    start = forms.DateField(required=False)
+    end = forms.DateField(required=False)
+    machine = forms.ModelChoiceField(queryset=ProductionMachine.active.all(), required=False)
+
+
+class ProductionReportForm(forms.Form):
+    PERIOD_CHOICES = [("day", "Dia"), ("week", "Semana"), ("month", "Mes")]
+
+    start = forms.DateField(required=False, widget=forms.DateInput(attrs={"type": "date"}))
+    end = forms.DateField(required=False, widget=forms.DateInput(attrs={"type": "date"}))
+    machine = forms.ModelChoiceField(
+        queryset=ProductionMachine.active.all(), required=False
+    )
+    period = forms.ChoiceField(choices=PERIOD_CHOICES, required=False)
+
+
+class TaxReportForm(forms.Form):
+    KIND_CHOICES = [("dispatch", "Despachos"), ("production", "Produccion")]
+    PERIOD_CHOICES = [("day", "Dia"), ("week", "Semana"), ("month", "Mes")]
+
+    kind = forms.ChoiceField(choices=KIND_CHOICES, required=False)
+    start = forms.DateField(required=False, widget=forms.DateInput(attrs={"type": "date"}))
+    end = forms.DateField(required=False, widget=forms.DateInput(attrs={"type": "date"}))
+    period = forms.ChoiceField(choices=PERIOD_CHOICES, required=False)
+    by_destination = forms.BooleanField(required=False)
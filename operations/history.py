@@ -0,0 +1,180 @@
+import datetime
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from core.cache import cache_timeout, versioned_key
+from core.pagination import KeysetPaginator
+from inventory.services import STOCK_IN, STOCK_OUT
+from .models import (
+    TAX_FIELDS,
+    ProductionOrder,
+    ProductionItem,
+    ProductionOrderDetails,
+    DispatchOrder,
+    DispatchItem,
+    DispatchOrderDetails,
+)
+
+
+# Modelos de cada tipo de orden y su sentido de movimiento de stock
+ORDER_TYPES = {
+    "production": (ProductionOrder, ProductionItem, ProductionOrderDetails, STOCK_IN),
+    "dispatch": (DispatchOrder, DispatchItem, DispatchOrderDetails, STOCK_OUT),
+}
+
+DETAIL_FIELDS = [
+    "eway", "veh", "destination", "po", "amount", "cgst", "sgst", "igst", "cess", "tcs", "total"
+]
+AMOUNT_FIELDS = ["amount", "total"] + TAX_FIELDS
+# Datos propios de la orden segun el tipo
+ORDER_FIELDS = {
+    "production": ["machine"],
+    "dispatch": ["name", "phone", "address", "email"],
+}
+
+
+# Columnas del CSV: una fila por item, con los datos de la orden repetidos
+def csv_fields(kind):
+    return ["ref", "time"] + ORDER_FIELDS[kind] + ["stock", "quantity"] + DETAIL_FIELDS
+
+
+# Items (con su producto) y ultimo detalle de las ordenes --ids--, en una
+# consulta cada uno
+def order_children(kind, ids):
+    order_model, item_model, details_model, direction = ORDER_TYPES[kind]
+    items = defaultdict(list)
+    for item in (
+        item_model.objects.filter(orderno__in=ids).select_related("stock").order_by("orderno", "id")
+    ):
+        items[item.orderno_id].append(item)
+    details = {}
+    # En orden de id: cada detalle pisa al anterior y queda el ultimo
+    for detail in details_model.objects.filter(orderno__in=ids).order_by("id"):
+        details[detail.orderno_id] = detail
+    return items, details
+
+
+# Recorre las ordenes por lotes de --chunk_size-- (ordenadas por nro), trayendo
+# items y detalles de cada lote en una consulta, con memoria acotada
+def iter_orders(kind, orders=None, chunk_size=1000):
+    if orders is None:
+        orders = ORDER_TYPES[kind][0].objects.all()
+    if kind == "production":
+        orders = orders.select_related("machine")
+    orders = orders.order_by("orderno")
+    last = None
+    while True:
+        batch = orders if last is None else orders.filter(orderno__gt=last)
+        batch = list(batch[:chunk_size])
+        if not batch:
+            return
+        items, details = order_children(kind, [order.pk for order in batch])
+        for order in batch:
+            yield order, items[order.pk], details.get(order.pk)
+        last = batch[-1].pk
+
+
+def order_values(kind, order):
+    if kind == "production":
+        return {"machine": order.machine.name}
+    return {field: getattr(order, field) for field in ORDER_FIELDS[kind]}
+
+
+# Detalles de un registro importado, con los importes como Decimal. El total
+# se recalcula; si el registro no trae importe neto (exportado antes de que
+# existiera) se toma el total menos los impuestos.
+def parse_details(values):
+    details = {}
+    for field in DETAIL_FIELDS:
+        value = values.get(field)
+        if value in (None, ""):
+            continue
+        if field in AMOUNT_FIELDS:
+            try:
+                value = Decimal(str(value).strip())
+            except InvalidOperation:
+                raise ValueError("importe invalido en %s: %s" % (field, value))
+            if not value.is_finite():
+                raise ValueError("importe invalido en %s: %s" % (field, value))
+        details[field] = value
+    total = details.pop("total", None)
+    if total is not None and "amount" not in details:
+        taxes = sum(details.get(field, 0) for field in TAX_FIELDS)
+        details["amount"] = max(total - taxes, Decimal("0"))
+    return details
+
+
+def details_values(details):
+    if details is None:
+        return {}
+    return {field: getattr(details, field) for field in DETAIL_FIELDS}
+
+
+# Una orden completa como registro JSON
+def order_record(kind, order, items, details):
+    record = {"ref": order.pk, "time": order.time.isoformat()}
+    record.update(order_values(kind, order))
+    record["items"] = [{"stock": item.stock.name, "quantity": item.quantity} for item in items]
+    record["details"] = details_values(details)
+    return record
+
+
+# Filas CSV de una orden; una orden sin items genera una fila sin producto
+def order_rows(kind, order, items, details):
+    base = {"ref": order.pk, "time": order.time.isoformat()}
+    base.update(order_values(kind, order))
+    base.update(details_values(details))
+    for item in items or [None]:
+        row = dict(base)
+        row["stock"] = item.stock.name if item else ""
+        row["quantity"] = item.quantity if item else ""
+        yield row
+
+
+# Filtra ordenes entre dos fechas (inclusive) en la zona horaria actual.
+# --field-- permite filtrar otros modelos por la fecha de su orden.
+def filter_by_date(orders, start=None, end=None, field="time"):
+    tz = timezone.get_current_timezone()
+    if start:
+        start = datetime.datetime.combine(start, datetime.time.min)
+        orders = orders.filter(**{field + "__gte": timezone.make_aware(start, tz)})
+    if end:
+        end = datetime.datetime.combine(end + datetime.timedelta(days=1), datetime.time.min)
+        orders = orders.filter(**{field + "__lt": timezone.make_aware(end, tz)})
+    return orders
+
+
+# Ordenes de un tipo filtradas por fecha y, en produccion, por equipo
+def select_orders(kind, start=None, end=None, machine=None):
+    orders = filter_by_date(ORDER_TYPES[kind][0].objects.all(), start, end)
+    if machine:
+        orders = orders.filter(machine=machine)
+    return orders
+
+
+# Una pagina de ordenes, las mas nuevas primero, como registros JSON. Se
+# pagina por cursor; se cachea hasta que cambien ordenes, productos o equipos.
+def order_page(kind, cursor=None, per_page=20):
+    key = versioned_key(
+        "order-page:%s" % kind, ("orders", "stock", "machines"), cursor, per_page
+    )
+    data = cache.get(key)
+    if data is None:
+        orders = ORDER_TYPES[kind][0].objects.all()
+        if kind == "production":
+            orders = orders.select_related("machine")
+        page = KeysetPaginator(orders, per_page, ("-time", "-orderno")).page(cursor)
+        items, details = order_children(kind, [order.pk for order in page])
+        data = {
+            "results": [
+                order_record(kind, order, items[order.pk], details.get(order.pk))
+                for order in page
+            ],
+            "next": page.next_cursor,
+            "previous": page.previous_cursor,
+        }
+        cache.set(key, data, cache_timeout())
+    return data
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from operations.archive import ARCHIVES, archive_cutoff, archive_deleted
+
+
+class Command(BaseCommand):
+    help = (
+        "Mueve a la tabla de archivo los productos y equipos borrados hace mas de "
+        "--days dias, junto con sus ordenes e historial, por lotes"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, help="Dias desde el borrado (por defecto ARCHIVE_AFTER_DAYS)"
+        )
+        parser.add_argument("--batch-size", type=int, default=100, help="Filas por transaccion")
+        parser.add_argument("--dry-run", action="store_true", help="Solo cuenta las filas a archivar")
+
+    def handle(self, *args, **options):
+        before = archive_cutoff(options["days"])
+        for name, (model, archive) in ARCHIVES.items():
+            label = model._meta.verbose_name_plural
+            if options["dry_run"]:
+                count = model.objects.deleted(before).count()
+                self.stdout.write("%s: %d para archivar" % (label, count))
+                continue
+            rows = orders = 0
+            for batch_rows, batch_orders in archive_deleted(name, before, options["batch_size"]):
+                rows += batch_rows
+                orders += batch_orders
+                self.stdout.write("%s: %d archivados" % (label, rows))
+            self.stdout.write("%s: %d archivados con %d ordenes" % (label, rows, orders))
@@ -0,0 +1,117 @@
+import json
+import logging
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from operations.benchmark import (
+    SCENARIOS,
+    WRITE_SCENARIOS,
+    Context,
+    benchmark_user,
+    compare,
+    run_scenario,
+    run_scenario_asgi,
+    seed_data,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Crea una base de prueba con datos sinteticos y recorre las paginas "
+        "principales con varios clientes a la vez, midiendo latencia, "
+        "requests por segundo y consultas por request"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--stocks", type=int, default=5000)
+        parser.add_argument("--machines", type=int, default=20)
+        parser.add_argument("--orders", type=int, default=5000)
+        parser.add_argument("--items", type=int, default=3, help="Items por orden")
+        parser.add_argument("--requests", type=int, default=200, help="Requests por escenario")
+        parser.add_argument("--concurrency", type=int, default=4, help="Clientes simultaneos")
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            choices=sorted(SCENARIOS),
+            help="Escenario a medir (se puede repetir); por defecto todos",
+        )
+        parser.add_argument(
+            "--handler",
+            choices=["wsgi", "asgi", "both"],
+            default="wsgi",
+            help="wsgi: cliente de tests en hilos; asgi: core.asgi en un event loop "
+            "(solo escenarios de lectura)",
+        )
+        parser.add_argument("--output", help="Guarda los resultados en un archivo JSON")
+        parser.add_argument("--compare", help="Compara con un resultado JSON anterior")
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=1.5,
+            help="Factor de lentitud del p95 respecto al anterior que se marca como regresion",
+        )
+
+    def handle(self, *args, **options):
+        if options["concurrency"] < 1 or options["requests"] < 1:
+            raise CommandError("--requests y --concurrency deben ser mayores a cero")
+        if options["requests"] > options["orders"]:
+            raise CommandError("--orders debe alcanzar para los escenarios de borrado")
+        scenarios = options["scenario"] or list(SCENARIOS)
+        # Nunca toca la base real: crea y destruye una base de prueba
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            seed_data(options["stocks"], options["machines"], options["orders"], options["items"])
+            cache.clear()
+            user = benchmark_user()
+            ctx = Context()
+            # Los errores se resumen por escenario; sin el traceback de cada uno
+            logging.getLogger("django.request").setLevel(logging.CRITICAL)
+            handlers = ["wsgi", "asgi"] if options["handler"] == "both" else [options["handler"]]
+            results = {}
+            for name in scenarios:
+                for handler in handlers:
+                    if handler == "asgi" and name in WRITE_SCENARIOS:
+                        continue
+                    run = run_scenario_asgi if handler == "asgi" else run_scenario
+                    # Las claves de wsgi quedan sin sufijo, como en resultados anteriores
+                    key = name if handler == "wsgi" else "%s@asgi" % name
+                    results[key] = run(
+                        name, ctx, user, options["requests"], options["concurrency"]
+                    )
+                    self.report(key, results[key])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        if options["output"]:
+            with open(options["output"], "w") as fh:
+                json.dump(results, fh, indent=2)
+        if options["compare"]:
+            with open(options["compare"]) as fh:
+                baseline = json.load(fh)
+            regressions = compare(results, baseline, options["threshold"])
+            for name, flags in regressions.items():
+                self.stdout.write(self.style.WARNING("%s: %s" % (name, ", ".join(flags))))
+            self.stdout.write("%d escenarios con regresiones" % len(regressions))
+
+    def report(self, name, result):
+        self.stdout.write(
+            "%-24s %5d req %7.1f req/s  p50 %8.2f ms  p95 %8.2f ms  p99 %8.2f ms  "
+            "consultas %5.1f (max %d)"
+            % (
+                name,
+                result["requests"],
+                result["throughput_rps"],
+                result["p50_ms"],
+                result["p95_ms"],
+                result["p99_ms"],
+                result["mean_queries"],
+                result["max_queries"],
+            )
+        )
+        if result["errors"]:
+            self.stdout.write(
+                self.style.ERROR(
+                    "    %d errores, p. ej. %s" % (result["errors"], result["first_error"])
+                )
+            )
@@ -0,0 +1,106 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from inventory.models import Stock
+from operations.benchmark import seed_data
+from operations.models import ProductionMachine, ProductionOrder, DispatchOrder
+
+
+# Consultas frecuentes de los listados, formularios y dashboard
+def hot_queries():
+    machine = ProductionMachine.active.order_by("id").first()
+    return {
+        "stock_active_list": Stock.active.order_by("id")[:10],
+        "stock_dashboard_top": Stock.active.all()
+        .order_by("-quantity")
+        .values_list("name", "quantity")[:20],
+        "stock_search": Stock.active.filter(name__icontains="123")[:10],
+        "machine_active_list": ProductionMachine.active.order_by("id")[:10],
+        "machine_by_name": ProductionMachine.objects.filter(name=machine.name),
+        "machine_orders": ProductionOrder.objects.filter(machine=machine).order_by("-time")[:10],
+        "production_list": ProductionOrder.objects.order_by("-time", "-orderno")[:10],
+        "dispatch_list": DispatchOrder.objects.order_by("-time", "-orderno")[:10],
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Crea una base de prueba con datos sinteticos y mide plan y tiempo "
+        "de las consultas mas frecuentes"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--stocks", type=int, default=20000)
+        parser.add_argument("--machines", type=int, default=50)
+        parser.add_argument("--orders", type=int, default=20000)
+        parser.add_argument("--items", type=int, default=3, help="Items por orden")
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--output", help="Guarda los resultados en un archivo JSON")
+        parser.add_argument("--compare", help="Compara con un resultado JSON anterior")
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=1.5,
+            help="Factor de lentitud respecto al anterior que se marca como regresion",
+        )
+
+    def handle(self, *args, **options):
+        # Nunca toca la base real: crea y destruye una base de prueba
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            self.seed(options)
+            results = self.measure(options["repeat"])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        for name, result in results.items():
+            self.stdout.write(
+                "%-22s mediana %8.3f ms  min %8.3f ms" % (name, result["median_ms"], result["min_ms"])
+            )
+            for line in result["plan"].splitlines():
+                self.stdout.write("    " + line)
+        if options["output"]:
+            with open(options["output"], "w") as fh:
+                json.dump(results, fh, indent=2)
+        if options["compare"]:
+            self.compare(results, options["compare"], options["threshold"])
+
+    def seed(self, options):
+        seed_data(options["stocks"], options["machines"], options["orders"], options["items"])
+
+    def measure(self, repeat):
+        results = {}
+        for name, queryset in hot_queries().items():
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                list(queryset.all())
+                timings.append((time.perf_counter() - start) * 1000)
+            results[name] = {
+                "median_ms": statistics.median(timings),
+                "min_ms": min(timings),
+                "plan": queryset.explain(),
+            }
+        return results
+
+    def compare(self, results, path, threshold):
+        with open(path) as fh:
+            baseline = json.load(fh)
+        regressions = 0
+        for name, result in results.items():
+            previous = baseline.get(name)
+            if previous is None:
+                continue
+            ratio = result["median_ms"] / max(previous["median_ms"], 1e-6)
+            flags = []
+            if ratio > threshold:
+                flags.append("mas lenta x%.2f" % ratio)
+            if result["plan"] != previous["plan"]:
+                flags.append("plan distinto")
+            if flags:
+                regressions += 1
+                self.stdout.write(self.style.WARNING("%s: %s" % (name, ", ".join(flags))))
+        self.stdout.write("%d consultas con regresiones" % regressions)
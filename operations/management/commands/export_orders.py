@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from core.dataio import RecordWriter, open_output
+from operations.history import ORDER_TYPES, csv_fields, iter_orders, order_record, order_rows
+
+
+class Command(BaseCommand):
+    help = "Exporta el historial de ordenes de produccion o despacho a CSV/JSONL"
+
+    def add_arguments(self, parser):
+        parser.add_argument("type", choices=sorted(ORDER_TYPES))
+        parser.add_argument("--format", choices=["csv", "jsonl"], default="csv")
+        parser.add_argument("--output", help="Archivo de salida (por defecto stdout)")
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        kind = options["type"]
+        with open_output(options["output"], self.stdout) as fh:
+            writer = RecordWriter(fh, options["format"], csv_fields(kind))
+            for order, items, details in iter_orders(kind, chunk_size=options["chunk_size"]):
+                if options["format"] == "csv":
+                    for row in order_rows(kind, order, items, details):
+                        writer.write(row)
+                else:
+                    writer.write(order_record(kind, order, items, details))
@@ -0,0 +1,197 @@
+from collections import defaultdict
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from core.cache import bump_version
+from core.dataio import bulk_create_with_pks, chunked, detect_format, open_input, read_records
+from inventory.history import record_daily
+from inventory.models import Stock, StockMovement
+from inventory.services import ORDER_REASONS, aggregate_quantities, update_quantities
+from operations.history import DETAIL_FIELDS, ORDER_FIELDS, ORDER_TYPES, parse_details
+from operations.models import ProductionMachine
+from operations.rollups import record_production
+
+
+# Agrupa las filas CSV consecutivas con la misma referencia en una orden
+def group_rows(records):
+    current = None
+    for lineno, row in records:
+        if not isinstance(row, dict):
+            yield lineno, row
+            continue
+        ref = row.get("ref") or None
+        if current is not None and ref is not None and current[1].get("ref") == ref:
+            order = current[1]
+        else:
+            if current is not None:
+                yield current
+            order = {key: value for key, value in row.items() if key not in ("stock", "quantity")}
+            order["details"] = {field: row.get(field) for field in DETAIL_FIELDS if row.get(field)}
+            order["items"] = []
+            current = (lineno, order)
+        if row.get("stock"):
+            order["items"].append({"stock": row["stock"], "quantity": row.get("quantity")})
+    if current is not None:
+        yield current
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa ordenes historicas de produccion o despacho desde CSV/JSONL. "
+        "Los productos deben existir; los equipos faltantes se crean"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("type", choices=sorted(ORDER_TYPES))
+        parser.add_argument("path", help="Archivo a importar, o - para stdin")
+        parser.add_argument("--format", choices=["csv", "jsonl"])
+        parser.add_argument("--batch-size", type=int, default=500, help="Ordenes por lote")
+        parser.add_argument(
+            "--apply-stock",
+            action="store_true",
+            help="Aplica las cantidades al stock actual (por defecto solo se carga el historial)",
+        )
+
+    def handle(self, *args, **options):
+        self.kind = options["type"]
+        fmt = detect_format(options["path"], options["format"])
+        processed = created = errors = 0
+        with open_input(options["path"]) as fh:
+            records = read_records(fh, fmt)
+            if fmt == "csv":
+                records = group_rows(records)
+            for chunk in chunked(records, options["batch_size"]):
+                orders = []
+                for lineno, record in chunk:
+                    try:
+                        orders.append(self.parse(record))
+                    except ValueError as exc:
+                        errors += 1
+                        self.stderr.write("Linea %d: %s" % (lineno, exc))
+                orders, bad = self.resolve_stocks(orders)
+                errors += len(bad)
+                for ref, name in bad:
+                    self.stderr.write("Orden %s: no existe el producto %s" % (ref, name))
+                created += self.apply(orders, options["apply_stock"])
+                processed += len(chunk)
+                self.stdout.write("%d ordenes procesadas" % processed)
+        self.stdout.write("%d ordenes creadas, %d con errores" % (created, errors))
+
+    def parse(self, record):
+        if not isinstance(record, dict):
+            raise ValueError(record)
+        order = {"ref": record.get("ref")}
+        time = record.get("time")
+        if time:
+            order["time"] = parse_datetime(str(time))
+            if order["time"] is None:
+                raise ValueError("fecha invalida: %s" % time)
+            if timezone.is_naive(order["time"]):
+                order["time"] = timezone.make_aware(order["time"])
+        else:
+            order["time"] = timezone.now()
+        for field in ORDER_FIELDS[self.kind]:
+            order[field] = str(record.get(field) or "").strip()
+        if not order[ORDER_FIELDS[self.kind][0]]:
+            raise ValueError("falta el campo %s" % ORDER_FIELDS[self.kind][0])
+        order["items"] = []
+        for item in record.get("items") or []:
+            try:
+                quantity = int(item.get("quantity"))
+            except (TypeError, ValueError):
+                raise ValueError("cantidad invalida: %s" % item.get("quantity"))
+            if quantity <= 0:
+                raise ValueError("cantidad invalida: %s" % quantity)
+            order["items"].append((str(item.get("stock") or "").strip(), quantity))
+        order["details"] = parse_details(record.get("details") or {})
+        return order
+
+    # Reemplaza nombres de producto por ids; descarta ordenes con productos
+    # inexistentes o borrados
+    def resolve_stocks(self, orders):
+        names = {name for order in orders for name, quantity in order["items"]}
+        stocks = Stock.active.filter(name__in=names).in_bulk(field_name="name")
+        valid, bad = [], []
+        for order in orders:
+            missing = [name for name, quantity in order["items"] if name not in stocks]
+            if missing:
+                bad.append((order["ref"], missing[0]))
+                continue
+            order["items"] = [(stocks[name].pk, quantity) for name, quantity in order["items"]]
+            valid.append(order)
+        return valid, bad
+
+    # Equipos activos por nombre; los que no existen o estan borrados se crean
+    def machines(self, orders):
+        names = {order["machine"] for order in orders}
+        machines = {
+            machine.name: machine
+            for machine in ProductionMachine.active.filter(name__in=names).order_by("-id")
+        }
+        missing = [ProductionMachine(name=name) for name in names if name not in machines]
+        for machine in bulk_create_with_pks(ProductionMachine, missing):
+            machines[machine.name] = machine
+        if missing:
+            bump_version("machines")
+        return machines
+
+    @transaction.atomic
+    def apply(self, orders, apply_stock):
+        if not orders:
+            return 0
+        order_model, item_model, details_model, direction = ORDER_TYPES[self.kind]
+        if self.kind == "production":
+            machines = self.machines(orders)
+            objs = [order_model(machine=machines[order["machine"]]) for order in orders]
+        else:
+            objs = [
+                order_model(**{field: order[field] for field in ORDER_FIELDS[self.kind]})
+                for order in orders
+            ]
+        bulk_create_with_pks(order_model, objs)
+        # auto_now pisa la fecha al crear: se restaura la fecha historica
+        for obj, order in zip(objs, orders):
+            obj.time = order["time"]
+        order_model.objects.bulk_update(objs, ["time"])
+        details = [details_model(orderno=obj, **order["details"]) for obj, order in zip(objs, orders)]
+        for obj in details:
+            obj.update_total()
+        details_model.objects.bulk_create(details)
+        order_items = [
+            [
+                item_model(orderno=obj, stock_id=stock_id, quantity=quantity)
+                for stock_id, quantity in order["items"]
+            ]
+            for obj, order in zip(objs, orders)
+        ]
+        items = [item for group in order_items for item in group]
+        item_model.objects.bulk_create(items)
+        # bulk_create no dispara senales: invalida a mano el cache de listados
+        bump_version("orders")
+        if self.kind == "production":
+            for obj, group in zip(objs, order_items):
+                record_production(obj, group)
+        if apply_stock:
+            update_quantities(aggregate_quantities(items), direction)
+            # El historial y la serie diaria quedan en el dia de cada orden
+            movements, days = [], defaultdict(lambda: defaultdict(int))
+            for obj, group in zip(objs, order_items):
+                day = timezone.localdate(obj.time)
+                for stock_id, quantity in aggregate_quantities(group).items():
+                    if not quantity:
+                        continue
+                    movements.append(
+                        StockMovement(
+                            stock_id=stock_id,
+                            quantity=direction * quantity,
+                            reason=ORDER_REASONS[direction],
+                            orderno=obj.pk,
+                            time=obj.time,
+                        )
+                    )
+                    days[day][stock_id] += direction * quantity
+            StockMovement.objects.bulk_create(movements)
+            for day, deltas in sorted(days.items()):
+                record_daily(deltas, day)
+        return len(objs)
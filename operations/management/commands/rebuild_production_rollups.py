@@ -0,0 +1,34 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from operations.rollups import rebuild_rollups
+from operations.tasks import rebuild_production_rollups
+
+
+def parse_date(value):
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise CommandError("Fecha invalida: %s (use AAAA-MM-DD)" % value)
+
+
+class Command(BaseCommand):
+    help = "Recalcula los totales de produccion por equipo, producto y dia"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", type=parse_date, help="Fecha inicial AAAA-MM-DD")
+        parser.add_argument("--end", type=parse_date, help="Fecha final AAAA-MM-DD")
+        parser.add_argument(
+            "--background", action="store_true", help="Encola el trabajo (ver run_jobs)"
+        )
+
+    def handle(self, *args, **options):
+        if options["background"]:
+            job = rebuild_production_rollups.delay(
+                options["start"] and options["start"].isoformat(),
+                options["end"] and options["end"].isoformat(),
+            )
+            self.stdout.write("Trabajo %d encolado" % job.pk)
+            return
+        count = rebuild_rollups(options["start"], options["end"])
+        self.stdout.write("%d totales de produccion generados" % count)
@@ -0,0 +1,50 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from operations.documents import cache_dir, render_documents
+from operations.history import ORDER_TYPES, select_orders
+from operations import tasks
+
+
+def parse_date(value):
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise CommandError("Fecha invalida: %s (use AAAA-MM-DD)" % value)
+
+
+class Command(BaseCommand):
+    help = "Genera en paralelo los PDF de las ordenes de un rango de fechas"
+
+    def add_arguments(self, parser):
+        parser.add_argument("type", choices=sorted(ORDER_TYPES))
+        parser.add_argument("--start", type=parse_date, help="Fecha inicial AAAA-MM-DD")
+        parser.add_argument("--end", type=parse_date, help="Fecha final AAAA-MM-DD")
+        parser.add_argument("--machine", type=int, help="Solo ordenes de este equipo (produccion)")
+        parser.add_argument("--workers", type=int, help="Procesos (por defecto uno por CPU)")
+        parser.add_argument("--chunk-size", type=int, default=500)
+        parser.add_argument(
+            "--background", action="store_true", help="Encola el trabajo (ver run_jobs)"
+        )
+
+    def handle(self, *args, **options):
+        kind = options["type"]
+        if options["machine"] and kind != "production":
+            raise CommandError("--machine solo aplica a ordenes de produccion")
+        if options["background"]:
+            job = tasks.render_documents.delay(
+                kind,
+                options["start"] and options["start"].isoformat(),
+                options["end"] and options["end"].isoformat(),
+                options["machine"],
+                workers=options["workers"],
+            )
+            self.stdout.write("Trabajo %d encolado" % job.pk)
+            return
+        orders = select_orders(kind, options["start"], options["end"], options["machine"])
+        rendered, cached = render_documents(
+            kind, orders, workers=options["workers"], chunk_size=options["chunk_size"]
+        )
+        self.stdout.write(
+            "%d PDF generados, %d ya estaban en %s" % (rendered, cached, cache_dir())
+        )
@@ -0,0 +1,95 @@
+# Generated by Django 3.2.16 on 2026-10-18 14:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('inventory', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DispatchOrder',
+            fields=[
+                ('orderno', models.AutoField(primary_key=True, serialize=False)),
+                ('time', models.DateTimeField(auto_now=True)),
+                ('name', models.CharField(max_length=150)),
+                ('phone', models.CharField(max_length=12)),
+                ('address', models.CharField(max_length=200)),
+                ('email', models.EmailField(max_length=254)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProductionMachine',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=150)),
+                ('is_deleted', models.BooleanField(default=False)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProductionOrder',
+            fields=[
+                ('orderno', models.AutoField(primary_key=True, serialize=False)),
+                ('time', models.DateTimeField(auto_now=True)),
+                ('machine', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='productionmachine', to='operations.productionmachine')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProductionOrderDetails',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('eway', models.CharField(blank=True, max_length=50, null=True)),
+                ('veh', models.CharField(blank=True, max_length=50, null=True)),
+                ('destination', models.CharField(blank=True, max_length=50, null=True)),
+                ('po', models.CharField(blank=True, max_length=50, null=True)),
+                ('cgst', models.CharField(blank=True, max_length=50, null=True)),
+                ('sgst', models.CharField(blank=True, max_length=50, null=True)),
+                ('igst', models.CharField(blank=True, max_length=50, null=True)),
+                ('cess', models.CharField(blank=True, max_length=50, null=True)),
+                ('tcs', models.CharField(blank=True, max_length=50, null=True)),
+                ('total', models.IntegerField(default=0)),
+                ('orderno', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='productiondetailsorderno', to='operations.productionorder')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProductionItem',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField(default=1)),
+                ('orderno', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='productionorderno', to='operations.productionorder')),
+                ('stock', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='productionitem', to='inventory.stock')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DispatchOrderDetails',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('eway', models.CharField(blank=True, max_length=50, null=True)),
+                ('veh', models.CharField(blank=True, max_length=50, null=True)),
+                ('destination', models.CharField(blank=True, max_length=50, null=True)),
+                ('po', models.CharField(blank=True, max_length=50, null=True)),
+                ('cgst', models.CharField(blank=True, max_length=50, null=True)),
+                ('sgst', models.CharField(blank=True, max_length=50, null=True)),
+                ('igst', models.CharField(blank=True, max_length=50, null=True)),
+                ('cess', models.CharField(blank=True, max_length=50, null=True)),
+                ('tcs', models.CharField(blank=True, max_length=50, null=True)),
+                ('total', models.IntegerField(default=0)),
+                ('orderno', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dispatchdetailsorderno', to='operations.dispatchorder')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DispatchItem',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField(default=1)),
+                ('orderno', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dispatchorderno', to='operations.dispatchorder')),
+                ('stock', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dispatchitem', to='inventory.stock')),
+            ],
+        ),
+    ]
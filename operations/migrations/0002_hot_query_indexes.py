@@ -0,0 +1,33 @@
+# Generated by Django 3.2.16 on 2026-10-18 14:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('operations', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dispatchorder',
+            index=models.Index(fields=['-time', '-orderno'], name='dispatch_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productionmachine',
+            index=models.Index(fields=['name'], name='machine_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productionmachine',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['id'], name='machine_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productionorder',
+            index=models.Index(fields=['-time', '-orderno'], name='production_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productionorder',
+            index=models.Index(fields=['machine', '-time'], name='production_machine_time_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.16 on 2026-10-18 14:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('operations', '0002_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dispatchorderdetails',
+            name='modified',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='productionorderdetails',
+            name='modified',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 3.2.16 on 2026-10-18 14:25
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+# Totales iniciales a partir de las producciones existentes
+def populate_rollups(apps, schema_editor):
+    ProductionItem = apps.get_model("operations", "ProductionItem")
+    ProductionRollup = apps.get_model("operations", "ProductionRollup")
+    tz = timezone.get_current_timezone()
+    rows = (
+        ProductionItem.objects.values_list(
+            "orderno__machine", "stock", TruncDate("orderno__time", tzinfo=tz)
+        )
+        .annotate(quantity=Sum("quantity"), orders=Count("orderno", distinct=True))
+        .order_by()
+    )
+    ProductionRollup.objects.bulk_create(
+        (
+            ProductionRollup(
+                machine_id=machine_id, stock_id=stock_id, day=day, quantity=quantity, orders=orders
+            )
+            for machine_id, stock_id, day, quantity, orders in rows.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0005_stock_alerts'),
+        ('operations', '0003_details_modified'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductionRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('quantity', models.IntegerField(default=0)),
+                ('orders', models.IntegerField(default=0)),
+                ('machine', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='operations.productionmachine')),
+                ('stock', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='productionrollups', to='inventory.stock')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='productionrollup',
+            index=models.Index(fields=['day', 'machine'], name='production_rollup_day_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='productionrollup',
+            constraint=models.UniqueConstraint(fields=('machine', 'stock', 'day'), name='production_rollup_unique'),
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
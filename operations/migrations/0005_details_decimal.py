@@ -0,0 +1,80 @@
+# Generated by Django 3.2.16 on 2026-10-18 14:50
+
+from decimal import Decimal, InvalidOperation
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+DETAILS_MODELS = ['productionorderdetails', 'dispatchorderdetails']
+TAX_FIELDS = ['cgst', 'sgst', 'igst', 'cess', 'tcs']
+
+
+def parse_amount(value):
+    try:
+        amount = Decimal(str(value or '0').strip().replace(',', '.') or '0')
+    except InvalidOperation:
+        return Decimal('0')
+    if not amount.is_finite():
+        return Decimal('0')
+    return amount.quantize(Decimal('0.01'))
+
+
+# Los impuestos pasan de texto a numero: los valores que no se pueden leer
+# quedan en 0. El total cargado a mano se conserva como importe neto mas
+# impuestos, asi las ordenes existentes mantienen su total. Excepcion: si los
+# impuestos leidos superan el total anterior, el importe neto queda en 0 (no
+# se admiten importes negativos) y compute_totals recalcula el total como la
+# suma de los impuestos, mayor que el cargado.
+def normalize_details(apps, schema_editor):
+    for name in DETAILS_MODELS:
+        model = apps.get_model('operations', name)
+        batch = []
+        for details in model.objects.only('id', 'total', *TAX_FIELDS).iterator(chunk_size=1000):
+            taxes = [parse_amount(getattr(details, field)) for field in TAX_FIELDS]
+            for field, value in zip(TAX_FIELDS, taxes):
+                setattr(details, field, str(value))
+            details.amount = max(Decimal(details.total or 0) - sum(taxes), Decimal('0'))
+            batch.append(details)
+            if len(batch) >= 1000:
+                model.objects.bulk_update(batch, TAX_FIELDS + ['amount'])
+                batch = []
+        model.objects.bulk_update(batch, TAX_FIELDS + ['amount'])
+
+
+def compute_totals(apps, schema_editor):
+    for name in DETAILS_MODELS:
+        model = apps.get_model('operations', name)
+        total = F('amount')
+        for field in TAX_FIELDS:
+            total = total + F(field)
+        model.objects.update(total=total)
+
+
+def amount_field(**kwargs):
+    return models.DecimalField(decimal_places=2, default=0, max_digits=12, **kwargs)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('operations', '0004_production_rollups'),
+    ]
+
+    operations = [
+        *[
+            migrations.AddField(model_name=name, name='amount', field=amount_field())
+            for name in DETAILS_MODELS
+        ],
+        migrations.RunPython(normalize_details, migrations.RunPython.noop),
+        *[
+            migrations.AlterField(model_name=name, name=field, field=amount_field())
+            for name in DETAILS_MODELS
+            for field in TAX_FIELDS
+        ],
+        *[
+            migrations.AlterField(model_name=name, name='total', field=amount_field(editable=False))
+            for name in DETAILS_MODELS
+        ],
+        migrations.RunPython(compute_totals, migrations.RunPython.noop),
+    ]
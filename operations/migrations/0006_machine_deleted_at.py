@@ -0,0 +1,33 @@
+# Generated by Django 3.2.16 on 2026-10-18 14:54
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+# Los borrados anteriores no tienen fecha: se toma la de la migracion, asi
+# se archivan recien cuando pase el plazo de retencion
+def date_existing_deletes(apps, schema_editor):
+    ProductionMachine = apps.get_model("operations", "ProductionMachine")
+    ProductionMachine.objects.filter(is_deleted=True, deleted_at__isnull=True).update(
+        deleted_at=django.utils.timezone.now()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('operations', '0005_details_decimal'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productionmachine',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='productionmachine',
+            index=models.Index(condition=models.Q(('is_deleted', True)), fields=['deleted_at'], name='machine_deleted_idx'),
+        ),
+        migrations.RunPython(date_existing_deletes, migrations.RunPython.noop),
+    ]
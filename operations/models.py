@@ -1,11 +1,28 @@
+from decimal import Decimal
+
 from django.db import models
+from core.models import SoftDeleteModel
 from inventory.models import Stock
 
 
-class ProductionMachine(models.Model):
+class ProductionMachine(SoftDeleteModel):
     id = models.AutoField(primary_key=True)
     name = models.CharField(max_length=150)
-    is_deleted = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["name"], name="machine_name_idx"),
+            models.Index(
+                fields=["id"],
+                name="machine_active_idx",
+                condition=models.Q(is_deleted=False),
+            ),
+            models.Index(
+                fields=["deleted_at"],
+                name="machine_deleted_idx",
+                condition=models.Q(is_deleted=True),
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -18,11 +35,18 @@ class ProductionOrder(models.Model):
         ProductionMachine, on_delete=models.CASCADE, related_name="productionmachine"
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["-time", "-orderno"], name="production_time_idx"),
+            models.Index(fields=["machine", "-time"], name="production_machine_time_idx"),
+        ]
+
     def __str__(self):
         return "Orden nro: " + str(self.orderno)
 
     def get_items_list(self):
-        return ProductionItem.objects.filter(orderno=self)
+        # Usa los items precargados con prefetch_related si existen
+        return self.productionorderno.all()
 
 
 class ProductionItem(models.Model):
@@ -38,26 +62,57 @@ class ProductionItem(models.Model):
         return "Orden nro: " + str(self.orderno.orderno) + ", Item = " + self.stock.name
 
 
-class ProductionOrderDetails(models.Model):
-    orderno = models.ForeignKey(
-        ProductionOrder, on_delete=models.CASCADE, related_name="productiondetailsorderno"
-    )
+# Importes de la orden. El total no se carga: se calcula al guardar como el
+# importe neto mas los impuestos.
+TAX_FIELDS = ["cgst", "sgst", "igst", "cess", "tcs"]
+
 
+def amount_field(**kwargs):
+    return models.DecimalField(max_digits=12, decimal_places=2, default=0, **kwargs)
+
+
+# Datos de transporte e importes comunes a los detalles de produccion y despacho
+class OrderDetails(models.Model):
     eway = models.CharField(max_length=50, blank=True, null=True)
     veh = models.CharField(max_length=50, blank=True, null=True)
     destination = models.CharField(max_length=50, blank=True, null=True)
     po = models.CharField(max_length=50, blank=True, null=True)
 
-    cgst = models.CharField(max_length=50, blank=True, null=True)
-    sgst = models.CharField(max_length=50, blank=True, null=True)
-    igst = models.CharField(max_length=50, blank=True, null=True)
-    cess = models.CharField(max_length=50, blank=True, null=True)
-    tcs = models.CharField(max_length=50, blank=True, null=True)
-    total = models.IntegerField(default=0)
+    amount = amount_field()
+    cgst = amount_field()
+    sgst = amount_field()
+    igst = amount_field()
+    cess = amount_field()
+    tcs = amount_field()
+    total = amount_field(editable=False)
+    modified = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
 
     def __str__(self):
         return "Orden nro: " + str(self.orderno.orderno)
 
+    def taxes(self):
+        return sum(Decimal(str(getattr(self, field) or 0)) for field in TAX_FIELDS)
+
+    # Las altas masivas (bulk_create) no pasan por save: llaman a este metodo
+    def update_total(self):
+        self.total = Decimal(str(self.amount or 0)) + self.taxes()
+        return self.total
+
+    def save(self, *args, **kwargs):
+        self.update_total()
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = set(kwargs["update_fields"]) | {"total"}
+        super().save(*args, **kwargs)
+
+
+class ProductionOrderDetails(OrderDetails):
+    orderno = models.ForeignKey(
+        ProductionOrder, on_delete=models.CASCADE, related_name="productiondetailsorderno"
+    )
+
 
 class DispatchOrder(models.Model):
     orderno = models.AutoField(primary_key=True)
@@ -68,11 +123,17 @@ class DispatchOrder(models.Model):
     address = models.CharField(max_length=200)
     email = models.EmailField(max_length=254)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["-time", "-orderno"], name="dispatch_time_idx"),
+        ]
+
     def __str__(self):
         return "Orden nro: " + str(self.orderno)
 
     def get_items_list(self):
-        return DispatchItem.objects.filter(orderno=self)
+        # Usa los items precargados con prefetch_related si existen
+        return self.dispatchorderno.all()
 
 
 class DispatchItem(models.Model):
@@ -86,22 +147,30 @@ class DispatchItem(models.Model):
         return "Orden nro: " + str(self.orderno.orderno) + ", Item = " + self.stock.name
 
 
-class DispatchOrderDetails(models.Model):
+class DispatchOrderDetails(OrderDetails):
     orderno = models.ForeignKey(
         DispatchOrder, on_delete=models.CASCADE, related_name="dispatchdetailsorderno"
     )
 
-    eway = models.CharField(max_length=50, blank=True, null=True)
-    veh = models.CharField(max_length=50, blank=True, null=True)
-    destination = models.CharField(max_length=50, blank=True, null=True)
-    po = models.CharField(max_length=50, blank=True, null=True)
 
-    cgst = models.CharField(max_length=50, blank=True, null=True)
-    sgst = models.CharField(max_length=50, blank=True, null=True)
-    igst = models.CharField(max_length=50, blank=True, null=True)
-    cess = models.CharField(max_length=50, blank=True, null=True)
-    tcs = models.CharField(max_length=50, blank=True, null=True)
-    total = models.IntegerField(default=0)
+# Totales producidos por equipo, producto y dia. Se mantiene al crear y borrar
+# producciones (ver rollups.py) para que los reportes no recorran las ordenes.
+class ProductionRollup(models.Model):
+    machine = models.ForeignKey(
+        ProductionMachine, on_delete=models.CASCADE, related_name="rollups"
+    )
+    stock = models.ForeignKey(Stock, on_delete=models.CASCADE, related_name="productionrollups")
+    day = models.DateField()
+    quantity = models.IntegerField(default=0)
+    orders = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["machine", "stock", "day"], name="production_rollup_unique"
+            ),
+        ]
+        indexes = [models.Index(fields=["day", "machine"], name="production_rollup_day_idx")]
 
     def __str__(self):
-        return "Orden nro: " + str(self.orderno.orderno)
+        return "%s %s %s: %d" % (self.machine_id, self.stock_id, self.day, self.quantity)
@@ -0,0 +1,87 @@
+import zlib
+
+
+# Generador minimo de PDF en Python puro: paginas A4 con texto en Courier y
+# lineas horizontales. Alcanza para remitos y ordenes sin dependencias externas.
+PAGE_WIDTH = 595
+PAGE_HEIGHT = 842
+MARGIN = 50
+FONT_SIZE = 10
+LINE_HEIGHT = 14
+CHAR_WIDTH = FONT_SIZE * 0.6  # Courier es monoespaciada
+COLUMNS = int((PAGE_WIDTH - 2 * MARGIN) / CHAR_WIDTH)
+
+
+def escape(text):
+    text = text.encode("latin-1", "replace").decode("latin-1")
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+class PDFDocument:
+    def __init__(self):
+        self.pages = []
+        self.new_page()
+
+    def new_page(self):
+        self.ops = []
+        self.pages.append(self.ops)
+        self.y = PAGE_HEIGHT - MARGIN
+
+    def ensure_space(self, height):
+        if self.y - height < MARGIN:
+            self.new_page()
+
+    def text(self, line="", size=FONT_SIZE, bold=False):
+        self.ensure_space(LINE_HEIGHT)
+        font = "F2" if bold else "F1"
+        self.ops.append(
+            "BT /%s %d Tf %d %d Td (%s) Tj ET" % (font, size, MARGIN, self.y, escape(line))
+        )
+        self.y -= LINE_HEIGHT * size / FONT_SIZE
+
+    def rule(self):
+        self.ensure_space(LINE_HEIGHT / 2)
+        y = self.y + LINE_HEIGHT / 2
+        self.ops.append("%d %.1f m %d %.1f l S" % (MARGIN, y, PAGE_WIDTH - MARGIN, y))
+        self.y -= LINE_HEIGHT / 2
+
+    def render(self):
+        objects = [
+            b"<< /Type /Catalog /Pages 2 0 R >>",
+            None,  # lista de paginas, se completa al final
+            b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>",
+            b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier-Bold /Encoding /WinAnsiEncoding >>",
+        ]
+        kids = []
+        for ops in self.pages:
+            stream = zlib.compress("\n".join(ops).encode("latin-1"))
+            objects.append(
+                b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(stream)
+                + stream
+                + b"\nendstream"
+            )
+            content = len(objects)
+            objects.append(
+                (
+                    "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+                    "/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents %d 0 R >>"
+                    % (PAGE_WIDTH, PAGE_HEIGHT, content)
+                ).encode()
+            )
+            kids.append("%d 0 R" % len(objects))
+        objects[1] = ("<< /Type /Pages /Kids [%s] /Count %d >>" % (" ".join(kids), len(kids))).encode()
+
+        out = bytearray(b"%PDF-1.4\n")
+        offsets = []
+        for number, obj in enumerate(objects, 1):
+            offsets.append(len(out))
+            out += b"%d 0 obj\n" % number + obj + b"\nendobj\n"
+        xref = len(out)
+        out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+        for offset in offsets:
+            out += b"%010d 00000 n \n" % offset
+        out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+            len(objects) + 1,
+            xref,
+        )
+        return bytes(out)
@@ -0,0 +1,128 @@
+import datetime
+
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, Sum, Value, When
+from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from inventory.services import aggregate_quantities
+from .models import ProductionItem, ProductionRollup
+
+
+PERIODS = {
+    "day": None,
+    "week": TruncWeek,
+    "month": TruncMonth,
+}
+
+
+def order_day(order):
+    return timezone.localdate(order.time)
+
+
+# Suma (sign=1) o resta (sign=-1) los items de una orden a los totales del
+# dia. Primero asegura que existan las filas y luego las actualiza todas con
+# un solo UPDATE, asi dos ordenes simultaneas no pierden cantidades.
+@transaction.atomic
+def apply_production(order, items, sign=1):
+    totals = aggregate_quantities(items)
+    if not totals:
+        return
+    day = order_day(order)
+    ProductionRollup.objects.bulk_create(
+        [ProductionRollup(machine_id=order.machine_id, stock_id=pk, day=day) for pk in totals],
+        ignore_conflicts=True,
+    )
+    rows = ProductionRollup.objects.filter(
+        machine_id=order.machine_id, day=day, stock_id__in=totals.keys()
+    )
+    delta = Case(
+        *[When(stock_id=pk, then=Value(sign * qty)) for pk, qty in totals.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    rows.update(quantity=F("quantity") + delta, orders=F("orders") + sign)
+    if sign < 0:
+        rows.filter(orders__lte=0).delete()
+
+
+def record_production(order, items):
+    apply_production(order, items, 1)
+
+
+def remove_production(order, items):
+    apply_production(order, items, -1)
+
+
+# Recalcula los totales desde los items, para todo o para un rango de dias
+@transaction.atomic
+def rebuild_rollups(start=None, end=None, batch_size=1000):
+    rollups = ProductionRollup.objects.all()
+    items = ProductionItem.objects.all()
+    tz = timezone.get_current_timezone()
+    if start:
+        rollups = rollups.filter(day__gte=start)
+        start = timezone.make_aware(datetime.datetime.combine(start, datetime.time.min), tz)
+        items = items.filter(orderno__time__gte=start)
+    if end:
+        rollups = rollups.filter(day__lte=end)
+        end = datetime.datetime.combine(end + datetime.timedelta(days=1), datetime.time.min)
+        items = items.filter(orderno__time__lt=timezone.make_aware(end, tz))
+    rollups.delete()
+    rows = (
+        items.values_list("orderno__machine", "stock", TruncDate("orderno__time", tzinfo=tz))
+        .annotate(quantity=Sum("quantity"), orders=Count("orderno", distinct=True))
+        .order_by()
+    )
+    created = []
+    count = 0
+    for machine_id, stock_id, day, quantity, orders in rows.iterator():
+        created.append(
+            ProductionRollup(
+                machine_id=machine_id, stock_id=stock_id, day=day, quantity=quantity, orders=orders
+            )
+        )
+        if len(created) >= batch_size:
+            ProductionRollup.objects.bulk_create(created)
+            count += len(created)
+            created = []
+    ProductionRollup.objects.bulk_create(created)
+    return count + len(created)
+
+
+def filter_rollups(start=None, end=None, machine=None):
+    rollups = ProductionRollup.objects.all()
+    if start:
+        rollups = rollups.filter(day__gte=start)
+    if end:
+        rollups = rollups.filter(day__lte=end)
+    if machine:
+        rollups = rollups.filter(machine=machine)
+    return rollups
+
+
+# Totales por periodo y equipo leidos solo de la tabla de totales
+def production_by_period(period="day", start=None, end=None, machine=None):
+    rollups = filter_rollups(start, end, machine)
+    trunc = PERIODS[period]
+    bucket = trunc("day") if trunc else F("day")
+    # Se agrupa por id: hay equipos con el mismo nombre (p. ej. uno borrado y
+    # su reemplazo) y el nombre es solo la etiqueta
+    return (
+        rollups.annotate(period=bucket)
+        .values("period", "machine")
+        .annotate(total=Sum("quantity"))
+        .values_list("period", "machine", "machine__name", "total")
+        .order_by("period", "machine__name", "machine")
+    )
+
+
+# Productos mas producidos en el rango, por equipo
+def production_by_stock(start=None, end=None, machine=None, limit=20):
+    rollups = filter_rollups(start, end, machine)
+    return list(
+        rollups.values("machine", "stock")
+        .annotate(total=Sum("quantity"), orders=Sum("orders"))
+        .values_list("machine__name", "stock__name", "total", "orders")
+        .order_by("-total")[:limit]
+    )
@@ -0,0 +1,62 @@
+import csv
+import datetime
+import uuid
+
+from django.db import transaction
+from django.utils import timezone
+
+from inventory.services import revert_order_items
+from jobs.queue import task
+from jobs.storage import open_output_file
+from .documents import render_documents as render_order_documents
+from .history import ORDER_TYPES, csv_fields, iter_orders, order_rows, select_orders
+from .rollups import rebuild_rollups, remove_production
+
+
+# Tareas en segundo plano de operaciones (ver jobs.queue). Reciben las fechas
+# como texto ISO porque los argumentos se guardan en JSON.
+def parse_date(value):
+    return datetime.date.fromisoformat(value) if value else None
+
+
+@task()
+def export_orders(kind, start=None, end=None, machine=None):
+    orders = select_orders(kind, parse_date(start), parse_date(end), machine)
+    name = "%s_%s_%s.csv" % (kind, timezone.localdate().strftime("%Y%m%d"), uuid.uuid4().hex[:8])
+    rows = 0
+    with open_output_file(name) as fh:
+        writer = csv.DictWriter(fh, fieldnames=csv_fields(kind))
+        writer.writeheader()
+        for order, items, details in iter_orders(kind, orders, 500):
+            for row in order_rows(kind, order, items, details):
+                writer.writerow(row)
+                rows += 1
+    return {"file": name, "rows": rows}
+
+
+@task(timeout=3600)
+def render_documents(kind, start=None, end=None, machine=None, workers=None):
+    orders = select_orders(kind, parse_date(start), parse_date(end), machine)
+    rendered, cached = render_order_documents(kind, orders, workers=workers)
+    return {"rendered": rendered, "cached": cached}
+
+
+# Borra ordenes devolviendo su stock, una transaccion por orden. Si se corta,
+# el reintento sigue con las que quedaron: las ya borradas no se encuentran.
+@task()
+def delete_orders(kind, ordernos):
+    order_model, direction = ORDER_TYPES[kind][0], ORDER_TYPES[kind][3]
+    deleted = 0
+    for order, items, details in iter_orders(kind, order_model.objects.filter(pk__in=ordernos)):
+        with transaction.atomic():
+            revert_order_items(items, direction, order.pk)
+            if kind == "production":
+                remove_production(order, items)
+            order.delete()
+        deleted += 1
+    return {"deleted": deleted}
+
+
+@task(timeout=3600)
+def rebuild_production_rollups(start=None, end=None):
+    return {"rollups": rebuild_rollups(parse_date(start), parse_date(end))}
@@ -0,0 +1,50 @@
+from django.db.models import Count, DateField, Sum
+from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .history import ORDER_TYPES, filter_by_date
+from .models import TAX_FIELDS
+
+
+PERIODS = {
+    "day": TruncDate,
+    "week": TruncWeek,
+    "month": TruncMonth,
+}
+
+# Importes que se suman en el reporte
+SUM_FIELDS = ["amount"] + TAX_FIELDS + ["total"]
+
+
+def report_details(kind, start=None, end=None):
+    details = ORDER_TYPES[kind][2].objects.all()
+    return filter_by_date(details, start, end, field="orderno__time")
+
+
+def report_sums():
+    sums = {field: Sum(field) for field in SUM_FIELDS}
+    sums["orders"] = Count("orderno", distinct=True)
+    return sums
+
+
+# Importes e impuestos por periodo (y por destino) sumados por la base en una
+# sola consulta agrupada. Los periodos se cortan en la zona horaria actual.
+def tax_report(kind, period="month", start=None, end=None, by_destination=False):
+    tz = timezone.get_current_timezone()
+    if period == "day":
+        bucket = TruncDate("orderno__time", tzinfo=tz)
+    else:
+        bucket = PERIODS[period]("orderno__time", output_field=DateField(), tzinfo=tz)
+    keys = ["period"] + (["destination"] if by_destination else [])
+    return list(
+        report_details(kind, start, end)
+        .annotate(period=bucket)
+        .values(*keys)
+        .annotate(**report_sums())
+        .order_by(*keys)
+    )
+
+
+# Totales del rango completo, tambien calculados en SQL
+def tax_totals(kind, start=None, end=None):
+    return report_details(kind, start, end).aggregate(**report_sums())
@@ -1,3 +1,934 @@
-from django.test import TestCase
+import csv
+import datetime
+import os
+import tempfile
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.http import StreamingHttpResponse
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import ArchivedRow
+from inventory.history import rebuild_daily
+from inventory.models import Stock, StockDaily, StockMovement
+from inventory.services import STOCK_IN, STOCK_OUT, add_order_items
+from .benchmark import (
+    Context,
+    benchmark_user,
+    compare,
+    percentile,
+    run_scenario,
+    run_scenario_asgi,
+    seed_data,
+)
+from .models import (
+    ProductionMachine,
+    ProductionOrder,
+    ProductionItem,
+    ProductionOrderDetails,
+    ProductionRollup,
+    DispatchOrder,
+    DispatchItem,
+    DispatchOrderDetails,
+)
+from .documents import document_data
+from .forms import DispatchDetailsForm, ExportFilterForm
+from .rollups import record_production
+from .history import iter_orders, parse_details
+from .taxes import tax_report, tax_totals
+
+
+class OrderListQueryCountTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="secret")
+        self.client.force_login(self.user)
+        self.machine = ProductionMachine.objects.create(name="Equipo 1")
+        self.stocks = [
+            Stock.objects.create(name="Producto %d" % i, quantity=100) for i in range(10)
+        ]
+
+    def create_orders(self, items_per_order):
+        for _ in range(3):
+            production = ProductionOrder.objects.create(machine=self.machine)
+            dispatch = DispatchOrder.objects.create(
+                name="Cliente", phone="1234567890", address="Calle 1", email="a@b.com"
+            )
+            for stock in self.stocks[:items_per_order]:
+                ProductionItem.objects.create(orderno=production, stock=stock, quantity=1)
+                DispatchItem.objects.create(orderno=dispatch, stock=stock, quantity=1)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def assertConstantQueries(self, url):
+        self.create_orders(1)
+        few = self.count_queries(url)
+        ProductionOrder.objects.all().delete()
+        DispatchOrder.objects.all().delete()
+        self.create_orders(10)
+        many = self.count_queries(url)
+        self.assertEqual(few, many)
+
+    def test_production_list(self):
+        self.assertConstantQueries(reverse("production-list"))
+
+    def test_dispatch_list(self):
+        self.assertConstantQueries(reverse("dispatch-list"))
+
+    def test_machine_view(self):
+        self.assertConstantQueries(reverse("machine", args=[self.machine.name]))
+
+    def test_items_rendered(self):
+        self.create_orders(2)
+        response = self.client.get(reverse("production-list"))
+        self.assertContains(response, "Producto 0")
+        self.assertContains(response, "Producto 1")
+
+
+class CachedListTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="tester", password="secret")
+        self.client.force_login(self.user)
+        self.machine = ProductionMachine.objects.create(name="Equipo 1")
+        self.stock = Stock.objects.create(name="Producto A", quantity=100)
+
+    def listed(self, url, attr):
+        response = self.client.get(url)
+        return [getattr(obj, attr) for obj in response.context["object_list"]]
+
+    def test_machine_list_and_select(self):
+        url = reverse("machine-list")
+        self.assertEqual(self.listed(url, "name"), ["Equipo 1"])
+        with self.assertNumQueries(2):
+            self.listed(url, "name")
+        self.client.post(reverse("new-machine"), {"name": "Equipo 2"})
+        self.assertEqual(self.listed(url, "name"), ["Equipo 1", "Equipo 2"])
+        self.assertContains(self.client.get(reverse("select-machine")), "Equipo 1")
+        self.client.post(reverse("delete-machine", args=[self.machine.pk]))
+        self.assertEqual(self.listed(url, "name"), ["Equipo 2"])
+        response = self.client.get(reverse("select-machine"))
+        self.assertNotContains(response, "Equipo 1")
+        response = self.client.post(reverse("select-machine"), {"machine": self.machine.pk})
+        self.assertFalse(response.context["form"].is_valid())
+
+    def test_order_lists_show_new_and_deleted_orders(self):
+        url = reverse("production-list")
+        self.assertEqual(self.listed(url, "orderno"), [])
+        data = {
+            "form-TOTAL_FORMS": "1",
+            "form-INITIAL_FORMS": "0",
+            "form-0-stock": self.stock.pk,
+            "form-0-quantity": 2,
+        }
+        self.client.post(reverse("new-production", args=[self.machine.pk]), data)
+        order = ProductionOrder.objects.get()
+        self.assertEqual(self.listed(url, "orderno"), [order.orderno])
+        self.assertContains(self.client.get(url), "Producto A")
+        self.client.post(reverse("delete-production", args=[order.orderno]))
+        self.assertEqual(self.listed(url, "orderno"), [])
+
+    def test_item_form_rejects_deleted_stock(self):
+        data = {
+            "form-TOTAL_FORMS": "1",
+            "form-INITIAL_FORMS": "0",
+            "name": "Cliente",
+            "phone": "1234567890",
+            "address": "Calle 1",
+            "email": "a@b.com",
+            "form-0-stock": self.stock.pk,
+            "form-0-quantity": 1,
+        }
+        self.client.post(reverse("new-dispatch"), data)
+        self.assertEqual(DispatchOrder.objects.count(), 1)
+        self.client.post(reverse("delete-stock", args=[self.stock.pk]))
+        response = self.client.post(reverse("new-dispatch"), data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(DispatchOrder.objects.count(), 1)
+
+
+@override_settings(ASYNC_PARALLEL_QUERIES=False)
+class OrderListJSONTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="tester", password="secret")
+        self.client.force_login(self.user)
+        self.machine = ProductionMachine.objects.create(name="Equipo 1")
+        self.stock = Stock.objects.create(name="Producto A", quantity=100)
+        for _ in range(5):
+            order = ProductionOrder.objects.create(machine=self.machine)
+            ProductionItem.objects.create(orderno=order, stock=self.stock, quantity=2)
+
+    def test_cursor_pages(self):
+        url = reverse("production-json")
+        data = self.client.get(url, {"limit": 2}).json()
+        expected = list(
+            ProductionOrder.objects.order_by("-time", "-orderno").values_list("pk", flat=True)
+        )
+        seen = [record["ref"] for record in data["results"]]
+        while data["next"]:
+            data = self.client.get(url, {"limit": 2, "cursor": data["next"]}).json()
+            seen += [record["ref"] for record in data["results"]]
+        self.assertEqual(seen, expected)
+        record = self.client.get(url).json()["results"][0]
+        self.assertEqual(record["machine"], "Equipo 1")
+        self.assertEqual(record["items"], [{"stock": "Producto A", "quantity": 2}])
+
+    def test_invalid_parameters(self):
+        url = reverse("dispatch-json")
+        self.assertEqual(self.client.get(url, {"limit": "x"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"cursor": "x"}).status_code, 404)
+        self.assertEqual(self.client.get(url).json()["results"], [])
+
+    def test_new_orders_not_stale(self):
+        url = reverse("production-json")
+        self.assertEqual(len(self.client.get(url).json()["results"]), 5)
+        with self.assertNumQueries(2):
+            self.client.get(url)
+        ProductionOrder.objects.create(machine=self.machine)
+        self.assertEqual(len(self.client.get(url).json()["results"]), 6)
+
+
+class OrderStockMovementTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="secret")
+        self.client.force_login(self.user)
+        self.machine = ProductionMachine.objects.create(name="Equipo 1")
+        self.stock = Stock.objects.create(name="Producto A", quantity=10)
+
+    def formset_data(self, lines):
+        data = {
+            "form-TOTAL_FORMS": str(len(lines)),
+            "form-INITIAL_FORMS": "0",
+            "form-MIN_NUM_FORMS": "0",
+            "form-MAX_NUM_FORMS": "1000",
+        }
+        for i, (stock, quantity) in enumerate(lines):
+            data["form-%d-stock" % i] = stock.pk
+            data["form-%d-quantity" % i] = quantity
+        return data
+
+    def test_new_order_pages_skip_stock_options(self):
+        Stock.objects.create(name="Producto sin cargar")
+        for url in (reverse("new-dispatch"), reverse("new-production", args=[self.machine.pk])):
+            response = self.client.get(url)
+            self.assertContains(response, "data-lookup-url")
+            self.assertNotContains(response, "Producto sin cargar")
+
+    def test_production_create_and_delete(self):
+        data = self.formset_data([(self.stock, 2), (self.stock, 3)])
+        response = self.client.post(reverse("new-production", args=[self.machine.pk]), data)
+        order = ProductionOrder.objects.get()
+        self.assertRedirects(response, reverse("production-order", args=[order.orderno]))
+        self.stock.refresh_from_db()
+        self.assertEqual(self.stock.quantity, 15)
+
+        self.client.post(reverse("delete-production", args=[order.pk]))
+        self.assertFalse(ProductionOrder.objects.exists())
+        self.stock.refresh_from_db()
+        self.assertEqual(self.stock.quantity, 10)
+
+    def test_dispatch_create_and_delete(self):
+        data = self.formset_data([(self.stock, 4)])
+        data.update(
+            {"name": "Cliente", "phone": "1234567890", "address": "Calle 1", "email": "a@b.com"}
+        )
+        response = self.client.post(reverse("new-dispatch"), data)
+        order = DispatchOrder.objects.get()
+        self.assertRedirects(response, reverse("dispatch-order", args=[order.orderno]))
+        self.stock.refresh_from_db()
+        self.assertEqual(self.stock.quantity, 6)
+
+        self.client.post(reverse("delete-dispatch", args=[order.pk]))
+        self.assertFalse(DispatchOrder.objects.exists())
+        self.stock.refresh_from_db()
+        self.assertEqual(self.stock.quantity, 10)
+
+    def test_non_positive_quantities_are_rejected(self):
+        customer = {
+            "name": "Cliente", "phone": "1234567890", "address": "Calle 1", "email": "a@b.com"
+        }
+        for url, extra in (
+            (reverse("new-dispatch"), customer),
+            (reverse("new-production", args=[self.machine.pk]), {}),
+        ):
+            for quantity in (-5, 0):
+                data = self.formset_data([(self.stock, quantity)])
+                data.update(extra)
+                response = self.client.post(url, data)
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response.context["formset"][0].errors["quantity"])
+        self.assertFalse(DispatchOrder.objects.exists())
+        self.assertFalse(ProductionOrder.objects.exists())
+        self.stock.refresh_from_db()
+        self.assertEqual(self.stock.quantity, 10)
+        self.assertFalse(StockMovement.objects.exists())
+
+    def test_dispatch_over_availability_is_rejected(self):
+        other = Stock.objects.create(name="Producto B", quantity=10)
+        data = self.formset_data([(self.stock, 8), (other, 1), (self.stock, 3)])
+        data.update(
+            {"name": "Cliente", "phone": "1234567890", "address": "Calle 1", "email": "a@b.com"}
+        )
+        response = self.client.post(reverse("new-dispatch"), data)
+        self.assertEqual(response.status_code, 200)
+        formset = response.context["formset"]
+        self.assertEqual(
+            [bool(iform.errors) for iform in formset], [True, False, True]
+        )
+        self.assertContains(response, "Stock insuficiente: hay 10 disponibles")
+        self.assertFalse(DispatchOrder.objects.exists())
+        self.assertEqual(
+            list(Stock.objects.order_by("pk").values_list("quantity", flat=True)), [10, 10]
+        )
+
+
+class KeysetPaginationTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="secret")
+        self.client.force_login(self.user)
+        for _ in range(25):
+            DispatchOrder.objects.create(
+                name="Cliente", phone="1234567890", address="Calle 1", email="a@b.com"
+            )
+
+    def test_walk_pages(self):
+        expected = list(
+            DispatchOrder.objects.order_by("-time", "-orderno").values_list("orderno", flat=True)
+        )
+        url = reverse("dispatch-list") + "?cursor="
+        seen, pages = [], []
+        while url:
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url)
+            self.assertFalse(any("COUNT(" in q["sql"] for q in ctx.captured_queries))
+            page = response.context["page_obj"]
+            pages.append(page)
+            seen.extend(order.orderno for order in page)
+            url = reverse("dispatch-list") + page.next_querystring if page.has_next() else None
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(pages), 3)
+        self.assertNotContains(response, "?page=")
+
+        response = self.client.get(reverse("dispatch-list") + pages[2].previous_querystring)
+        previous = [order.orderno for order in response.context["page_obj"]]
+        self.assertEqual(previous, expected[10:20])
+        self.assertTrue(response.context["page_obj"].has_previous())
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse("dispatch-list") + "?cursor=basura")
+        self.assertEqual(response.status_code, 404)
+
+    def test_offset_mode_by_default(self):
+        response = self.client.get(reverse("dispatch-list"))
+        self.assertContains(response, "?page=2")
+
+
+class OrderImportExportTest(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.stock_a = Stock.objects.create(name="Producto A", quantity=10)
+        self.stock_b = Stock.objects.create(name="Producto B", quantity=10)
+
+    def write(self, name, content):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, "w") as fh:
+            fh.write(content)
+        return path
+
+    def test_import_production_csv(self):
+        path = self.write(
+            "production.csv",
+            "ref,time,machine,stock,quantity,total\n"
+            "1,2020-01-02T10:00:00,Equipo X,Producto A,2,100\n"
+            "1,2020-01-02T10:00:00,Equipo X,Producto B,3,100\n"
+            "2,2020-01-03T10:00:00,Equipo X,No existe,1,\n"
+            "3,2020-01-04T10:00:00,Equipo Y,,,\n",
+        )
+        err = StringIO()
+        call_command(
+            "import_orders", "production", path, "--apply-stock", stdout=StringIO(), stderr=err
+        )
+        self.assertIn("no existe el producto No existe", err.getvalue())
+        orders = list(ProductionOrder.objects.order_by("orderno"))
+        self.assertEqual([o.machine.name for o in orders], ["Equipo X", "Equipo Y"])
+        self.assertEqual(orders[0].time.year, 2020)
+        self.assertEqual(orders[0].productiondetailsorderno.get().total, 100)
+        self.assertEqual(
+            sorted(orders[0].productionorderno.values_list("stock__name", "quantity")),
+            [("Producto A", 2), ("Producto B", 3)],
+        )
+        self.assertFalse(orders[1].productionorderno.exists())
+        self.stock_a.refresh_from_db()
+        self.assertEqual(self.stock_a.quantity, 12)
+        # La serie diaria queda en el dia de la orden, igual que al reconstruirla
+        rows = StockDaily.objects.order_by("stock_id", "day")
+        daily = list(rows.values_list("stock_id", "day", "quantity", "delta"))
+        self.assertEqual(
+            daily,
+            [
+                (self.stock_a.pk, datetime.date(2020, 1, 2), 12, 2),
+                (self.stock_b.pk, datetime.date(2020, 1, 2), 13, 3),
+            ],
+        )
+        rebuild_daily()
+        self.assertEqual(list(rows.values_list("stock_id", "day", "quantity", "delta")), daily)
+
+    def test_import_skips_deleted_machines_and_stocks(self):
+        old = ProductionMachine.objects.create(name="Equipo X")
+        old.soft_delete()
+        self.stock_b.soft_delete()
+        path = self.write(
+            "production.csv",
+            "ref,time,machine,stock,quantity\n"
+            "1,2020-01-02T10:00:00,Equipo X,Producto A,2\n"
+            "2,2020-01-02T10:00:00,Equipo X,Producto B,1\n",
+        )
+        err = StringIO()
+        call_command("import_orders", "production", path, stdout=StringIO(), stderr=err)
+        self.assertIn("no existe el producto Producto B", err.getvalue())
+        machine = ProductionOrder.objects.get().machine
+        self.assertNotEqual(machine, old)
+        self.assertEqual(list(ProductionMachine.active.values_list("name", flat=True)), ["Equipo X"])
+        # Los filtros de exportacion tampoco ofrecen equipos borrados
+        form = ExportFilterForm({"machine": old.pk})
+        self.assertFalse(form.is_valid())
+        self.assertTrue(ExportFilterForm({"machine": machine.pk}).is_valid())
+
+    def test_latest_details_are_used(self):
+        order = DispatchOrder.objects.create(
+            name="Cliente", phone="1234567890", address="Calle 1", email="a@b.com"
+        )
+        DispatchOrderDetails.objects.create(orderno=order, destination="Viejo")
+        DispatchOrderDetails.objects.create(orderno=order, destination="Nuevo")
+        [(exported, items, details)] = list(iter_orders("dispatch"))
+        self.assertEqual(details.destination, "Nuevo")
+        out = StringIO()
+        call_command("export_orders", "dispatch", "--format", "jsonl", stdout=out)
+        self.assertIn('"destination":"Nuevo"', out.getvalue().replace(" ", ""))
+        user = User.objects.create_user(username="tester", password="secret")
+        self.client.force_login(user)
+        response = self.client.get(reverse("dispatch-order", args=[order.orderno]))
+        self.assertEqual(response.context["orderdetails"].destination, "Nuevo")
+
+    def test_dispatch_jsonl_round_trip(self):
+        order = DispatchOrder.objects.create(
+            name="Cliente", phone="1234567890", address="Calle 1", email="a@b.com"
+        )
+        DispatchOrderDetails.objects.create(orderno=order, destination="Rosario", amount=50)
+        DispatchItem.objects.create(orderno=order, stock=self.stock_a, quantity=4)
+        DispatchItem.objects.create(orderno=order, stock=self.stock_b, quantity=1)
+        path = os.path.join(self.tmpdir.name, "dispatch.jsonl")
+        call_command("export_orders", "dispatch", "--format", "jsonl", "--output", path)
+        DispatchOrder.objects.all().delete()
+
+        call_command("import_orders", "dispatch", path, stdout=StringIO())
+        imported = DispatchOrder.objects.get()
+        self.assertEqual(imported.name, "Cliente")
+        self.assertEqual(imported.time, order.time)
+        self.assertEqual(imported.dispatchdetailsorderno.get().destination, "Rosario")
+        self.assertEqual(imported.dispatchorderno.count(), 2)
+        # Sin --apply-stock el historial no modifica el stock actual
+        self.stock_a.refresh_from_db()
+        self.assertEqual(self.stock_a.quantity, 10)
+
+    def test_export_csv_one_row_per_item(self):
+        machine = ProductionMachine.objects.create(name="Equipo 1")
+        order = ProductionOrder.objects.create(machine=machine)
+        ProductionItem.objects.create(orderno=order, stock=self.stock_a, quantity=2)
+        ProductionItem.objects.create(orderno=order, stock=self.stock_b, quantity=3)
+        out = StringIO()
+        call_command("export_orders", "production", stdout=out)
+        rows = list(csv.DictReader(StringIO(out.getvalue())))
+        self.assertEqual(
+            [(row["ref"], row["stock"], row["quantity"]) for row in rows],
+            [(str(order.pk), "Producto A", "2"), (str(order.pk), "Producto B", "3")],
+        )
+
+
+class OrderExportViewTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="secret")
+        self.client.force_login(self.user)
+        self.stock = Stock.objects.create(name="Producto A", quantity=10)
+        self.machines = [ProductionMachine.objects.create(name="Equipo %d" % i) for i in range(2)]
+        for day, machine in ((1, 0), (2, 0), (2, 1), (3, 1)):
+            order = ProductionOrder.objects.create(machine=self.machines[machine])
+            ProductionOrderDetails.objects.create(orderno=order, cgst=5)
+            ProductionItem.objects.create(orderno=order, stock=self.stock, quantity=day)
+            ProductionOrder.objects.filter(pk=order.pk).update(
+                time=timezone.make_aware(datetime.datetime(2023, 5, day, 12))
+            )
+
+    def export(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertIsInstance(response, StreamingHttpResponse)
+        self.assertIn("attachment", response["Content-Disposition"])
+        content = b"".join(response.streaming_content).decode()
+        return list(csv.DictReader(StringIO(content)))
+
+    def test_date_and_machine_filters(self):
+        url = reverse("production-export")
+        self.assertEqual(len(self.export(url)), 4)
+        rows = self.export(url, start="2023-05-02", end="2023-05-02")
+        self.assertEqual([row["quantity"] for row in rows], ["2", "2"])
+        self.assertEqual(rows[0]["cgst"], "5.00")
+        rows = self.export(url, start="2023-05-02", machine=self.machines[1].pk)
+        self.assertEqual([row["machine"] for row in rows], ["Equipo 1", "Equipo 1"])
+
+    def test_invalid_filter(self):
+        response = self.client.get(reverse("production-export"), {"start": "ayer"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_dispatch_export(self):
+        order = DispatchOrder.objects.create(
+            name="Cliente", phone="1234567890", address="Calle 1", email="a@b.com"
+        )
+        DispatchItem.objects.create(orderno=order, stock=self.stock, quantity=4)
+        rows = self.export(reverse("dispatch-export"))
+        self.assertEqual((rows[0]["name"], rows[0]["stock"]), ("Cliente", "Producto A"))
+
+
+class OrderDocumentViewTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="secret")
+        self.client.force_login(self.user)
+        self.machine = ProductionMachine.objects.create(name="Equipo 1")
+        self.stocks = [Stock.objects.create(name="Producto %d" % i) for i in range(10)]
+        self.order = DispatchOrder.objects.create(
+            name="Cliente", phone="1234567890", address="Calle 1", email="a@b.com"
+        )
+        DispatchOrderDetails.objects.create(orderno=self.order, amount=5, cgst=5)
+        self.url = reverse("dispatch-order", args=[self.order.orderno])
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_constant_queries(self):
+        DispatchItem.objects.create(orderno=self.order, stock=self.stocks[0], quantity=1)
+        few = self.count_queries(self.url)
+        for stock in self.stocks[1:]:
+            DispatchItem.objects.create(orderno=self.order, stock=stock, quantity=1)
+        self.assertEqual(self.count_queries(self.url), few)
+
+        production = ProductionOrder.objects.create(machine=self.machine)
+        ProductionOrderDetails.objects.create(orderno=production)
+        url = reverse("production-order", args=[production.orderno])
+        few = self.count_queries(url)
+        for stock in self.stocks:
+            ProductionItem.objects.create(orderno=production, stock=stock, quantity=1)
+        self.assertEqual(self.count_queries(url), few)
+
+    def test_missing_order_is_404(self):
+        self.assertEqual(self.client.get(reverse("dispatch-order", args=[999])).status_code, 404)
+        self.assertEqual(self.client.get(reverse("production-order", args=[999])).status_code, 404)
+
+    def test_conditional_get(self):
+        response = self.client.get(self.url)
+        etag, last_modified = response["ETag"], response["Last-Modified"]
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        # La fecha sola no alcanza: la pagina depende del usuario y su token
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+
+        self.client.post(self.url, {"destination": "Rosario"})
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    @override_settings(MESSAGE_STORAGE="django.contrib.messages.storage.session.SessionStorage")
+    def test_etag_depends_on_user_and_pending_messages(self):
+        etag = self.client.get(self.url)["ETag"]
+        other = User.objects.create_user(username="otro", password="secret")
+        self.client.force_login(other)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # Un mensaje de otra vista se muestra en lugar de responder 304
+        session = self.client.session
+        session["_messages"] = '[["__json_message", 0, 25, "Orden creada"]]'
+        session.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, "Orden creada")
+
+    def test_post_updates_only_sent_fields(self):
+        response = self.client.post(self.url, {"eway": "123", "destination": "Rosario"})
+        self.assertContains(response, "Rosario")
+        details = DispatchOrderDetails.objects.get(orderno=self.order)
+        self.assertEqual((details.eway, details.destination), ("123", "Rosario"))
+        self.assertEqual((details.cgst, details.total), (Decimal("5"), Decimal("10")))
+
+
+class OrderPDFTest(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        settings = override_settings(DOCUMENT_CACHE_DIR=self.tmp.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.user = User.objects.create_user(username="tester", password="secret")
+        self.client.force_login(self.user)
+        self.stock = Stock.objects.create(name="Producto (A)", quantity=10)
+        self.machine = ProductionMachine.objects.create(name="Equipo 1")
+        self.order = DispatchOrder.objects.create(
+            name="Cliente", phone="1234567890", address="Calle 1", email="a@b.com"
+        )
+        DispatchOrderDetails.objects.create(orderno=self.order, amount=5, cgst=5)
+        DispatchItem.objects.create(orderno=self.order, stock=self.stock, quantity=3)
+        self.url = reverse("dispatch-pdf", args=[self.order.orderno])
+
+    def cached_files(self):
+        return sorted(
+            os.path.join(root, name)
+            for root, dirs, files in os.walk(self.tmp.name)
+            for name in files
+        )
+
+    def test_pdf_download_is_cached(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response["Content-Type"], "application/pdf")
+        content = b"".join(response.streaming_content)
+        self.assertTrue(content.startswith(b"%PDF-1.4"))
+        self.assertTrue(content.rstrip().endswith(b"%%EOF"))
+        files = self.cached_files()
+        self.assertEqual(len(files), 1)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+        self.client.get(self.url)
+        self.assertEqual(self.cached_files(), files)
+
+    def test_changed_order_renders_new_document(self):
+        etag = self.client.get(self.url)["ETag"]
+        DispatchOrderDetails.objects.filter(orderno=self.order).update(destination="Rosario")
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(len(self.cached_files()), 2)
+
+    def test_missing_order_is_404(self):
+        self.assertEqual(self.client.get(reverse("production-pdf", args=[999])).status_code, 404)
+
+    @override_settings(TIME_ZONE="America/Argentina/Buenos_Aires")
+    def test_document_uses_local_date(self):
+        time = timezone.make_aware(datetime.datetime(2023, 5, 2, 1), datetime.timezone.utc)
+        DispatchOrder.objects.filter(pk=self.order.pk).update(time=time)
+        self.order.refresh_from_db()
+        data = document_data("dispatch", self.order, [], None)
+        self.assertEqual(data["date"], "2023-05-01")
+
+    def test_render_command_date_range(self):
+        for day in (1, 2, 3):
+            order = ProductionOrder.objects.create(machine=self.machine)
+            ProductionItem.objects.create(orderno=order, stock=self.stock, quantity=day)
+            ProductionOrder.objects.filter(pk=order.pk).update(
+                time=timezone.make_aware(datetime.datetime(2023, 5, day, 12))
+            )
+        out = StringIO()
+        call_command(
+            "render_documents", "production", "--start=2023-05-02", "--workers=2", stdout=out
+        )
+        self.assertIn("2 PDF generados, 0 ya estaban", out.getvalue())
+        out = StringIO()
+        call_command("render_documents", "production", "--workers=2", stdout=out)
+        self.assertIn("1 PDF generados, 2 ya estaban", out.getvalue())
+        for path in self.cached_files():
+            with open(path, "rb") as fh:
+                self.assertTrue(fh.read().startswith(b"%PDF"))
+
+
+class ProductionRollupTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="secret")
+        self.client.force_login(self.user)
+        self.machines = [ProductionMachine.objects.create(name="Equipo %d" % i) for i in range(2)]
+        self.stocks = [Stock.objects.create(name="Producto %d" % i, quantity=0) for i in range(2)]
+
+    def produce(self, machine, lines):
+        data = {
+            "form-TOTAL_FORMS": str(len(lines)),
+            "form-INITIAL_FORMS": "0",
+            "form-MIN_NUM_FORMS": "0",
+            "form-MAX_NUM_FORMS": "1000",
+        }
+        for i, (stock, quantity) in enumerate(lines):
+            data["form-%d-stock" % i] = stock.pk
+            data["form-%d-quantity" % i] = quantity
+        self.client.post(reverse("new-production", args=[machine.pk]), data)
+        return ProductionOrder.objects.latest("orderno")
+
+    def rollups(self):
+        rows = ProductionRollup.objects.values_list(
+            "machine__name", "stock__name", "quantity", "orders"
+        )
+        return sorted(rows)
+
+    def test_create_and_delete_update_rollups(self):
+        a, b = self.stocks
+        self.produce(self.machines[0], [(a, 2), (a, 3), (b, 1)])
+        order = self.produce(self.machines[0], [(a, 4)])
+        self.produce(self.machines[1], [(b, 7)])
+        self.assertEqual(
+            self.rollups(),
+            [
+                ("Equipo 0", "Producto 0", 9, 2),
+                ("Equipo 0", "Producto 1", 1, 1),
+                ("Equipo 1", "Producto 1", 7, 1),
+            ],
+        )
+        incremental = self.rollups()
+        call_command("rebuild_production_rollups", stdout=StringIO())
+        self.assertEqual(self.rollups(), incremental)
+
+        self.client.post(reverse("delete-production", args=[order.pk]))
+        self.assertEqual(self.rollups()[0], ("Equipo 0", "Producto 0", 5, 1))
+
+    def test_rows_removed_when_last_order_deleted(self):
+        order = self.produce(self.machines[0], [(self.stocks[0], 2)])
+        self.client.post(reverse("delete-production", args=[order.pk]))
+        self.assertFalse(ProductionRollup.objects.exists())
+
+    def test_rebuild_date_range(self):
+        for day in (1, 2, 9):
+            order = ProductionOrder.objects.create(machine=self.machines[0])
+            ProductionItem.objects.create(orderno=order, stock=self.stocks[0], quantity=day)
+            ProductionOrder.objects.filter(pk=order.pk).update(
+                time=timezone.make_aware(datetime.datetime(2023, 5, day, 12))
+            )
+        call_command("rebuild_production_rollups", "--start=2023-05-02", stdout=StringIO())
+        self.assertEqual(
+            list(ProductionRollup.objects.order_by("day").values_list("day", "quantity")),
+            [(datetime.date(2023, 5, 2), 2), (datetime.date(2023, 5, 9), 9)],
+        )
+        call_command("rebuild_production_rollups", stdout=StringIO())
+        self.assertEqual(ProductionRollup.objects.count(), 3)
+
+    def test_report_reads_only_rollups(self):
+        self.produce(self.machines[0], [(self.stocks[0], 2)])
+        self.produce(self.machines[1], [(self.stocks[1], 5)])
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("production-report"), {"period": "week"})
+        self.assertEqual(response.status_code, 200)
+        sql = " ".join(query["sql"] for query in ctx.captured_queries)
+        self.assertNotIn("operations_productionitem", sql)
+        self.assertNotIn('"operations_productionorder"', sql)
+        self.assertEqual(response.context["totals"], [("Equipo 0", 2), ("Equipo 1", 5)])
+        self.assertEqual(len(response.context["labels"]), 1)
+        self.assertEqual(
+            [dataset["data"] for dataset in response.context["datasets"]], [[2], [5]]
+        )
+
+
+    def test_report_keeps_machines_with_the_same_name_apart(self):
+        self.produce(self.machines[0], [(self.stocks[0], 2)])
+        self.machines[0].soft_delete()
+        replacement = ProductionMachine.objects.create(name="Equipo 0")
+        self.produce(replacement, [(self.stocks[0], 3)])
+        response = self.client.get(reverse("production-report"))
+        self.assertEqual(
+            response.context["totals"], [("Equipo 0", 2), ("Equipo 0", 3)]
+        )
+        self.assertEqual(
+            [dataset["label"] for dataset in response.context["datasets"]],
+            ["Equipo 0", "Equipo 0"],
+        )
+        self.assertEqual(
+            sorted(response.context["top_stocks"]),
+            [("Equipo 0", "Producto 0", 2, 1), ("Equipo 0", "Producto 0", 3, 1)],
+        )
+
+class TaxReportTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="secret")
+        self.client.force_login(self.user)
+        for day, month, destination, amount, cgst in (
+            (1, 5, "Rosario", 100, "9.50"),
+            (20, 5, "Rosario", 50, "4.25"),
+            (3, 5, "Cordoba", 10, "1"),
+            (2, 6, None, 200, "18"),
+        ):
+            order = DispatchOrder.objects.create(
+                name="Cliente", phone="1234567890", address="Calle 1", email="a@b.com"
+            )
+            DispatchOrderDetails.objects.create(
+                orderno=order, destination=destination, amount=amount, cgst=cgst, sgst=cgst
+            )
+            DispatchOrder.objects.filter(pk=order.pk).update(
+                time=timezone.make_aware(datetime.datetime(2023, month, day, 12))
+            )
+
+    def test_total_is_computed_on_save(self):
+        details = DispatchOrderDetails.objects.get(destination="Cordoba")
+        self.assertEqual(details.total, Decimal("12.00"))
+        details.tcs = Decimal("0.50")
+        details.save(update_fields=["tcs"])
+        details.refresh_from_db()
+        self.assertEqual(details.total, Decimal("12.50"))
+
+    def test_blank_amounts_are_zero(self):
+        form = DispatchDetailsForm({"destination": "Rosario", "cgst": ""})
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.cleaned_data["cgst"], 0)
+        self.assertFalse(DispatchDetailsForm({"cgst": "mucho"}).is_valid())
+
+    def test_report_sums_in_one_query(self):
+        with self.assertNumQueries(1):
+            rows = tax_report("dispatch", "month", by_destination=True)
+        self.assertEqual(
+            [(row["period"], row["destination"], row["orders"], row["cgst"], row["total"]) for row in rows],
+            [
+                (datetime.date(2023, 5, 1), "Cordoba", 1, Decimal("1.00"), Decimal("12.00")),
+                (datetime.date(2023, 5, 1), "Rosario", 2, Decimal("13.75"), Decimal("177.50")),
+                (datetime.date(2023, 6, 1), None, 1, Decimal("18.00"), Decimal("236.00")),
+            ],
+        )
+        rows = tax_report("dispatch", "day", datetime.date(2023, 5, 2), datetime.date(2023, 5, 31))
+        self.assertEqual([row["period"] for row in rows], [datetime.date(2023, 5, 3), datetime.date(2023, 5, 20)])
+        totals = tax_totals("dispatch")
+        self.assertEqual((totals["orders"], totals["total"]), (4, Decimal("425.50")))
+
+    def test_report_view(self):
+        params = {"start": "2023-01-01", "end": "2023-12-31", "by_destination": "on"}
+        response = self.client.get(reverse("tax-report"), params)
+        self.assertContains(response, "Sin destino")
+        self.assertContains(response, "425.50")
+        self.assertEqual(len(response.context["rows"]), 3)
+
+    def test_import_keeps_legacy_totals(self):
+        self.assertEqual(
+            parse_details({"cgst": "5", "total": "100", "po": "A1"}),
+            {"cgst": Decimal("5"), "amount": Decimal("95"), "po": "A1"},
+        )
+        with self.assertRaises(ValueError):
+            parse_details({"igst": "diez"})
+
+
+class ArchiveDeletedTest(TestCase):
+    def setUp(self):
+        self.old, self.kept, self.recent = [
+            Stock.objects.create(name=name, quantity=100) for name in ("Viejo", "Activo", "Reciente")
+        ]
+        self.machines = [ProductionMachine.objects.create(name="Equipo %d" % i) for i in range(2)]
+        self.mixed = self.produce(self.machines[0], (self.old, 2), (self.kept, 3))
+        self.kept_order = self.produce(self.machines[0], (self.kept, 4))
+        self.old_machine_order = self.produce(self.machines[1], (self.kept, 5))
+        self.dispatches = [self.dispatch(self.old), self.dispatch(self.kept)]
+        long_ago = timezone.now() - datetime.timedelta(days=400)
+        for obj in (self.old, self.machines[1], self.recent):
+            obj.soft_delete()
+        Stock.objects.filter(pk=self.old.pk).update(deleted_at=long_ago)
+        ProductionMachine.objects.filter(pk=self.machines[1].pk).update(deleted_at=long_ago)
+
+    def produce(self, machine, *lines):
+        order = ProductionOrder.objects.create(machine=machine)
+        ProductionOrderDetails.objects.create(orderno=order)
+        items = [ProductionItem(stock=stock, quantity=quantity) for stock, quantity in lines]
+        add_order_items(order, items, STOCK_IN)
+        record_production(order, items)
+        return order
+
+    def dispatch(self, stock):
+        order = DispatchOrder.objects.create(
+            name="Cliente", phone="1234567890", address="Calle 1", email="a@b.com"
+        )
+        DispatchOrderDetails.objects.create(orderno=order)
+        add_order_items(order, [DispatchItem(stock=stock, quantity=1)], STOCK_OUT)
+        return order
+
+    def rollups(self):
+        return sorted(ProductionRollup.objects.values_list("machine", "stock", "quantity", "orders"))
+
+    def test_dry_run_changes_nothing(self):
+        out = StringIO()
+        call_command("archive_deleted", "--dry-run", stdout=out)
+        self.assertIn("stocks: 1 para archivar", out.getvalue())
+        self.assertEqual(Stock.objects.count(), 3)
+        self.assertFalse(ArchivedRow.objects.exists())
+
+    def test_archives_old_rows_with_their_orders(self):
+        out = StringIO()
+        call_command("archive_deleted", "--batch-size", "1", stdout=out)
+        self.assertIn("stocks: 1 archivados con 2 ordenes", out.getvalue())
+        self.assertIn("production machines: 1 archivados con 1 ordenes", out.getvalue())
+        self.assertEqual(set(Stock.objects.all()), {self.kept, self.recent})
+        self.assertEqual(list(ProductionMachine.objects.all()), [self.machines[0]])
+        self.assertEqual(list(ProductionOrder.objects.all()), [self.kept_order])
+        self.assertEqual(list(DispatchOrder.objects.all()), [self.dispatches[1]])
+        # Los totales por dia siguen coincidiendo con las ordenes que quedan
+        incremental = self.rollups()
+        self.assertEqual(incremental, [(self.machines[0].pk, self.kept.pk, 4, 1)])
+        call_command("rebuild_production_rollups", stdout=StringIO())
+        self.assertEqual(self.rollups(), incremental)
+
+        archived = ArchivedRow.objects.get(model="inventory.stock")
+        self.assertEqual((archived.object_id, archived.data["name"]), (self.old.pk, "Viejo"))
+        order = ArchivedRow.objects.get(model="operations.productionorder", object_id=self.mixed.pk)
+        self.assertEqual(order.data["machine"], self.machines[0].pk)
+        self.assertEqual(
+            ArchivedRow.objects.filter(model="operations.productionitem").count(), 3
+        )
+        self.assertTrue(ArchivedRow.objects.filter(model="inventory.stockmovement").exists())
+
+        call_command("archive_deleted", "--days", "0", stdout=StringIO())
+        self.assertEqual(list(Stock.objects.all()), [self.kept])
+
+
+class LoadBenchmarkTest(TransactionTestCase):
+    def setUp(self):
+        seed_data(stocks=50, machines=3, orders=20, items=2)
+        self.user = benchmark_user()
+        self.ctx = Context()
+
+    def test_seed_data(self):
+        self.assertEqual(Stock.objects.count(), 50)
+        self.assertEqual(ProductionOrder.objects.count(), 20)
+        self.assertEqual(DispatchItem.objects.count(), 40)
+
+    def test_scenarios_run_concurrently(self):
+        for name in ("home", "inventory_search", "production_create", "dispatch_create"):
+            result = run_scenario(name, self.ctx, self.user, requests=6, concurrency=2)
+            self.assertEqual(result["requests"], 6, name)
+            self.assertEqual(result["errors"], 0, result["first_error"])
+            self.assertGreater(result["mean_queries"], 0)
+            self.assertLessEqual(result["p50_ms"], result["p99_ms"])
+        self.assertEqual(ProductionOrder.objects.count(), 26)
+        self.assertEqual(DispatchOrder.objects.count(), 26)
+
+    def test_read_scenarios_through_asgi(self):
+        for name in ("home_async", "stock_lookup_async", "production_json", "stock_list"):
+            result = run_scenario_asgi(name, self.ctx, self.user, requests=6, concurrency=3)
+            self.assertEqual(result["requests"], 6, name)
+            self.assertEqual(result["errors"], 0, result["first_error"])
+            self.assertGreaterEqual(result["mean_queries"], 2)
+
+    def test_delete_scenario_uses_each_order_once(self):
+        result = run_scenario("production_delete", self.ctx, self.user, requests=5, concurrency=1)
+        self.assertEqual(result["errors"], 0, result["first_error"])
+        self.assertEqual(ProductionOrder.objects.count(), 15)
+
+    def test_percentile_and_compare(self):
+        self.assertEqual(percentile([1, 2, 3, 4, 5], 0.5), 3)
+        self.assertEqual(percentile([10, 20], 0.95), 19.5)
+        baseline = {"home": {"p95_ms": 10.0, "mean_queries": 2}}
+        self.assertEqual(compare({"home": {"p95_ms": 12.0, "mean_queries": 2}}, baseline, 1.5), {})
+        self.assertEqual(
+            compare({"home": {"p95_ms": 20.0, "mean_queries": 3}}, baseline, 1.5),
+            {"home": ["p95 x2.00", "consultas 2.0 -> 3.0"]},
+        )
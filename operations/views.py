@@ -1,8 +1,21 @@
+import csv
+import datetime
+import hashlib
+import os
+from django.forms.models import model_to_dict
+from django.http import FileResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 from django.views.generic import View, ListView, CreateView, UpdateView, DeleteView
 from django.contrib.messages.views import SuccessMessageMixin
+from django.conf import settings
 from django.contrib import messages
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+from django.db import transaction
+from django.db.models import Prefetch
+from django.middleware.csrf import get_token
 from .models import (
     ProductionOrder,
     ProductionMachine,
@@ -20,16 +33,62 @@ from .forms import (
     DispatchForm,
     DispatchItemFormset,
     DispatchDetailsForm,
+    ExportFilterForm,
+    ProductionReportForm,
+    TaxReportForm,
 )
-from inventory.models import Stock
+from .history import (
+    DETAIL_FIELDS,
+    csv_fields,
+    filter_by_date,
+    iter_orders,
+    order_page,
+    order_rows,
+)
+from .documents import order_document
+from .rollups import (
+    production_by_period,
+    production_by_stock,
+    record_production,
+    remove_production,
+)
+from .tasks import delete_orders, export_orders
+from .taxes import SUM_FIELDS, tax_report, tax_totals
+from jobs.views import job_accepted
+from core.aio import AsyncView, run_query
+from core.cache import CachedPageMixin
+from core.pagination import KeysetPaginationMixin, keyset_page, keyset_requested
+from inventory.services import (
+    STOCK_IN,
+    STOCK_OUT,
+    InsufficientStock,
+    add_order_items,
+    revert_order_items,
+)
+
+
+# Precarga los items de cada orden junto con su producto en una sola consulta
+def prefetch_production_items():
+    return Prefetch(
+        "productionorderno",
+        queryset=ProductionItem.objects.select_related("stock"),
+    )
+
+
+def prefetch_dispatch_items():
+    return Prefetch(
+        "dispatchorderno",
+        queryset=DispatchItem.objects.select_related("stock"),
+    )
 
 
 # Muestra lista de equipos
-class MachineListView(ListView):
+class MachineListView(CachedPageMixin, KeysetPaginationMixin, ListView):
     model = ProductionMachine
     template_name = "machine/machine_list.html"
-    queryset = ProductionMachine.objects.filter(is_deleted=False)
+    queryset = ProductionMachine.active.all()
     paginate_by = 10
+    cache_groups = ("machines",)
 
 
 # View para crear equipos
@@ -50,6 +109,7 @@ class MachineCreateView(SuccessMessageMixin, CreateView):
 # View para modificar equipos
 class MachineUpdateView(SuccessMessageMixin, UpdateView):
     model = ProductionMachine
+    queryset = ProductionMachine.active.all()
     form_class = MachineForm
     success_url = "/operations/machine"
     success_message = "Equipo actualizado correctamente"
@@ -69,22 +129,95 @@ class MachineDeleteView(View):
     success_message = "Equipo eliminado correctamente"
 
     def get(self, request, pk):
-        machine = get_object_or_404(ProductionMachine, pk=pk)
+        machine = get_object_or_404(ProductionMachine.active, pk=pk)
         return render(request, self.template_name, {"object": machine})
 
     def post(self, request, pk):
-        machine = get_object_or_404(ProductionMachine, pk=pk)
-        machine.is_deleted = True
-        machine.save()
+        machine = get_object_or_404(ProductionMachine.active, pk=pk)
+        machine.soft_delete()
         messages.success(request, self.success_message)
         return redirect("machine-list")
 
 
+# Reporte de produccion por equipo: lee solo la tabla de totales por dia,
+# nunca las ordenes ni sus items
+class ProductionReportView(View):
+    template_name = "machine/report.html"
+    default_days = 30
+
+    def get(self, request):
+        form = ProductionReportForm(request.GET or None)
+        filters = form.cleaned_data if form.is_valid() else {}
+        end = filters.get("end") or timezone.localdate()
+        start = filters.get("start") or end - datetime.timedelta(days=self.default_days - 1)
+        period = filters.get("period") or "day"
+        machine = filters.get("machine")
+
+        periods = []
+        series = {}
+        names = {}
+        for bucket, machine_id, name, total in production_by_period(period, start, end, machine):
+            label = bucket.isoformat()
+            if not periods or periods[-1] != label:
+                periods.append(label)
+            names[machine_id] = name
+            series.setdefault(machine_id, {})[label] = total
+        # Una serie por equipo (no por nombre), ordenadas por nombre
+        machines = sorted(series, key=lambda pk: (names[pk], pk))
+        datasets = [
+            {"label": names[pk], "data": [series[pk].get(label, 0) for label in periods]}
+            for pk in machines
+        ]
+        context = {
+            "form": form,
+            "start": start,
+            "end": end,
+            "labels": periods,
+            "datasets": datasets,
+            "totals": [(names[pk], sum(series[pk].values())) for pk in machines],
+            "top_stocks": production_by_stock(start, end, machine),
+        }
+        return render(request, self.template_name, context)
+
+
+# Importes e impuestos de las ordenes por periodo y, opcionalmente, por destino
+class TaxReportView(View):
+    template_name = "order/tax_report.html"
+    default_days = 365
+
+    def get(self, request):
+        form = TaxReportForm(request.GET or None)
+        filters = form.cleaned_data if form.is_valid() else {}
+        kind = filters.get("kind") or "dispatch"
+        end = filters.get("end") or timezone.localdate()
+        start = filters.get("start") or end - datetime.timedelta(days=self.default_days - 1)
+        period = filters.get("period") or "month"
+        by_destination = filters.get("by_destination", False)
+        context = {
+            "form": form,
+            "start": start,
+            "end": end,
+            "by_destination": by_destination,
+            "fields": SUM_FIELDS,
+            "rows": tax_report(kind, period, start, end, by_destination),
+            "totals": tax_totals(kind, start, end),
+        }
+        return render(request, self.template_name, context)
+
+
 # View para visualizar equipos
 class MachineView(View):
     def get(self, request, name):
-        machineobj = get_object_or_404(ProductionMachine, name=name)
-        order_list = ProductionOrder.objects.filter(machine=machineobj)
+        machineobj = get_object_or_404(ProductionMachine.active, name=name)
+        order_list = (
+            ProductionOrder.objects.filter(machine=machineobj)
+            .order_by("-time")
+            .prefetch_related(prefetch_production_items())
+        )
+        if keyset_requested(request):
+            paginator, order = keyset_page(request, order_list, 10, ("-time", "-orderno"))
+            context = {"machine": machineobj, "orders": order, "keyset": True}
+            return render(request, "machine/machine.html", context)
         page = request.GET.get("page", 1)
         paginator = Paginator(order_list, 10)
         try:
@@ -98,12 +231,22 @@ class MachineView(View):
 
 
 # View para listar prducciones
-class ProductionView(ListView):
+class ProductionView(CachedPageMixin, KeysetPaginationMixin, ListView):
     model = ProductionOrder
     template_name = "production/production_list.html"
     context_object_name = "orders"
     ordering = ["-time"]
+    keyset_ordering = ("-time", "-orderno")
     paginate_by = 10
+    cache_groups = ("orders", "machines", "stock")
+
+    def get_queryset(self):
+        return (
+            super()
+            .get_queryset()
+            .select_related("machine")
+            .prefetch_related(prefetch_production_items())
+        )
 
 
 # View para seleccionar equipos en formulario de produccion
@@ -119,7 +262,7 @@ class SelectMachineView(View):
         form = self.form_class(request.POST)
         if form.is_valid():
             machineid = request.POST.get("machine")
-            machine = get_object_or_404(ProductionMachine, id=machineid)
+            machine = get_object_or_404(ProductionMachine.active, id=machineid)
             return redirect("new-production", machine.pk)
         return render(request, self.template_name, {"form": form})
 
@@ -130,7 +273,7 @@ class ProductionCreateView(View):
 
     def get(self, request, pk):
         formset = ProductionItemFormset(request.GET or None)
-        productionobj = get_object_or_404(ProductionMachine, pk=pk)
+        productionobj = get_object_or_404(ProductionMachine.active, pk=pk)
         context = {
             "formset": formset,
             "machine": productionobj,
@@ -140,62 +283,74 @@ class ProductionCreateView(View):
 
     def post(self, request, pk):
         formset = ProductionItemFormset(request.POST)
-        machineobj = get_object_or_404(ProductionMachine, pk=pk)
+        machineobj = get_object_or_404(ProductionMachine.active, pk=pk)
         if formset.is_valid():
-            orderobj = ProductionOrder(machine=machineobj)
-            orderobj.save()
-            orderdetailsobj = ProductionOrderDetails(orderno=orderobj)
-            orderdetailsobj.save()
-            # forloop para guardar los forms individuales com objetos
-            for form in formset:
-                # Vincula la orden con el item
-                orderitem = form.save(commit=False)
-                # Vincula el item al objeto
-                orderitem.orderno = orderobj
-                # Obtiene el producto vinculado
-                stock = get_object_or_404(Stock, name=orderitem.stock.name)
-                # Actualiza la cantidad
-                stock.quantity += orderitem.quantity
-                # Guarda la orden y el producto
-                stock.save()
-                orderitem.save()
-            # Guarda los detalles de la orden
-            orderdetailsobj.save()
+            with transaction.atomic():
+                orderobj = ProductionOrder(machine=machineobj)
+                orderobj.save()
+                orderdetailsobj = ProductionOrderDetails(orderno=orderobj)
+                orderdetailsobj.save()
+                # Vincula los items a la orden y suma las cantidades al stock
+                items = [
+                    form.save(commit=False) for form in formset if form.has_changed()
+                ]
+                add_order_items(orderobj, items, STOCK_IN)
+                record_production(orderobj, items)
             # Envia el mensaje a la View siguiente
             messages.success(
                 request, "El producto producido ha sido registrado correctamente"
             )
             # Redirecciona a la orden creada para visualizar e imprimir
             return redirect("production-order", orderno=orderobj.orderno)
-        formset = ProductionItemFormset(request.GET or None)
+        # Se devuelve el formset enviado para mostrar los errores de cada linea
         context = {"formset": formset, "machine": machineobj}
         return render(request, self.template_name, context)
 
 
+# Las ordenes con muchos items se borran en la cola de trabajos para no
+# retener el request mientras se revierte el stock de cada linea
+def delete_in_background(request, kind, order, items, success_url):
+    if items.count() <= settings.JOBS_DELETE_INLINE_ITEMS:
+        return None
+    delete_orders.delay(kind, [order.pk], user=request.user)
+    messages.info(request, "La orden tiene muchos items: se eliminara en segundo plano")
+    return redirect(success_url)
+
+
 class ProductionDeleteView(SuccessMessageMixin, DeleteView):
     model = ProductionOrder
     template_name = "production/delete_production.html"
     success_url = "/operations/production"
 
+    @transaction.atomic
     def delete(self, *args, **kwargs):
         self.object = self.get_object()
-        items = ProductionItem.objects.filter(orderno=self.object.orderno)
-        for item in items:
-            stock = get_object_or_404(Stock, name=item.stock.name)
-            if stock.is_deleted == False:
-                stock.quantity -= item.quantity
-                stock.save()
+        queued = delete_in_background(
+            self.request, "production", self.object, self.object.productionorderno, self.success_url
+        )
+        if queued:
+            return queued
+        # Resta del stock y de los totales por equipo lo producido en la orden
+        items = revert_order_items(
+            self.object.productionorderno.all(), STOCK_IN, self.object.pk
+        )
+        remove_production(self.object, items)
         messages.success(self.request, "La produccion ha sido borrada correctamente")
         return super(ProductionDeleteView, self).delete(*args, **kwargs)
 
 
 # Lista despachos
-class DispatchView(ListView):
+class DispatchView(CachedPageMixin, KeysetPaginationMixin, ListView):
     model = DispatchOrder
     template_name = "dispatch/dispatch_list.html"
     context_object_name = "orders"
     ordering = ["-time"]
+    keyset_ordering = ("-time", "-orderno")
     paginate_by = 10
+    cache_groups = ("orders", "stock")
+
+    def get_queryset(self):
+        return super().get_queryset().prefetch_related(prefetch_dispatch_items())
 
 
 # Genera orden de despacho
@@ -205,56 +360,51 @@ class DispatchCreateView(View):
     def get(self, request):
         form = DispatchForm(request.GET or None)
         formset = DispatchItemFormset(request.GET or None)
-        stocks = Stock.objects.filter(is_deleted=False)
-        context = {"form": form, "formset": formset, "stocks": stocks}
+        context = {"form": form, "formset": formset}
         return render(request, self.template_name, context)
 
     def post(self, request):
         form = DispatchForm(request.POST)
         formset = DispatchItemFormset(request.POST)
         if form.is_valid() and formset.is_valid():
-            # Guardar Orden
+            # Guarda la orden, sus detalles y los items en una sola transaccion
             try:
-                orderobj = form.save(commit=False)
-                orderobj.save()
-
-            except Exception as exc:
-                print("Exception error! ", exc)
+                with transaction.atomic():
+                    orderobj = form.save()
+                    DispatchOrderDetails.objects.create(orderno=orderobj)
+                    # Vincula los items a la orden y resta las cantidades del stock
+                    items = [
+                        iform.save(commit=False)
+                        for iform in formset
+                        if iform.has_changed()
+                    ]
+                    add_order_items(orderobj, items, STOCK_OUT)
+
+            except InsufficientStock as exc:
+                # Marca las lineas que piden mas de lo disponible
+                for iform in formset:
+                    stock = iform.cleaned_data.get("stock")
+                    if stock is not None and stock.pk in exc.available:
+                        message = "Stock insuficiente: hay %d disponibles"
+                        iform.add_error("quantity", message % exc.available[stock.pk])
                 context = {
                     "form": form,
                     "formset": formset,
                 }
                 return render(request, self.template_name, context)
-
-            try:
-                # Crea detalles de la orden
-                orderdetailsobj = DispatchOrderDetails(orderno=orderobj)
-                orderdetailsobj.save()
-
             except Exception as exc:
                 print("Exception error! ", exc)
-                orderobj.delete()
                 context = {
                     "form": form,
                     "formset": formset,
                 }
                 return render(request, self.template_name, context)
 
-            for form in formset:
-                orderitem = form.save(commit=False)
-                orderitem.orderno = orderobj
-                stock = get_object_or_404(Stock, name=orderitem.stock.name)
-                stock.quantity -= orderitem.quantity
-                stock.save()
-                orderitem.save()
-
-            orderdetailsobj.save()
             messages.success(
                 request, "Los productos del pedido han sido registrados correctamente"
             )
             return redirect("dispatch-order", orderno=orderobj.orderno)
-        form = DispatchForm(request.GET or None)
-        formset = DispatchItemFormset(request.GET or None)
+        # Se devuelven los formularios enviados para mostrar sus errores
         context = {
             "form": form,
             "formset": formset,
@@ -267,96 +417,236 @@ class DispatchDeleteView(SuccessMessageMixin, DeleteView):
     template_name = "dispatch/delete_dispatch.html"
     success_url = "/operations/dispatch"
 
+    @transaction.atomic
     def delete(self, *args, **kwargs):
         self.object = self.get_object()
-        items = DispatchItem.objects.filter(orderno=self.object.orderno)
-        for item in items:
-            stock = get_object_or_404(Stock, name=item.stock.name)
-            if stock.is_deleted == False:
-                stock.quantity += item.quantity
-                stock.save()
+        queued = delete_in_background(
+            self.request, "dispatch", self.object, self.object.dispatchorderno, self.success_url
+        )
+        if queued:
+            return queued
+        # Devuelve al stock lo despachado en la orden
+        revert_order_items(
+            self.object.dispatchorderno.all(), STOCK_OUT, self.object.pk
+        )
         messages.success(self.request, "Pedido eliminado correctamente")
         return super(DispatchDeleteView, self).delete(*args, **kwargs)
 
 
-class ProductionOrderView(View):
-    model = ProductionOrder
-    template_name = "order/production_order.html"
+# Vista imprimible de una orden: carga orden, equipo, items con producto y
+# detalles en un numero fijo de consultas y responde 304 si no hubo cambios.
+# La pagina lleva el formulario con el token CSRF del usuario, asi que el ETag
+# depende de ambos y solo se compara el ETag (no la fecha de modificacion)
+class OrderDocumentView(View):
+    model = None
+    items_prefetch = None
+    details_name = None
+    form_class = None
+    template_name = None
     order_base = "order/order_base.html"
-
-    def get(self, request, orderno):
+    success_message = None
+
+    def get_queryset(self):
+        return self.model.objects.prefetch_related(self.items_prefetch(), self.details_name)
+
+    def get_order(self, orderno):
+        order = get_object_or_404(self.get_queryset(), orderno=orderno)
+        # El ultimo detalle, igual que en la exportacion y la API
+        details = getattr(order, self.details_name).all()
+        return order, max(details, key=lambda detail: detail.pk, default=None)
+
+    def get_etag(self, request, order, details):
+        # get_token enmascara distinto en cada llamada: se usa la cookie, que
+        # cambia solo al rotar el token (login)
+        get_token(request)
+        data = [request.user.pk, request.META["CSRF_COOKIE"], order.pk, order.time.isoformat()]
+        data += [(item.pk, item.stock.name, item.quantity) for item in order.get_items_list()]
+        if details is not None:
+            data += [details.modified.isoformat()]
+            data += [getattr(details, field) for field in DETAIL_FIELDS]
+        return '"%s"' % hashlib.md5(repr(data).encode()).hexdigest()
+
+    def get_last_modified(self, order, details):
+        if details is None:
+            return order.time
+        return max(order.time, details.modified)
+
+    def set_validators(self, request, response, order, details):
+        response["ETag"] = self.get_etag(request, order, details)
+        response["Last-Modified"] = http_date(self.get_last_modified(order, details).timestamp())
+        patch_cache_control(response, private=True, max_age=0)
+        return response
+
+    def render_order(self, request, order, details):
         context = {
-            "order": ProductionOrder.objects.get(orderno=orderno),
-            "items": ProductionItem.objects.filter(orderno=orderno),
-            "orderdetails": ProductionOrderDetails.objects.get(orderno=orderno),
+            "order": order,
+            "items": order.get_items_list(),
+            "orderdetails": details,
             "order_base": self.order_base,
         }
-        return render(request, self.template_name, context)
+        response = render(request, self.template_name, context)
+        return self.set_validators(request, response, order, details)
+
+    def get(self, request, orderno):
+        order, details = self.get_order(orderno)
+        # Con mensajes pendientes (p. ej. despues de crear la orden) se
+        # renderiza siempre para mostrarlos
+        if not len(messages.get_messages(request)):
+            etag = self.get_etag(request, order, details)
+            not_modified = get_conditional_response(request, etag=etag)
+            if not_modified is not None:
+                return self.set_validators(request, not_modified, order, details)
+        return self.render_order(request, order, details)
 
     def post(self, request, orderno):
-        form = ProductionDetailsForm(request.POST)
+        order, details = self.get_order(orderno)
+        if details is None:
+            details = self.form_class._meta.model(orderno=order)
+        # Solo se modifican los campos enviados, el resto conserva su valor
+        data = model_to_dict(details, fields=self.form_class._meta.fields)
+        data.update(request.POST.dict())
+        form = self.form_class(data, instance=details)
         if form.is_valid():
-            orderdetailsobj = ProductionOrderDetails.objects.get(orderno=orderno)
-            orderdetailsobj.eway = request.POST.get("eway")
-            orderdetailsobj.veh = request.POST.get("veh")
-            orderdetailsobj.destination = request.POST.get("destination")
-            orderdetailsobj.po = request.POST.get("po")
-            orderdetailsobj.cgst = request.POST.get("cgst")
-            orderdetailsobj.sgst = request.POST.get("sgst")
-            orderdetailsobj.igst = request.POST.get("igst")
-            orderdetailsobj.cess = request.POST.get("cess")
-            orderdetailsobj.tcs = request.POST.get("tcs")
-            orderdetailsobj.total = request.POST.get("total")
-            orderdetailsobj.save()
-            messages.success(
-                request, "Los detalles de produccion han sido actualizado correctamente"
-            )
-        context = {
-            "order": ProductionOrder.objects.get(orderno=orderno),
-            "items": ProductionItem.objects.filter(orderno=orderno),
-            "orderdetails": ProductionOrderDetails.objects.get(orderno=orderno),
-            "order_base": self.order_base,
-        }
-        return render(request, self.template_name, context)
+            details = form.save()
+            messages.success(request, self.success_message)
+        return self.render_order(request, order, details)
+
+
+class ProductionOrderView(OrderDocumentView):
+    kind = "production"
+    model = ProductionOrder
+    items_prefetch = staticmethod(prefetch_production_items)
+    details_name = "productiondetailsorderno"
+    form_class = ProductionDetailsForm
+    template_name = "order/production_order.html"
+    success_message = "Los detalles de produccion han sido actualizado correctamente"
 
+    def get_queryset(self):
+        return super().get_queryset().select_related("machine")
 
-class DispatchOrderView(View):
+
+class DispatchOrderView(OrderDocumentView):
+    kind = "dispatch"
     model = DispatchOrder
+    items_prefetch = staticmethod(prefetch_dispatch_items)
+    details_name = "dispatchdetailsorderno"
+    form_class = DispatchDetailsForm
     template_name = "order/dispatch_order.html"
-    order_base = "order/order_base.html"
+    success_message = "Los detalles de despacho hans sido modificados correctamente"
+
+
+# Descarga la orden en PDF; el archivo se genera una vez y queda en el cache
+# de disco identificado por el contenido de la orden
+class OrderPDFMixin:
+    http_method_names = ["get"]
 
     def get(self, request, orderno):
-        context = {
-            "order": DispatchOrder.objects.get(orderno=orderno),
-            "items": DispatchItem.objects.filter(orderno=orderno),
-            "orderdetails": DispatchOrderDetails.objects.get(orderno=orderno),
-            "order_base": self.order_base,
-        }
-        return render(request, self.template_name, context)
+        order, details = self.get_order(orderno)
+        path = order_document(self.kind, order, order.get_items_list(), details)
+        etag = '"%s"' % os.path.splitext(os.path.basename(path))[0]
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            not_modified["ETag"] = etag
+            return not_modified
+        response = FileResponse(
+            open(path, "rb"),
+            content_type="application/pdf",
+            filename="%s_%s.pdf" % (self.kind, order.pk),
+        )
+        response["ETag"] = etag
+        patch_cache_control(response, private=True, max_age=0)
+        return response
 
-    def post(self, request, orderno):
-        form = DispatchDetailsForm(request.POST)
-        if form.is_valid():
-            orderdetailsobj = DispatchOrderDetails.objects.get(orderno=orderno)
-
-            orderdetailsobj.eway = request.POST.get("eway")
-            orderdetailsobj.veh = request.POST.get("veh")
-            orderdetailsobj.destination = request.POST.get("destination")
-            orderdetailsobj.po = request.POST.get("po")
-            orderdetailsobj.cgst = request.POST.get("cgst")
-            orderdetailsobj.sgst = request.POST.get("sgst")
-            orderdetailsobj.igst = request.POST.get("igst")
-            orderdetailsobj.cess = request.POST.get("cess")
-            orderdetailsobj.tcs = request.POST.get("tcs")
-            orderdetailsobj.total = request.POST.get("total")
-            orderdetailsobj.save()
-            messages.success(
-                request, "Los detalles de despacho hans sido modificados correctamente"
-            )
-        context = {
-            "order": DispatchOrder.objects.get(orderno=orderno),
-            "items": DispatchItem.objects.filter(orderno=orderno),
-            "orderdetails": DispatchOrderDetails.objects.get(orderno=orderno),
-            "order_base": self.order_base,
-        }
-        return render(request, self.template_name, context)
+
+class ProductionPDFView(OrderPDFMixin, ProductionOrderView):
+    pass
+
+
+class DispatchPDFView(OrderPDFMixin, DispatchOrderView):
+    pass
+
+
+# Pseudo archivo para csv.writer: devuelve cada linea en vez de guardarla
+class Echo:
+    def write(self, value):
+        return value
+
+
+# Exporta el historial a CSV en streaming: las ordenes se leen por lotes y cada
+# fila se envia apenas se genera, sin cargar todo el resultado en memoria
+class OrderExportView(View):
+    kind = None
+    model = None
+    filename = None
+    chunk_size = 500
+
+    def get(self, request):
+        form = ExportFilterForm(request.GET)
+        if not form.is_valid():
+            return HttpResponseBadRequest(form.errors.as_text())
+        if request.GET.get("background"):
+            return self.enqueue(request, form.cleaned_data)
+        orders = self.filter_orders(self.model.objects.all(), form.cleaned_data)
+        response = StreamingHttpResponse(self.stream(orders), content_type="text/csv")
+        response["Content-Disposition"] = 'attachment; filename="%s_%s.csv"' % (
+            self.filename,
+            timezone.localdate().strftime("%Y%m%d"),
+        )
+        return response
+
+    def filter_orders(self, orders, filters):
+        return filter_by_date(orders, filters["start"], filters["end"])
+
+    # Con ?background=1 el archivo se genera en la cola de trabajos; se
+    # responde con la URL para consultar el estado y luego descargarlo
+    def enqueue(self, request, filters):
+        job = export_orders.delay(
+            self.kind,
+            filters["start"] and filters["start"].isoformat(),
+            filters["end"] and filters["end"].isoformat(),
+            filters["machine"].pk if self.kind == "production" and filters["machine"] else None,
+            user=request.user,
+        )
+        return job_accepted(job)
+
+    def stream(self, orders):
+        fields = csv_fields(self.kind)
+        writer = csv.DictWriter(Echo(), fieldnames=fields)
+        yield writer.writerow(dict(zip(fields, fields)))
+        for order, items, details in iter_orders(self.kind, orders, self.chunk_size):
+            for row in order_rows(self.kind, order, items, details):
+                yield writer.writerow(row)
+
+
+class ProductionExportView(OrderExportView):
+    kind = "production"
+    model = ProductionOrder
+    filename = "produccion"
+
+    def filter_orders(self, orders, filters):
+        orders = super().filter_orders(orders, filters)
+        if filters["machine"]:
+            orders = orders.filter(machine=filters["machine"])
+        return orders
+
+
+class DispatchExportView(OrderExportView):
+    kind = "dispatch"
+    model = DispatchOrder
+    filename = "despachos"
+
+
+# Listado de ordenes en JSON para ASGI, paginado por cursor (?cursor=&limit=)
+class OrderListJSONView(AsyncView):
+    kind = None
+    default_limit = 20
+    max_limit = 100
+
+    async def get(self, request):
+        try:
+            limit = int(request.GET.get("limit", self.default_limit))
+        except ValueError:
+            return HttpResponseBadRequest("limit invalido")
+        limit = min(max(limit, 1), self.max_limit)
+        data = await run_query(order_page, self.kind, request.GET.get("cursor") or None, limit)
+        return JsonResponse(data)